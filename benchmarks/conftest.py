@@ -0,0 +1,52 @@
+"""
+Benchmarks for the CPU-bound hot paths, using pytest-benchmark.
+
+Run from the repository root, comparing against the stored baselines:
+
+    python -m pytest benchmarks --benchmark-storage=file://benchmarks/baselines \
+        --benchmark-compare --benchmark-compare-fail=mean:25%
+
+Save new baselines with --benchmark-save=baseline.
+"""
+
+import datetime
+
+import django
+from django.conf import settings
+import pytest
+
+
+if not settings.configured:
+    settings.configure(
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+        },
+        MAZEVO_R25_EVENTTYPES_ACADEMIC_IMPORT=["459", "472"],
+        RESTCLIENTS_R25_DAO_CLASS="Mock",
+    )
+    django.setup()
+
+
+@pytest.fixture(scope="session")
+def generator(tmp_path_factory):
+    from mazevo_r25.mock_data import MockDataGenerator
+
+    return MockDataGenerator(
+        str(tmp_path_factory.mktemp("mock")),
+        start_date=datetime.date(2025, 9, 20),
+        end_date=datetime.date(2025, 12, 13),
+    )
+
+
+@pytest.fixture(scope="session")
+def reservations_xml(generator):
+    """
+    reservations.xml documents by number of course sections
+    """
+    from mazevo_r25.mock_data import reservations_document
+
+    documents = {}
+    for sections in (10, 100, 300):
+        reservations, _ = generator.generate_reservations(sections)
+        documents[sections] = reservations_document(reservations).encode("utf-8")
+    return documents
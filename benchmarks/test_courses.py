@@ -0,0 +1,42 @@
+from lxml import etree
+import pytest
+
+from mazevo_r25.courses import (
+    NameParser, TermCalendar, add_reservation, merge_meeting_weeks)
+from mazevo_r25.more_r25 import reservations_from_xml
+
+
+DAYS_OF_WEEK = [
+    "sunday", "monday", "tuesday", "wednesday", "thursday", "friday", "saturday",
+]
+
+
+# the term window of the generator fixture
+CALENDAR = TermCalendar("2025-09-20", "2025-12-13")
+
+
+def aggregate(reservations):
+    courses = {}
+    names = NameParser()
+    for reservation in reservations:
+        add_reservation(courses, reservation, (), CALENDAR, names)
+    return courses
+
+
+@pytest.mark.parametrize("sections", [10, 100, 300])
+def test_add_reservation(benchmark, reservations_xml, sections):
+    reservations = reservations_from_xml(etree.fromstring(reservations_xml[sections]))
+
+    courses = benchmark(aggregate, reservations)
+    assert len(courses) == sections
+
+
+@pytest.mark.parametrize("sections", [10, 100, 300])
+def test_merge_meeting_weeks(benchmark, reservations_xml, sections):
+    reservations = reservations_from_xml(etree.fromstring(reservations_xml[sections]))
+
+    meeting_count = benchmark.pedantic(
+        merge_meeting_weeks,
+        setup=lambda: ((aggregate(reservations), DAYS_OF_WEEK), {}),
+        rounds=10)
+    assert meeting_count >= sections
@@ -0,0 +1,151 @@
+import datetime
+from unittest import mock
+
+from lxml import etree
+import pytest
+from restclients_core.models import MockHTTP
+from uw_r25.models import Event, Reservation, Space
+
+from mazevo_r25 import more_r25
+from mazevo_r25.mock_data import XML_HEADER
+
+
+@pytest.mark.parametrize("sections", [10, 100, 300])
+def test_reservations_from_xml(benchmark, reservations_xml, sections):
+    data = reservations_xml[sections]
+
+    reservations = benchmark(
+        lambda: more_r25.reservations_from_xml(etree.fromstring(data)))
+    assert len(reservations) > sections
+
+
+@pytest.mark.parametrize("items", [100, 1000, 10000])
+def test_list_items_from_xml(benchmark, items):
+    data = (
+        XML_HEADER.format(tag="list", attrs="") +
+        "".join(
+            "<r25:item><r25:id>{0}</r25:id><r25:name>SPACE {0}</r25:name></r25:item>"
+            .format(i) for i in range(items)) +
+        "</r25:list>"
+    ).encode("utf-8")
+
+    result = benchmark(lambda: more_r25.list_items_from_xml(etree.fromstring(data)))
+    assert len(result) == items
+
+
+def edit_document(generator, profiles):
+    """
+    An editable event with the given number of profiles, and the event as
+    mazevo2r25 would want it changed
+    """
+    tz = datetime.timezone(datetime.timedelta(hours=-8))
+    start = datetime.datetime(2025, 10, 1, 9, 30, tzinfo=tz)
+    event_xml = generator.event_xml(
+        110000, "1000_BENCHMARK", 40000000, start,
+        start + datetime.timedelta(minutes=50), 10001)
+    tree = etree.fromstring(event_xml.encode("utf-8"))
+    enode = tree[0]
+    pnode = enode.find("{%s}profile" % more_r25.nsmap["r25"])
+    for i in range(1, profiles):
+        copy = etree.fromstring(etree.tostring(pnode))
+        copy.find(".//{%s}reservation_id" % more_r25.nsmap["r25"]).text = str(
+            40000000 + i)
+        enode.append(copy)
+
+    event = Event()
+    event.event_id = "110000"
+    event.alien_uid = None
+    event.name = "1000_BENCHMARK"
+    event.title = "Benchmark"
+    event.start_date = event.end_date = None
+    event.state = Event.CONFIRMED_STATE
+    event.parent_id = event.cabinet_id = event.cabinet_name = None
+    event.node_type = "E"
+    event.organization_id = 4211
+    event.reservations = []
+    for i in range(profiles):
+        res = Reservation()
+        res.reservation_id = str(40000000 + i)
+        res.profile_name = None
+        res.state = Reservation.STANDARD_STATE
+        res.start_datetime = "2025-10-01T09:30:00-07:00"
+        res.end_datetime = "2025-10-01T10:20:00-07:00"
+        res.reservation_start_dt = "2025-10-01T09:15:00-07:00"
+        res.reservation_end_dt = "2025-10-01T10:20:00-07:00"
+        res.setup_tm = "PT15M"
+        res.tdown_tm = None
+        res.space_reservation = Space()
+        res.space_reservation.space_id = 10002
+        event.reservations.append(res)
+
+    return etree.tostring(tree), event
+
+
+@pytest.mark.parametrize("profiles", [1, 10, 100])
+def test_update_event(benchmark, generator, profiles):
+    data, event = edit_document(generator, profiles)
+
+    with mock.patch.object(
+            more_r25, "get_editable_event",
+            side_effect=lambda event: etree.fromstring(data)), \
+            mock.patch.object(
+                more_r25, "_update_event",
+                side_effect=lambda url, tree: etree.tostring(tree)):
+        result = benchmark(more_r25.update_event, event)
+
+    assert b'status="mod"' in result
+
+
+def put_response(body):
+    response = MockHTTP()
+    response.status = 200
+    response.data = (XML_HEADER.format(tag="results", attrs="") + body +
+                     "</r25:results>").encode("utf-8")
+    return response
+
+
+@pytest.mark.parametrize("messages", [1, 10, 100])
+def test_put_resource_messages(benchmark, messages):
+    response = put_response("".join(
+        "<r25:messages><r25:msg_num>{0}</r25:msg_num>"
+        "<r25:msg_id>EV_I_SPACECON</r25:msg_id>"
+        "<r25:msg_text>Space KNE 225 unavailable due to [rsrv] conflict with "
+        "EVENT [{0}]</r25:msg_text>"
+        "<r25:msg_entity_name>sp_reservations</r25:msg_entity_name>"
+        "<r25:msg_object_id>5326</r25:msg_object_id></r25:messages>"
+        .format(i) for i in range(messages)))
+
+    def put():
+        try:
+            more_r25.put_resource("event.xml?event_id=1", "")
+        except more_r25.R25MessageException as ex:
+            return ex
+
+    with mock.patch.object(more_r25, "_request", return_value=("url", response)):
+        ex = benchmark(put)
+
+    assert ex.msg_id == "EV_I_SPACECON"
+
+
+@pytest.mark.parametrize("details", [1, 10, 100])
+def test_put_resource_error(benchmark, details):
+    response = put_response(
+        "<r25:error><r25:msg_id>SY_E_DATAERROR</r25:msg_id>"
+        "<r25:msg>Error saving; data format/validation error</r25:msg>"
+        "<r25:id>789166</r25:id></r25:error><r25:error_details>" +
+        "".join(
+            '<r25:error_detail table="events" field="event_type_id" value="306" '
+            'object_id="789166" object_type="4">Inactive event_type_id'
+            "</r25:error_detail>" for i in range(details)) +
+        "</r25:error_details>")
+
+    def put():
+        try:
+            more_r25.put_resource("event.xml?event_id=1", "")
+        except more_r25.R25ErrorException as ex:
+            return ex
+
+    with mock.patch.object(more_r25, "_request", return_value=("url", response)):
+        ex = benchmark(put)
+
+    assert len(ex.details) == details
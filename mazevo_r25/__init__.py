@@ -4,3 +4,7 @@ from os.path import abspath, dirname
 from restclients_core.dao import MockDAO
 
 MockDAO.register_mock_path(os.path.join(abspath(dirname(__file__)), "resources"))
+
+# generated by the generate_mock_data command
+if os.environ.get("MAZEVO_R25_MOCK_DATA"):
+    MockDAO.register_mock_path(abspath(os.environ["MAZEVO_R25_MOCK_DATA"]))
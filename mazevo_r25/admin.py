@@ -1,38 +1,203 @@
 from django import forms
-from django.contrib import admin
+from django.conf import settings
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.http import (
+    Http404,
+    HttpResponseNotAllowed,
+    HttpResponseRedirect,
+    JsonResponse,
+)
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
 
-from .models import MazevoRoomSpace, MazevoStatusMap
+from .lookups import LOOKUPS, event_type_lookup, space_lookup
+from .models import MazevoRoomSpace, MazevoStatusMap, MazevoSyncLease, MazevoSyncRun
+from .runs import TREND_WEEKS, weekly_trends
+
+
+# Number of autocomplete results per page
+LOOKUP_PAGE_SIZE = 20
+
+NO_SPACE = ("", "Not Defined")
+NO_EVENT_TYPE = (MazevoStatusMap.EVENT_TYPE_UNDEFINED, "Not Defined")
+
+
+class LookupSelect(forms.Select):
+    """
+    A select searched with the admin's select2 autocomplete. Only the empty
+    choice and the current value are rendered; the rest come from the lookup
+    view as the user types.
+    """
+
+    def __init__(self, lookup, url, empty_choice, attrs=None):
+        super(LookupSelect, self).__init__(attrs)
+        self.lookup = lookup
+        self.url = url
+        self.empty_choice = empty_choice
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super(LookupSelect, self).build_attrs(base_attrs, extra_attrs)
+        attrs.update({
+            "class": (attrs.get("class", "") + " admin-autocomplete").strip(),
+            "data-ajax--cache": "true",
+            "data-ajax--delay": 250,
+            "data-ajax--type": "GET",
+            "data-ajax--url": self.url,
+            "data-theme": "admin-autocomplete",
+            "data-allow-clear": "false",
+        })
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        self.choices = [self.empty_choice]
+        for id in value:
+            if id not in (None, "", str(self.empty_choice[0])) and id.isdigit():
+                self.choices.append((id, self.lookup.label(int(id))))
+        return super(LookupSelect, self).optgroups(name, value, attrs)
+
+    @property
+    def media(self):
+        extra = "" if settings.DEBUG else ".min"
+        return forms.Media(
+            js=(
+                "admin/js/vendor/jquery/jquery%s.js" % extra,
+                "admin/js/vendor/select2/select2.full%s.js" % extra,
+                "admin/js/jquery.init.js",
+                "admin/js/autocomplete.js",
+            ),
+            css={
+                "screen": (
+                    "admin/css/vendor/select2/select2%s.css" % extra,
+                    "admin/css/autocomplete.css",
+                ),
+            },
+        )
+
+
+def lookup_url(model, field_name):
+    return reverse("admin:{}_{}_lookup".format(
+        model._meta.app_label, model._meta.model_name), args=[field_name])
+
+
+def current_choice(names, id):
+    """
+    A select with only the current value, for fields that can't be changed
+    """
+    widget = forms.Select()
+    widget.choices = []
+    if id is not None:
+        widget.choices.append((id, "{} ({})".format(id, names.get(id, ""))))
+    return widget
+
+
+class LookupAdmin(admin.ModelAdmin):
+    """
+    Serves autocomplete results for fields chosen from an R25 lookup, and
+    refreshes the lookups on demand
+    """
+
+    # field name -> (lookup, empty choice)
+    lookup_fields = {}
+    change_list_template = "admin/mazevo_r25/lookup_change_list.html"
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return [
+            path("lookup/<str:field_name>/",
+                 self.admin_site.admin_view(self.lookup_view),
+                 name="%s_%s_lookup" % info),
+            path("refresh/",
+                 self.admin_site.admin_view(self.refresh_view),
+                 name="%s_%s_refresh" % info),
+        ] + super(LookupAdmin, self).get_urls()
+
+    def lookup_view(self, request, field_name):
+        """
+        Search a lookup, answering the way select2 expects
+        """
+        if field_name not in self.lookup_fields:
+            raise Http404
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+
+        lookup, empty_choice = self.lookup_fields[field_name]
+        term = request.GET.get("term", "")
+        try:
+            page = max(int(request.GET.get("page", 1)), 1)
+        except ValueError:
+            page = 1
+
+        items, more = lookup.search(
+            term, (page - 1) * LOOKUP_PAGE_SIZE, LOOKUP_PAGE_SIZE, wait=False)
+        results = [
+            {"id": str(id), "text": "{} ({})".format(id, name)}
+            for id, name in items
+        ]
+        if page == 1 and not term:
+            results.insert(0, {"id": str(empty_choice[0]), "text": empty_choice[1]})
+
+        return JsonResponse({"results": results, "pagination": {"more": more}})
+
+    def refresh_view(self, request):
+        """
+        Fetch every lookup again, in the background, then return to the list
+        """
+        if request.method != "POST":
+            return HttpResponseNotAllowed(["POST"])
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+
+        for lookup in LOOKUPS:
+            lookup.refresh()
+        self.message_user(
+            request, "Lists from R25 and Mazevo are being fetched again",
+            messages.SUCCESS)
+        return HttpResponseRedirect(reverse("admin:{}_{}_changelist".format(
+            self.model._meta.app_label, self.model._meta.model_name)))
+
+
+def validate_lookup(lookup, id, description):
+    """
+    Check an id is in a lookup, without waiting for the lookup to be fetched
+
+    :param description: what the ids are, e.g. "R25 space"
+    :raise ValidationError: if the id is unknown, or the list isn't fetched yet
+    """
+    names = lookup.names(wait=False)
+    if not names:
+        # being fetched in the background
+        raise forms.ValidationError(
+            "The list of {}s is still loading. Try again in a moment.".format(
+                description))
+    if id not in names:
+        raise forms.ValidationError("Unknown {}".format(description))
 
 
 class MazevoRoomSpaceForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super(MazevoRoomSpaceForm, self).__init__(*args, **kwargs)
 
-        room_id_widget = forms.Select()
-        room_id_widget.choices = []
-        for room in MazevoRoomSpace.room_names:
-            room_id_widget.choices.append(
-                (room, "{} ({})".format(room, MazevoRoomSpace.room_names[room]))
-            )
-
         self.fields["room_id"].label = "Mazevo Room"
-        self.fields["room_id"].widget = room_id_widget
+        self.fields["room_id"].widget = current_choice(
+            MazevoRoomSpace.room_names, self.initial.get("room_id"))
         self.fields["room_id"].disabled = True
 
-        space_id_widget = forms.Select()
-        space_id_widget.choices = [(None, "Not Defined")]
-        for space in MazevoRoomSpace.space_names:
-            space_id_widget.choices.append(
-                (space, "{} ({})".format(space, MazevoRoomSpace.space_names[space]))
-            )
-
         self.fields["space_id"].label = "R25 Space"
-        self.fields["space_id"].widget = space_id_widget
+        self.fields["space_id"].widget = LookupSelect(
+            space_lookup, lookup_url(MazevoRoomSpace, "space_id"), NO_SPACE)
+
+    def clean_space_id(self):
+        space_id = self.cleaned_data["space_id"]
+        if space_id is not None:
+            validate_lookup(space_lookup, space_id, "R25 space")
+        return space_id
 
 
-class MazevoRoomSpaceAdmin(admin.ModelAdmin):
+class MazevoRoomSpaceAdmin(LookupAdmin):
     list_display = ("room_id", "space_id", "room_name", "space_name", "date_changed")
     form = MazevoRoomSpaceForm
+    lookup_fields = {"space_id": (space_lookup, NO_SPACE)}
 
 
 admin.site.register(MazevoRoomSpace, MazevoRoomSpaceAdmin)
@@ -42,34 +207,24 @@ class MazevoStatusMapForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super(MazevoStatusMapForm, self).__init__(*args, **kwargs)
 
-        status_id_widget = forms.Select()
-        status_id_widget.choices = []
-        for status in MazevoStatusMap.status_names:
-            status_id_widget.choices.append(
-                (status, "{} ({})".format(status, MazevoStatusMap.status_names[status]))
-            )
-
         self.fields["status_id"].label = "Mazevo Status"
-        self.fields["status_id"].widget = status_id_widget
+        self.fields["status_id"].widget = current_choice(
+            MazevoStatusMap.status_names, self.initial.get("status_id"))
         self.fields["status_id"].disabled = True
 
-        event_type_id_widget = forms.Select()
-        event_type_id_widget.choices = [(MazevoStatusMap.EVENT_TYPE_UNDEFINED, "Not Defined")]
-        for event_type in MazevoStatusMap.event_type_names:
-            event_type_id_widget.choices.append(
-                (
-                    event_type,
-                    "{} ({})".format(
-                        event_type, MazevoStatusMap.event_type_names[event_type]
-                    ),
-                )
-            )
-
         self.fields["event_type_id"].label = "R25 Event Type"
-        self.fields["event_type_id"].widget = event_type_id_widget
+        self.fields["event_type_id"].widget = LookupSelect(
+            event_type_lookup, lookup_url(MazevoStatusMap, "event_type_id"),
+            NO_EVENT_TYPE)
+
+    def clean_event_type_id(self):
+        event_type_id = self.cleaned_data["event_type_id"]
+        if event_type_id not in (None, MazevoStatusMap.EVENT_TYPE_UNDEFINED):
+            validate_lookup(event_type_lookup, event_type_id, "R25 event type")
+        return event_type_id
 
 
-class MazevoStatusMapAdmin(admin.ModelAdmin):
+class MazevoStatusMapAdmin(LookupAdmin):
     list_display = (
         "status_id",
         "event_type_id",
@@ -78,6 +233,125 @@ class MazevoStatusMapAdmin(admin.ModelAdmin):
         "event_type_name",
     )
     form = MazevoStatusMapForm
+    lookup_fields = {"event_type_id": (event_type_lookup, NO_EVENT_TYPE)}
 
 
 admin.site.register(MazevoStatusMap, MazevoStatusMapAdmin)
+
+
+class MazevoSyncRunAdmin(admin.ModelAdmin):
+    list_display = (
+        "started",
+        "command",
+        "outcome",
+        "window_start",
+        "window_end",
+        "seen",
+        "created",
+        "updated",
+        "cancelled",
+        "skipped",
+        "errors",
+        "requests",
+        "retries",
+        "run_duration",
+        "run_throughput",
+    )
+    list_filter = ("command", "outcome")
+    date_hierarchy = "started"
+    readonly_fields = ("run_options", "run_phases")
+    exclude = ("options", "phases")
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return [
+            path("trends/", self.admin_site.admin_view(self.trends_view),
+                 name="%s_%s_trends" % info),
+        ] + super(MazevoSyncRunAdmin, self).get_urls()
+
+    def trends_view(self, request):
+        """
+        Weekly summaries of the runs, to see throughput change over time
+        """
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+
+        trends = weekly_trends()
+        for summaries in trends.values():
+            fastest = max(summary["throughput"] or 0 for summary in summaries)
+            for summary in summaries:
+                summary["bar"] = round(
+                    100 * (summary["throughput"] or 0) / fastest) if fastest else 0
+
+        context = dict(
+            self.admin_site.each_context(request),
+            opts=self.model._meta,
+            title="Sync run trends",
+            weeks=TREND_WEEKS,
+            trends=[
+                (dict(MazevoSyncRun.COMMAND_CHOICES)[command], summaries)
+                for command, summaries in trends.items()
+            ],
+        )
+        return TemplateResponse(
+            request, "admin/mazevo_r25/mazevosyncrun/trends.html", context)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def run_duration(self, obj):
+        if obj.duration is None:
+            return None
+        return "{:.1f}s".format(obj.duration)
+
+    run_duration.short_description = "Duration"
+    run_duration.admin_order_field = "duration"
+
+    def run_throughput(self, obj):
+        if obj.throughput is None:
+            return None
+        return "{:.1f}/s".format(obj.throughput)
+
+    run_throughput.short_description = "Seen per second"
+
+    def run_options(self, obj):
+        return " ".join(
+            "--{}".format(name) if value is True else "--{}={}".format(name, value)
+            for name, value in obj.get_options().items())
+
+    run_options.short_description = "Options"
+
+    def run_phases(self, obj):
+        return ", ".join(
+            "{} {:.1f}s".format(name, seconds)
+            for name, seconds in obj.get_phases().items())
+
+    run_phases.short_description = "Phases"
+
+
+admin.site.register(MazevoSyncRun, MazevoSyncRunAdmin)
+
+
+class MazevoSyncLeaseAdmin(admin.ModelAdmin):
+    list_display = (
+        "job",
+        "shard",
+        "shards",
+        "worker",
+        "heartbeat",
+        "finished",
+        "takeovers",
+    )
+    list_filter = ("job",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+admin.site.register(MazevoSyncLease, MazevoSyncLeaseAdmin)
@@ -0,0 +1,153 @@
+"""
+The Django cache shared by R25 and Mazevo lookups. Kept apart from more_r25 so
+that models and the admin can use it without importing the R25 client.
+
+DjangoCache puts the same cache under restclients, for every R25, Mazevo and
+SWS GET request.
+"""
+
+import hashlib
+import logging
+import re
+
+from django.conf import settings
+from django.core.cache import caches
+from restclients_core.models import CacheHTTP
+
+
+logger = logging.getLogger(__name__)
+
+
+# Default lifetimes, in seconds, of cached responses from slow-changing R25
+# endpoints. Override with settings.MAZEVO_R25_CACHE_TTLS; a TTL of 0 disables
+# caching for that endpoint.
+CACHE_TTLS = {
+    "evtype.xml": 6 * 60 * 60,
+    "spaces.xml": 6 * 60 * 60,
+    "favorites.xml": 60 * 60,
+}
+
+# Default lifetimes, in seconds, of restclients responses, by service, as a list
+# of (url pattern, TTL) of which the first match applies. Urls matching none
+# aren't cached. Override per service with
+# settings.MAZEVO_R25_RESTCLIENTS_CACHE_TTLS
+RESTCLIENTS_CACHE_TTLS = {
+    "r25": [
+        (r"/evtype\.xml", 6 * 60 * 60),
+        (r"/spaces\.xml", 6 * 60 * 60),
+    ],
+    "mazevo": [
+        (r"/PublicConfiguration/", 60 * 60),
+    ],
+    "sws": [
+        # a given term
+        (r"/term/\d{4},\w+\.json", 7 * 24 * 60 * 60),
+        # current, next and previous terms, which move on
+        (r"/term/", 24 * 60 * 60),
+    ],
+}
+
+# The endpoint of a url, as named by invalidate_cache, e.g. "spaces.xml" for
+# /r25ws/wrd/test/run/spaces.xml, or "PublicConfiguration/Rooms" for
+# /api/PublicConfiguration/Rooms
+URL_ENDPOINT = re.compile(r"^(?:.*/run/|/api/)?([^?]*)")
+
+
+def get_cache():
+    """
+    The Django cache used for R25 reference data, chosen by
+    settings.MAZEVO_R25_CACHE (default "default")
+    """
+    return caches[getattr(settings, "MAZEVO_R25_CACHE", "default")]
+
+
+def cache_ttl(endpoint):
+    ttls = getattr(settings, "MAZEVO_R25_CACHE_TTLS", {})
+    return ttls.get(endpoint, CACHE_TTLS.get(endpoint, 0))
+
+
+def cache_generation_key(endpoint):
+    """
+    :return: key of the count that invalidate_cache bumps, which every cache
+             key for the endpoint includes
+    """
+    return "mazevo_r25:{}:generation".format(endpoint)
+
+
+def cache_key(endpoint, url):
+    """
+    :return: key of a url's response in the current generation of its endpoint
+    """
+    generation = get_cache().get(cache_generation_key(endpoint), 0)
+    return "mazevo_r25:{}:{}:{}".format(
+        endpoint, generation, hashlib.md5(url.encode("utf-8")).hexdigest()
+    )
+
+
+def invalidate_cache(endpoint):
+    """
+    Discard all cached responses for an R25 endpoint, e.g. after writing to it
+    """
+    key = cache_generation_key(endpoint)
+    get_cache().set(key, get_cache().get(key, 0) + 1, None)
+
+
+class DjangoCache(object):
+    """
+    A restclients cache kept in the R25 reference data cache, with TTLs by
+    service and url pattern. Turn it on with
+
+        RESTCLIENTS_DAO_CACHE_CLASS = "mazevo_r25.cache.DjangoCache"
+
+    Only successful GET responses are cached, and never an R25 event fetched
+    for editing (mode=edit). invalidate_cache() of an endpoint discards its
+    responses here too.
+    """
+
+    def get_cache_ttl(self, service, url):
+        """
+        :return: seconds to cache the response to url for, or 0 not to
+        """
+        path, _, query = url.partition("?")
+        if "mode=edit" in query.split("&"):
+            return 0
+
+        ttls = getattr(settings, "MAZEVO_R25_RESTCLIENTS_CACHE_TTLS", {})
+        for pattern, ttl in ttls.get(
+                service, RESTCLIENTS_CACHE_TTLS.get(service, [])):
+            if re.search(pattern, url):
+                return ttl
+        return 0
+
+    def _key(self, service, url):
+        endpoint = URL_ENDPOINT.match(url).group(1)
+        return "restclients:{}".format(cache_key(endpoint, url))
+
+    def getCache(self, service, url, headers):
+        if not self.get_cache_ttl(service, url):
+            return None
+
+        cached = get_cache().get(self._key(service, url))
+        if cached is None:
+            return None
+
+        logger.debug("cache hit for %s" % url)
+        response = CacheHTTP()
+        response.status = cached["status"]
+        response.data = cached["data"]
+        response.headers = cached["headers"]
+        response.cache_class = DjangoCache
+        return {"response": response}
+
+    def processResponse(self, service, url, response):
+        ttl = self.get_cache_ttl(service, url)
+        if ttl and response.status == 200:
+            get_cache().set(self._key(service, url), {
+                "status": response.status,
+                "data": response.data,
+                "headers": dict(response.headers or {}),
+            }, ttl)
+        return None
+
+    def deleteCache(self, service, url):
+        get_cache().delete(self._key(service, url))
@@ -0,0 +1,391 @@
+"""
+Aggregation of R25 course reservations into the Mazevo term import format
+"""
+
+import datetime
+from collections import Counter
+from functools import lru_cache
+import gzip
+import hashlib
+import json
+import logging
+import re
+
+
+# warnings are mailed out by the r25_mazevo command
+logger = logging.getLogger("r25_mazevo")
+
+# bit for each day in a week's day mask, Sunday first
+DAY_BITS = [1 << day for day in range(7)]
+
+"""
+# There's a variety of formats to look out for when matching course names in R25.
+# Here's some examples of ones we currently handle:
+*ASL 302 A ASL302A 20251
+*BIO A 206 A BIOA206A 20251
+*BIO A 344 A XL BIOA344A 20251
+A A 210 A AA210A 20251
+ACADEM 198 AA ACADEM198AA 20251
+AFRAM 241 A XL AFRAM241A 20251
+*CS&SS 221 A XL CS&SS221A 20251
+*EXAM: AMATH 502 A XL AMATH502A 20251
+*AMATH 502 A XL AMATH502A 20251
+EXAM:* STAT 391 A XL STAT391A 20251
+
+# These are for rooms on hold in advance of the actual TS import
+INFO 201 A /AUT25 Large Lecture
+MUSEN 350/550/AUT25 Large Lecture               # No section!
+STAT/SOC/CS&SS 221 /AUT25 Large Lecture         # No section!
+STAT/SOC /CS&SS 221 / WIN26 Large Lect          # extra space in currics
++RADGY 693 A 2026 [#45525]
+
+# breakout/review?
+STAT-394-A / MATH-394-A
+
+# other extras
+WIN26- ME 520 A Setup
+"""
+event_pat = re.compile(
+    r"""
+    ^                               # start at beginning
+    (?:\*|\+?)                      # optional asterisk or plus
+    (?:(WIN|SPR|SUM|AUT)\d\d-\ )?   # quarter prefix
+    (?P<exam>EXAM:\*?\ )?           # it's an exam, and another asterisk?
+    (?P<curric>[A-Z &]+?)           # curric abbrev, can contain space, &
+    (?:\ ?\/                        # slash separator, maybe an extra space
+     (?P<curric2>[A-Z &]+?))?       # second curric
+    (?:\ ?\/                        # slash separator, maybe an extra space
+     (?P<curric3>[A-Z &]+?))?       # third curric
+    [ -]                            # space or dash separator
+    (?P<number>\d{3})               # course number, 3 digits
+    (?:\/                           # slash separator
+     (?P<number2>\d{3}))?           # second number
+    [ -]*                           # optional space or dash separator
+    (?P<section>\w{0,2})            # section, 1 or 2 letters, or absent
+                                    # rest is ignored
+    """, re.VERBOSE)
+
+"""
+# some room names to match
+BAG  260
+HST T568
+SWS  026-030
+CSE2 G20
+GNOMS060
+HSB BB1404
+"""
+room_pat = re.compile(
+    r"""
+    ^                               # start at beginning
+    (?P<building>[A-Z0-9]{,4}?)     # building code, 4 chars or less
+    [ ]*                            # optional space separator
+    (?P<room>[A-Z]{0,2}\d{2,4}[A-Z]?) # room number, 2 to 4 digits
+    (?:-.*)?                        # combined room number, ignore it
+    $                               # end at end
+    """, re.VERBOSE)
+
+
+class TermCalendar(object):
+    """
+    Week ordinal and day bit of every date in a term, computed once per run
+
+    Weeks are Sunday To Saturday. Ordinal 7 (0001-01-07) is a Sunday, so
+    ordinal // 7 numbers the weeks and ordinal % 7 is the day, Sunday first.
+    """
+
+    def __init__(self, start_date, end_date):
+        """
+        :param start_date: first date of the term, ISO format
+        :param end_date: last date of the term, ISO format
+        """
+        self.days = {}
+        first = datetime.date.fromisoformat(start_date).toordinal()
+        last = datetime.date.fromisoformat(end_date).toordinal()
+        for ordinal in range(first, last + 1):
+            self.add(ordinal)
+
+    def add(self, ordinal):
+        day = (ordinal // 7, DAY_BITS[ordinal % 7])
+        self.days[datetime.date.fromordinal(ordinal).isoformat()] = day
+        return day
+
+    def day(self, start_datetime):
+        """
+        :param start_datetime: ISO datetime, as R25 gives it
+        :return: (week ordinal, day bit) of its date
+        """
+        try:
+            return self.days[start_datetime[:10]]
+        except KeyError:
+            # outside the term, e.g. an early start class
+            return self.add(
+                datetime.datetime.fromisoformat(start_datetime).date().toordinal())
+
+
+@lru_cache(maxsize=None)
+def format_time(value):
+    """
+    :param value: time part of an ISO datetime, e.g. 09:30:00-07:00
+    :return: the time as Mazevo wants it, e.g. 0930
+    """
+    return datetime.time.fromisoformat(value).strftime("%H%M")
+
+
+class NameParser(object):
+    """
+    Parses R25 event names, space names and event notes, remembering each
+    result for the run since the same few hundred names repeat across tens of
+    thousands of reservations.
+    """
+
+    def __init__(self):
+        self.courses = {}
+        self.spaces = {}
+        self.notes = {}
+        self.hits = Counter()
+        self.misses = Counter()
+
+    def course(self, event_name):
+        """
+        :return: (curric, number, section) from the event name, or None
+        """
+        try:
+            result = self.courses[event_name]
+            self.hits["course"] += 1
+        except KeyError:
+            self.misses["course"] += 1
+            matches = event_pat.match(event_name.strip())
+            result = None if matches is None else matches.group(
+                "curric", "number", "section")
+            self.courses[event_name] = result
+        return result
+
+    def space(self, space_name):
+        """
+        :return: (building, room) from the space name
+        """
+        try:
+            result = self.spaces[space_name]
+            self.hits["space"] += 1
+        except KeyError:
+            self.misses["space"] += 1
+            # Some R25 spaces do not have whitespace between building and
+            # room. First 4 characters are building, rest is room.
+            name = space_name
+            if " " not in name:
+                name = name[:4] + " " + name[4:]
+            matches = room_pat.match(name)
+            result = matches.group("building", "room")
+            self.spaces[space_name] = result
+        return result
+
+    def unlisted(self, event_notes):
+        """
+        :return: whether the event notes ask for the event to be unlisted
+        """
+        if not event_notes:
+            return False
+        try:
+            result = self.notes[event_notes]
+            self.hits["notes"] += 1
+        except KeyError:
+            self.misses["notes"] += 1
+            result = "safecampus" in event_notes.lower()
+            self.notes[event_notes] = result
+        return result
+
+    def __str__(self):
+        return ", ".join(
+            "%s %d%% of %d" % (
+                kind, 100 * self.hits[kind] // (self.hits[kind] + self.misses[kind]),
+                self.hits[kind] + self.misses[kind])
+            for kind in ("course", "space", "notes")
+            if self.hits[kind] + self.misses[kind]
+        ) or "none"
+
+
+def add_reservation(courses, reservation, unlisted_event_ids, calendar, names):
+    """
+    Add one R25 reservation to the courses being built for upload to Mazevo
+
+    :param courses: dict of R25 event_id to Mazevo course, updated in place
+    :param reservation: a uw_r25.models.Reservation from reservations_from_xml
+    :param unlisted_event_ids: R25 event_ids to show as "In use" only
+    :param calendar: TermCalendar of the term being imported
+    :param names: NameParser for the run
+    """
+    # restclients model attributes are slow to read, so read each one once
+    space = reservation.space_reservation
+    if not space:
+        return
+    event_id = int(reservation.event_id)
+    if event_id not in courses:
+        event_name = reservation.event_name
+        parsed = names.course(event_name)
+        if parsed is None:
+            logger.warning(
+                "Unable to determine course from event name {}. Not importing".format(
+                    event_name))
+            return
+        curric, number, section = parsed
+        courses[event_id] = {
+            "courseTitle": reservation.event_title,
+            "subjectCode": curric,
+            "courseNumber": number,
+            "section": section,
+            # "enrollment": reservation.registered_count,
+            "enrollment": "0",
+            "meetingTimesDict": {},
+        }
+        if not courses[event_id]["section"]:
+            logger.warning("Unable to determine section for {}. using '-'".format(
+                event_name))
+            courses[event_id]["section"] = "-"
+        # if not courses[event_id]["enrollment"]:
+        #     courses[event_id]["enrollment"] = "0"
+
+        if event_id in unlisted_event_ids or names.unlisted(reservation.event_notes):
+            """
+            For unlisted meetings, make it show:
+                ----- In use -----
+            Once everything is concatenated together.
+            """
+            courses[event_id]["subjectCode"] = "-"
+            courses[event_id]["courseNumber"] = "-"
+            courses[event_id]["section"] = "-"
+            courses[event_id]["courseTitle"] = "In use -----"
+
+    course = courses[event_id]
+
+    start_datetime = reservation.start_datetime
+    week, day = calendar.day(start_datetime)
+    s_time = format_time(start_datetime[11:])
+    e_time = format_time(reservation.end_datetime[11:])
+
+    building, room = names.space(space.name)
+
+    # meetings on different days in the same week will be
+    # consolidated as long as this data all matches
+    key = (s_time, e_time, building, room)
+
+    weeks = course["meetingTimesDict"].setdefault(key, {})
+    weeks[week] = weeks.get(week, 0) | day
+
+
+def meeting_time(key, first_week, last_week, days, days_of_week):
+    """
+    Expand a run of weeks into the Mazevo meetingTimes format
+
+    :param key: (start time, end time, building, room) of the meeting
+    :param first_week: ordinal of the first week, see TermCalendar
+    :param last_week: ordinal of the last week
+    :param days: day mask, bit 0 for Sunday
+    :param days_of_week: Mazevo day names, starting with Sunday
+    """
+    s_time, e_time, building, room = key
+    meeting = {
+        "startDate": datetime.date.fromordinal(first_week * 7).isoformat(),
+        "endDate": datetime.date.fromordinal(last_week * 7 + 6).isoformat(),
+        "startTime": s_time,
+        "endTime": e_time,
+    }
+    for day, dayname in enumerate(days_of_week):
+        meeting[dayname] = bool(days & DAY_BITS[day])
+    meeting["buildingCode"] = building
+    meeting["roomCode"] = room
+    meeting["instructorName"] = "UNK"
+    return meeting
+
+
+def merge_meeting_weeks(courses, days_of_week):
+    """
+    Merge adjacent weeks with matching schedules into Mazevo meetingTimes
+
+    :param courses: dict of Mazevo courses, updated in place
+    :param days_of_week: Mazevo day names, starting with Sunday
+    :return: the number of meetings
+    """
+    meeting_count = 0
+    for course in courses.values():
+
+        course["meetingTimes"] = []
+
+        for key, weeks in course["meetingTimesDict"].items():
+
+            # make sure we have the weeks in order
+            ordinals = sorted(weeks)
+
+            first = last = ordinals[0]
+            days = weeks[first]
+            for week in ordinals[1:]:
+                # if they're compatible, and contiguous, merge them
+                if week == last + 1 and weeks[week] == days:
+                    last = week
+                    continue
+
+                # done with this run, move it over to meetingTimes
+                course["meetingTimes"].append(
+                    meeting_time(key, first, last, days, days_of_week))
+                first = last = week
+                days = weeks[week]
+
+            # move the final run over to meetingTimes
+            course["meetingTimes"].append(
+                meeting_time(key, first, last, days, days_of_week))
+
+        meeting_count += len(course["meetingTimes"])
+        del course["meetingTimesDict"]
+
+    return meeting_count
+
+
+def payload_hashes(import_term):
+    """
+    Content hashes of a term upload, independent of the order R25 returned the
+    reservations in
+
+    :param import_term: the Mazevo import_term payload
+    :return: hash of the whole payload, and sorted list of course hashes
+    """
+    course_hashes = []
+    for course in import_term["courses"]:
+        meetings = sorted(
+            json.dumps(meeting, sort_keys=True) for meeting in course["meetingTimes"])
+        course_hashes.append(hashlib.sha256(json.dumps(
+            dict(course, meetingTimes=meetings), sort_keys=True).encode()).hexdigest())
+    course_hashes.sort()
+
+    term = {key: value for key, value in import_term.items() if key != "courses"}
+    term_hash = hashlib.sha256(json.dumps(
+        [term, course_hashes], sort_keys=True).encode()).hexdigest()
+
+    return term_hash, course_hashes
+
+
+def changed_courses(old_hashes, new_hashes):
+    """
+    :return: number of courses new or changed since old_hashes, and number
+             changed or removed
+    """
+    old = Counter(old_hashes)
+    new = Counter(new_hashes)
+    return sum((new - old).values()), sum((old - new).values())
+
+
+def write_payloads(path, payloads):
+    """
+    Stream import_term payloads to a JSON file, gzipped if path ends with .gz
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "wt", encoding="utf-8") as f:
+        for chunk in json.JSONEncoder().iterencode(payloads):
+            f.write(chunk)
+
+
+def read_payloads(path):
+    """
+    :return: list of import_term payloads from a file written by write_payloads
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,242 @@
+"""
+Leases on shards of the bookings, so mazevo2r25 can run on several hosts at
+once without two of them writing the same R25 event.
+
+Every worker of a job creates the same shards, then claims them one at a time
+with a conditional update of the lease row. A worker renews its lease as it
+goes. A lease not renewed within the timeout is stale, and another worker may
+take the shard over and start it again. A thread renews the lease while the
+shard syncs, however long one booking takes, and the worker checks the lease
+is still held right before each write to R25, so a worker that lost its shard
+stops before writing anything more.
+"""
+
+import datetime
+import hashlib
+import logging
+import os
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import MazevoSyncLease
+
+
+logger = logging.getLogger(__name__)
+
+# Default seconds after its last heartbeat that a lease may be taken over.
+# Override with settings.MAZEVO_R25_LEASE_TIMEOUT
+LEASE_TIMEOUT = 5 * 60
+
+# Default seconds between heartbeats. Override with
+# settings.MAZEVO_R25_LEASE_HEARTBEAT
+LEASE_HEARTBEAT = 30
+
+
+def booking_shard(booking_id, shards):
+    """
+    :param booking_id: Mazevo booking id
+    :param shards: number of shards
+    :return: the shard the booking belongs to, the same on every host
+    """
+    digest = hashlib.md5(str(booking_id).encode("utf-8")).hexdigest()
+    return int(digest, 16) % shards
+
+
+def worker_name():
+    """
+    :return: a name for this process, unique across hosts
+    """
+    return "{}:{}".format(socket.gethostname(), os.getpid())
+
+
+class ShardLeases(object):
+    """
+    The shards of a job, as seen by one worker
+
+    :param job: name of the job, shared by all of its workers
+    :param shards: number of shards
+    :param worker: name of this worker
+    """
+
+    def __init__(self, job, shards, worker=None):
+        self.job = job
+        self.shards = shards
+        self.worker = worker or worker_name()
+        self.timeout = getattr(settings, "MAZEVO_R25_LEASE_TIMEOUT", LEASE_TIMEOUT)
+        self.interval = getattr(
+            settings, "MAZEVO_R25_LEASE_HEARTBEAT", LEASE_HEARTBEAT)
+
+    def create(self):
+        """
+        Create the job's shards, unless another worker already has
+        """
+        existing = MazevoSyncLease.objects.filter(job=self.job)
+        for lease in existing:
+            if lease.shards != self.shards:
+                raise ValueError("Job {} has {} shards, not {}".format(
+                    self.job, lease.shards, self.shards))
+
+        missing = set(range(self.shards)) - set(
+            lease.shard for lease in existing)
+        for shard in sorted(missing):
+            try:
+                with transaction.atomic():
+                    MazevoSyncLease.objects.create(
+                        job=self.job, shard=shard, shards=self.shards)
+            except IntegrityError:
+                # created by another worker in the meantime
+                pass
+
+    def claim(self):
+        """
+        Claim an unfinished shard that is free or whose lease is stale
+
+        :return: the Lease, or None if there are no shards left to claim
+        """
+        stale = timezone.now() - datetime.timedelta(seconds=self.timeout)
+        candidates = MazevoSyncLease.objects.filter(
+            job=self.job, finished__isnull=True).filter(
+                Q(worker="") | Q(heartbeat__lt=stale))
+        for lease in candidates:
+            # only one worker can change the row from what was read
+            claimed = MazevoSyncLease.objects.filter(
+                pk=lease.pk, worker=lease.worker, heartbeat=lease.heartbeat,
+                finished__isnull=True,
+            ).update(
+                worker=self.worker,
+                heartbeat=timezone.now(),
+                takeovers=F("takeovers") + (1 if lease.worker else 0),
+            )
+            if not claimed:
+                continue
+
+            if lease.worker:
+                logger.warning(
+                    "Took over shard {} of job {} from {}, last seen {}".format(
+                        lease.shard, self.job, lease.worker,
+                        timezone.localtime(lease.heartbeat)))
+            return Lease(self, lease.pk, lease.shard)
+        return None
+
+    def remaining(self):
+        """
+        :return: number of shards of the job not yet finished
+        """
+        return MazevoSyncLease.objects.filter(
+            job=self.job, finished__isnull=True).count()
+
+
+class Lease(object):
+    """
+    A worker's claim on one shard
+
+    :param leases: the ShardLeases it was claimed from
+    :param pk: primary key of the MazevoSyncLease
+    :param shard: the shard claimed
+    """
+
+    def __init__(self, leases, pk, shard):
+        self.leases = leases
+        self.pk = pk
+        self.shard = shard
+        self.renewed = time.time()
+        # set once a renewal finds the lease taken over
+        self.lost = threading.Event()
+
+    def _held(self):
+        return MazevoSyncLease.objects.filter(
+            pk=self.pk, worker=self.leases.worker, finished__isnull=True)
+
+    def held(self):
+        """
+        :return: whether the lease is still held, checked in the database
+        """
+        return not self.lost.is_set() and self._held().exists()
+
+    def renew(self):
+        """
+        Renew the lease now
+
+        :return: whether the lease is still held
+        """
+        if not self._held().update(heartbeat=timezone.now()):
+            self.lost.set()
+            return False
+        self.renewed = time.time()
+        return True
+
+    def heartbeat(self):
+        """
+        Renew the lease, if it's time to
+
+        :return: whether the lease is still held
+        """
+        if time.time() - self.renewed < self.leases.interval:
+            return not self.lost.is_set()
+        return self.renew()
+
+    def keep_alive(self):
+        """
+        :return: a context manager renewing the lease from a thread until it
+                 exits, or until the lease is lost
+        """
+        return LeaseKeeper(self)
+
+    def finish(self):
+        """
+        Mark the shard done
+
+        :return: whether the lease was still held
+        """
+        return bool(self._held().update(finished=timezone.now()))
+
+    def release(self):
+        """
+        Give the shard up, unfinished, for another worker to claim at once
+        """
+        self._held().update(worker="", heartbeat=None)
+
+
+class LeaseKeeper(object):
+    """
+    Renews a lease every heartbeat interval in a daemon thread, so a booking
+    slower than the timeout doesn't let another worker take the shard over
+
+    :param lease: the Lease to renew
+    """
+
+    def __init__(self, lease):
+        self.lease = lease
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def __enter__(self):
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self.lease
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stopped.set()
+        self.thread.join()
+        self.thread = None
+
+    def _run(self):
+        try:
+            while not self.stopped.wait(self.lease.leases.interval):
+                try:
+                    if not self.lease.renew():
+                        return
+                except Exception as ex:
+                    # tried again next interval; a write checks the lease first
+                    logger.warning("Unable to renew the lease on shard {}: {}".format(
+                        self.lease.shard, ex))
+        finally:
+            # the thread's own database connection
+            connection.close()
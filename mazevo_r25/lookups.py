@@ -0,0 +1,211 @@
+"""
+Id and name lists from R25 and Mazevo, for the admin.
+
+Lists are shared between processes through the R25 reference data cache, and
+each process indexes them for searching. The admin never waits for R25 or
+Mazevo: a stale list is shown while a fresh one is fetched in the background,
+and the warm_lookups command fills the cache ahead of time.
+
+The Mazevo and R25 clients are only imported when a list is fetched, so that
+loading the models and the admin doesn't pay for them.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import threading
+import time
+
+from .cache import cache_generation_key, cache_ttl, get_cache, invalidate_cache
+
+
+logger = logging.getLogger(__name__)
+
+# Default lifetime, in seconds, of lists that have no R25 cache TTL, e.g. those
+# from Mazevo. Override per list with settings.MAZEVO_R25_CACHE_TTLS
+LOOKUP_TTL = 60 * 60
+
+# Seconds a process uses its own index before checking the shared cache again
+LOOKUP_CHECK_INTERVAL = 60
+
+
+class Lookup(object):
+    """
+    An id and name list, indexed for searching
+
+    :param endpoint: where the list comes from, e.g. "spaces.xml"
+    :param load: function returning a dict of names by id
+    """
+
+    def __init__(self, endpoint, load):
+        self.endpoint = endpoint
+        self.load = load
+        self.lock = threading.Lock()
+        # (items, index, fetched), replaced as a whole
+        self.data = None
+        self.checked = 0
+        self.warming = None
+
+    def _key(self):
+        generation = get_cache().get(cache_generation_key(self.endpoint), 0)
+        return "mazevo_r25:lookup:{}:{}".format(self.endpoint, generation)
+
+    def _set_data(self, items, fetched):
+        # search keys of "name id", which also sort by name
+        index = sorted(
+            ("{} {}".format(name or "", id).lower(), id)
+            for id, name in items.items())
+        self.data = (items, index, fetched)
+        self.checked = time.time()
+
+    def warm(self):
+        """
+        Fetch the list and share it through the cache
+
+        :return: dict of names by id
+        """
+        items = self.load()
+        fetched = time.time()
+        # kept until replaced, so there is always a stale copy to show
+        get_cache().set(self._key(), {"value": items, "fetched": fetched}, None)
+        self._set_data(items, fetched)
+        return items
+
+    def warm_in_background(self):
+        """
+        Fetch the list in a thread, unless that's already happening
+        """
+        with self.lock:
+            if self.warming:
+                return
+            self.warming = threading.Thread(target=self._warm_quietly, daemon=True)
+        self.warming.start()
+
+    def _warm_quietly(self):
+        try:
+            self.warm()
+        except Exception as ex:
+            logger.warning("Unable to fetch {}: {}".format(self.endpoint, ex))
+        finally:
+            with self.lock:
+                self.warming = None
+
+    def _get_data(self, wait):
+        data = self.data
+        if data and time.time() - self.checked < LOOKUP_CHECK_INTERVAL:
+            return data
+
+        cached = get_cache().get(self._key())
+        if cached is None:
+            if wait and not data:
+                self.warm()
+                return self.data
+            self.warm_in_background()
+            return data or ({}, [], 0)
+
+        if not data or cached["fetched"] != data[2]:
+            self._set_data(cached["value"], cached["fetched"])
+        else:
+            self.checked = time.time()
+        if time.time() - cached["fetched"] >= (cache_ttl(self.endpoint) or LOOKUP_TTL):
+            self.warm_in_background()
+        return self.data
+
+    def names(self, wait=True):
+        """
+        :param wait: whether to fetch the list if it has never been fetched;
+                     otherwise an empty dict is returned while it is fetched
+        :return: dict of names by id
+        """
+        return self._get_data(wait)[0]
+
+    def label(self, id):
+        """
+        :return: "id (name)" as shown in the admin
+        """
+        return "{} ({})".format(id, self.names(wait=False).get(id, ""))
+
+    def search(self, term, offset=0, limit=20, wait=True):
+        """
+        Find items whose id or name contains every word of the search term
+
+        :param term: search term
+        :param offset: number of matches to skip
+        :param limit: maximum number of matches to return
+        :param wait: as for names()
+        :return: list of (id, name) ordered by name, and whether there are more
+        """
+        items, index, fetched = self._get_data(wait)
+        words = term.lower().split()
+        matches = []
+        for key, id in index:
+            if all(word in key for word in words):
+                matches.append((id, items[id]))
+                if len(matches) > offset + limit:
+                    break
+        return matches[offset:offset + limit], len(matches) > offset + limit
+
+    def refresh(self):
+        """
+        Fetch the list again. Every process keeps using its current list until
+        the new one is in the cache.
+        """
+        invalidate_cache(self.endpoint)
+        self.checked = 0
+        self.warm_in_background()
+
+
+def get_room_names():
+    from uw_mazevo.api import PublicConfiguration
+
+    return OrderedDict(
+        (room.id, room.description) for room in PublicConfiguration().get_rooms())
+
+
+def get_status_names():
+    from uw_mazevo.api import PublicConfiguration
+
+    return OrderedDict(
+        (status.id, status.description)
+        for status in PublicConfiguration().get_statuses())
+
+
+def get_space_names():
+    from .more_r25 import get_space_list
+
+    return get_space_list()
+
+
+def get_event_type_names():
+    from .more_r25 import get_event_type_list
+
+    return get_event_type_list(all_types="T")
+
+
+room_lookup = Lookup("PublicConfiguration/Rooms", get_room_names)
+
+status_lookup = Lookup("PublicConfiguration/Statuses", get_status_names)
+
+space_lookup = Lookup("spaces.xml", get_space_names)
+
+event_type_lookup = Lookup("evtype.xml", get_event_type_names)
+
+LOOKUPS = [room_lookup, status_lookup, space_lookup, event_type_lookup]
+
+
+def warm_lookups():
+    """
+    Fetch every list at the same time
+
+    :return: dict of the number of items, or the exception raised, by endpoint
+    """
+    def warm(lookup):
+        try:
+            return len(lookup.warm())
+        except Exception as ex:
+            logger.warning("Unable to fetch {}: {}".format(lookup.endpoint, ex))
+            return ex
+
+    with ThreadPoolExecutor(max_workers=len(LOOKUPS)) as executor:
+        results = executor.map(warm, LOOKUPS)
+        return dict(zip([lookup.endpoint for lookup in LOOKUPS], results))
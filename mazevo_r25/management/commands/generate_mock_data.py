@@ -0,0 +1,80 @@
+import logging
+import sys
+
+from dateutil.parser import parse
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from mazevo_r25.mock_data import MockDataGenerator
+
+
+logger = logging.getLogger("mazevo_r25")
+
+
+class Command(BaseCommand):
+    help = "generates large synthetic mock data for local benchmarking"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            help="Directory to write mock data to. Point MAZEVO_R25_MOCK_DATA here.",
+        )
+        parser.add_argument(
+            "-b",
+            "--bookings",
+            type=int,
+            default=10000,
+            help="Number of Mazevo bookings. Default is 10000.",
+        )
+        parser.add_argument(
+            "-c",
+            "--sections",
+            type=int,
+            default=2000,
+            help="Number of R25 course sections. Default is 2000.",
+        )
+        parser.add_argument(
+            "-r",
+            "--rooms",
+            type=int,
+            default=300,
+            help="Number of rooms/spaces. Default is 300.",
+        )
+        parser.add_argument(
+            "-s",
+            "--start",
+            help="Start of the term window, matching the term r25_mazevo will use",
+        )
+        parser.add_argument(
+            "-e",
+            "--end",
+            help="End of the term window, matching the term r25_mazevo will use",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Random seed, so the same data can be generated again",
+        )
+
+    def handle(self, *args, **options):
+        logger.addHandler(logging.StreamHandler(sys.stdout))
+        logger.setLevel(logging.INFO)
+
+        generator = MockDataGenerator(
+            options["path"],
+            seed=options["seed"],
+            rooms=options["rooms"],
+            start_date=parse(options["start"]).date() if options["start"] else None,
+            end_date=parse(options["end"]).date() if options["end"] else None,
+            event_type_ids=settings.MAZEVO_R25_EVENTTYPES_ACADEMIC_IMPORT,
+            category_ids=getattr(settings, "MAZEVO_R25_CATEGORIES_UNLISTED", ["1"]),
+        )
+
+        generator.write_spaces()
+        logger.info("Wrote {} spaces".format(len(generator.spaces)))
+        count = generator.write_reservations(sections=options["sections"])
+        logger.info("Wrote {} reservations from {} to {}".format(
+            count, generator.start_date, generator.end_date))
+        count = generator.write_bookings(count=options["bookings"])
+        logger.info("Wrote {} bookings".format(count))
@@ -1,5 +1,4 @@
 import datetime
-from io import StringIO
 import logging
 import re
 import requests
@@ -11,34 +10,34 @@ import unicodedata
 from dateutil.parser import parse
 from django.conf import settings
 from django.core.mail import send_mail
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from lxml.etree import XMLSyntaxError
 from restclients_core.exceptions import DataFailureException
-from restclients_core.util.retry import retry
 from urllib3.exceptions import InsecureRequestWarning
 from uw_mazevo.api import PublicConfiguration, PublicEvent
-from uw_r25.events import get_event_by_id, get_events
 from uw_r25.models import Event, Reservation, Space
 
-from mazevo_r25.models import MazevoStatusMap
+from mazevo_r25.leases import ShardLeases, booking_shard
+from mazevo_r25.models import MazevoStatusMap, MazevoSyncRun
 from mazevo_r25.more_r25 import (
+    circuit_breaker,
     delete_event,
+    get_event_by_id,
+    get_events,
+    request_stats,
+    retry_policy,
     update_event,
     R25MessageException,
     R25ErrorException,
     TooManyRequestsException,
 )
+from mazevo_r25.profiling import PROFILE_TOP
+from mazevo_r25.runs import RunRecorder
 from mazevo_r25.utils import update_get_space_ids, update_get_status_map
 
 
 logger = logging.getLogger("mazevo_r25")
 
-# save warnings to mail out after execution
-msg_stream = StringIO()
-msg_handler = logging.StreamHandler(stream=msg_stream)
-msg_handler.setLevel(logging.WARNING)
-logger.addHandler(msg_handler)
-
 
 class Command(BaseCommand):
     help = "adds or updates R25 events with events from Mazevo"
@@ -114,15 +113,47 @@ class Command(BaseCommand):
             action="store_true",
             help="Update R25 Events",
         )
-
-    @retry(DataFailureException, status_codes=[0, 429, 500])
-    def get_events(self, **kwargs):
-        return get_events(**kwargs)
+        parser.add_argument(
+            "--shards",
+            type=int,
+            help="Split the bookings into this many shards, and sync the shards "
+                 "of JOB not yet claimed by another worker. Run on several hosts "
+                 "at once with the same JOB and SHARDS.",
+        )
+        parser.add_argument(
+            "--job",
+            help="Name of the sharded job, unique to this resync",
+        )
+        parser.add_argument(
+            "--profile",
+            metavar="PATH",
+            help="Profile the run with cProfile, writing the stats to PATH and "
+                 "listing the functions taking the most time in each phase",
+        )
+        parser.add_argument(
+            "--profile-top",
+            type=int,
+            help="Number of functions to list for each phase. Default is {}."
+                 .format(PROFILE_TOP),
+        )
 
     def handle(self, *args, **options):
+        if options["shards"] is not None and options["shards"] < 1:
+            raise CommandError("--shards must be at least 1")
+        if bool(options["shards"]) != bool(options["job"]):
+            raise CommandError("--shards and --job must be given together")
+
+        with RunRecorder(MazevoSyncRun.COMMAND_MAZEVO2R25, options, logger) as run:
+            self.sync(run, options)
+
+    def sync(self, run, options):
         start_time = time.time()
 
         self.set_logger(options.get("verbosity"))
+        retry_policy.reset()
+        circuit_breaker.reset()
+        request_stats.reset()
+        run.phase("configuration")
 
         if options["changed"] and not options["end"]:
             options["end"] = "max"
@@ -144,6 +175,7 @@ class Command(BaseCommand):
             else:
                 changed_date = parse(options["changed"]).date()
             logger.info("\tand changed since %s" % (changed_date))
+        run.window(start_date, end_date)
 
         if settings.DEBUG:
             requests.urllib3.disable_warnings(InsecureRequestWarning)
@@ -175,6 +207,8 @@ class Command(BaseCommand):
             end_date = datetime.datetime.combine(
                 end_date, datetime.datetime.min.time()).astimezone()
 
+        run.phase("bookings")
+
         # Get all bookings in range, regardless of room, status, or event type.
         # We do this because a now-unwanted booking might already have been
         # Created in R25, and we need to cancel it there.
@@ -208,12 +242,119 @@ class Command(BaseCommand):
                 statusIds=search_statuses,
             )
         logger.info("Found %d bookings" % len(bookings))
+        run.phase("sync")
+
+        if options["shards"]:
+            self.sync_shards(run, options, bookings, statuses, status_map, space_ids)
+        else:
+            self.sync_bookings(run, options, bookings, statuses, status_map, space_ids)
+
+        logger.info("R25 retries: {}".format(retry_policy))
+        logger.info("R25 circuit: {}".format(circuit_breaker))
+        run.phase("report")
+
+        # send email of the warnings logged during the run
+        messages = str(run.report)
+        if options["update"] and len(messages) > 0:
+            try:
+                send_mail(
+                    "Mazevo2R25 report",
+                    messages,
+                    settings.MAZEVO_R25_EMAIL_HOST_USER,
+                    settings.MAZEVO_R25_EMAIL_RECIPIENTS,
+                    fail_silently=False,
+                    auth_user=settings.MAZEVO_R25_EMAIL_HOST_USER,
+                    auth_password=settings.MAZEVO_R25_EMAIL_HOST_PASSWORD,
+                )
+            except Exception:
+                print("Email not configured. Mazevo2R25 report:")
+                print(messages)
+
+        logger.debug("time: {}".format(time.time() - start_time))
+
+    def sync_shards(self, run, options, bookings, statuses, status_map, space_ids):
+        """
+        Claim shards of the job one at a time, and sync their bookings
+        """
+        leases = ShardLeases(options["job"], options["shards"])
+        try:
+            leases.create()
+        except ValueError as ex:
+            raise CommandError(ex)
+
+        while True:
+            lease = leases.claim()
+            if lease is None:
+                break
+            shard_bookings = [
+                booking for booking in bookings
+                if booking_shard(booking.id, leases.shards) == lease.shard]
+            logger.info("Claimed shard %d of job %s: %d bookings" % (
+                lease.shard, leases.job, len(shard_bookings)))
+            try:
+                with lease.keep_alive():
+                    completed = self.sync_bookings(
+                        run, options, shard_bookings, statuses, status_map, space_ids,
+                        lease)
+            except BaseException:
+                lease.release()
+                raise
+
+            if completed:
+                if not lease.finish():
+                    logger.warning("Lost the lease on shard %d before finishing it"
+                                   % lease.shard)
+            elif circuit_breaker.is_open():
+                # leave the rest for when R25 is back
+                lease.release()
+                break
+
+        logger.info("%d shards of job %s left to finish" % (
+            leases.remaining(), leases.job))
+
+    def leave_shard(self, run, lease, bookings, current_num):
+        """
+        Skip the rest of a shard another worker has taken over
+
+        :param current_num: position of the booking not yet written, from 1
+        """
+        remaining = len(bookings) - current_num + 1
+        logger.error(
+            "Lost the lease on shard %d, leaving remaining %d of %d bookings to its "
+            "new worker" % (lease.shard, remaining, len(bookings))
+        )
+        run.count("skipped", remaining)
+
+    def sync_bookings(self, run, options, bookings, statuses, status_map, space_ids,
+                      lease=None):
+        """
+        Sync Mazevo bookings to R25 events
+
+        :param lease: the Lease on the shard the bookings are from, if sharded
+        :return: whether every booking was processed
+        """
+        run.count("seen", len(bookings))
 
         mazevo_events = {}
         current_num = 0
         for booking in bookings:
             current_num += 1
 
+            if circuit_breaker.is_open():
+                # Don't hammer a dead server once per booking
+                logger.error(
+                    "R25 appears to be down after %d consecutive failures, skipping "
+                    "remaining %d of %d bookings. Last error: %s"
+                    % (circuit_breaker.failures, len(bookings) - current_num + 1,
+                       len(bookings), circuit_breaker.last_error)
+                )
+                run.count("skipped", len(bookings) - current_num + 1)
+                return False
+
+            if lease and lease.lost.is_set():
+                self.leave_shard(run, lease, bookings, current_num)
+                return False
+
             booking.status = statuses[booking.status_id]
             booking.mapped_status = status_map[booking.status_id]
             booking.space_id = space_ids.get(booking.room_id).space_id
@@ -255,7 +396,7 @@ class Command(BaseCommand):
             r25_event = None
             try:
 
-                events = self.get_events(
+                events = get_events(
                     starts_with="%d_" % booking.id,
                     scope="extended",
                     include="reservations",
@@ -272,6 +413,9 @@ class Command(BaseCommand):
                                 "reservation %s: %s" % (event.event_id, event.name)
                             )
                             if options["update"]:
+                                if lease and not lease.held():
+                                    self.leave_shard(run, lease, bookings, current_num)
+                                    return False
                                 logger.debug("\tDeleting!")
                                 delete_event(event.event_id)
                         else:
@@ -291,6 +435,7 @@ class Command(BaseCommand):
                     "Error retrieving R25 Event, skipping "
                     "Booking %s (%s): %s" % (booking.id, booking.event_number, ex)
                 )
+                run.count("errors")
                 continue
             except XMLSyntaxError as ex:
                 # Bad response from R25 server - usually means outage
@@ -298,14 +443,20 @@ class Command(BaseCommand):
                     "XML Error retrieving R25 Event, skipping "
                     "Booking %s (%s): %s" % (booking.id, booking.event_number, ex)
                 )
+                run.count("errors")
                 continue
 
             if options["delete"]:
                 if r25_event:
+                    if lease and not lease.held():
+                        self.leave_shard(run, lease, bookings, current_num)
+                        return False
                     logger.debug("\tDeleting!")
                     delete_event(r25_event.event_id)
+                    run.count("cancelled")
                 else:
                     logger.debug("\tNothing to delete.")
+                    run.count("skipped")
                 continue
 
             wanted_booking = True
@@ -325,6 +476,7 @@ class Command(BaseCommand):
                 # Do we even want in r25?
                 if not wanted_booking:
                     logger.debug("\t\tGood")
+                    run.count("skipped")
                     continue
 
                 # Need to create r25 event
@@ -341,6 +493,7 @@ class Command(BaseCommand):
 
                 # Don't bother updating it
                 logger.debug("\tSkipping update of already cancelled event")
+                run.count("skipped")
                 continue
 
             event_name = booking.event_name
@@ -425,16 +578,31 @@ class Command(BaseCommand):
                     r25_res.space_reservation.space_id = booking.space_id
                 # r25_res.space_reservation = None
 
+            if not wanted_booking:
+                change = "cancelled"
+            elif r25_event.event_id is None:
+                change = "created"
+            else:
+                change = "updated"
+
             # by default, don't actually make changes
             if not options["update"]:
+                logger.debug("\tWould have %s event" % change)
+                run.count("skipped")
                 continue
 
+            if lease and not lease.held():
+                self.leave_shard(run, lease, bookings, current_num)
+                return False
+
             try:
                 logger.debug("\tUpdating event")
                 updated = update_event(r25_event)
                 logger.debug("\t\tUpdated event %s" % updated.event_id)
+                run.count(change)
 
             except R25MessageException as ex:
+                run.count("errors")
                 while ex:
                     if ex.msg_id == "EV_I_SPACECON":
                         logger.warning(
@@ -464,38 +632,24 @@ class Command(BaseCommand):
                     ex = ex.next_msg
 
             except R25ErrorException as ex:
+                run.count("errors")
                 logger.warning(
                     "R25 error while syncing Mazevo Booking %s (%s) to R25 Event %s: "
                     "%s" % (booking.id, booking.event_number, r25_event.event_id, ex)
                 )
 
             except DataFailureException as ex:
+                run.count("errors")
                 logger.warning(
                     "HTTP error while syncing Mazevo Booking %s (%s) to R25 Event %s: "
                     "%s" % (booking.id, booking.event_number, r25_event.event_id, ex)
                 )
 
             except TooManyRequestsException:
+                run.count("errors")
                 logger.warning(
                     "Too Many Requests while syncing Mazevo Booking %s (%s) to R25 "
                     "Event %s" % (booking.id, booking.event_number, r25_event.event_id)
                 )
 
-        # send email
-        messages = msg_stream.getvalue()
-        if options["update"] and len(messages) > 0:
-            try:
-                send_mail(
-                    "Mazevo2R25 report",
-                    messages,
-                    settings.MAZEVO_R25_EMAIL_HOST_USER,
-                    settings.MAZEVO_R25_EMAIL_RECIPIENTS,
-                    fail_silently=False,
-                    auth_user=settings.MAZEVO_R25_EMAIL_HOST_USER,
-                    auth_password=settings.MAZEVO_R25_EMAIL_HOST_PASSWORD,
-                )
-            except Exception:
-                print("Email not configured. Mazevo2R25 report:")
-                print(messages)
-
-        logger.debug("time: {}".format(time.time() - start_time))
+        return True
@@ -1,95 +1,34 @@
-from collections import Counter
-from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import datetime
-from io import StringIO
+import itertools
 import logging
+import queue
 import re
 import sys
 
 from django.conf import settings
 from django.core.mail import send_mail
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from restclients_core.exceptions import DataFailureException
 from uw_mazevo.api import PublicCourses
-from uw_sws.term import (get_current_term, get_next_term, get_term_after,
-                         get_term_before, get_term_by_year_and_quarter)
 from uw_r25.models import Event, Reservation
 
-from mazevo_r25.more_r25 import get_event_list, get_reservations_attrs
+from mazevo_r25.courses import (NameParser, TermCalendar, add_reservation,
+                                changed_courses, merge_meeting_weeks,
+                                payload_hashes, read_payloads, write_payloads)
+from mazevo_r25.models import MazevoSyncRun, MazevoTermUpload
+from mazevo_r25.more_r25 import (Object, circuit_breaker, get_event_list,
+                                 get_favorites, get_reservations_attrs,
+                                 get_reservations_data,
+                                 request_stats, reservation_records_from_data,
+                                 retry_policy, space_shards)
+from mazevo_r25.profiling import PROFILE_TOP
+from mazevo_r25.runs import RunRecorder
+from mazevo_r25.terms import (get_current_term, get_next_term, get_term_after,
+                              get_term_before, get_term_by_year_and_quarter)
 
 logger = logging.getLogger("r25_mazevo")
 
-# save warnings to mail out after execution
-msg_stream = StringIO()
-msg_handler = logging.StreamHandler(stream=msg_stream)
-msg_handler.setLevel(logging.WARNING)
-logger.addHandler(msg_handler)
-
-"""
-# There's a variety of formats to look out for when matching course names in R25.
-# Here's some examples of ones we currently handle:
-*ASL 302 A ASL302A 20251
-*BIO A 206 A BIOA206A 20251
-*BIO A 344 A XL BIOA344A 20251
-A A 210 A AA210A 20251
-ACADEM 198 AA ACADEM198AA 20251
-AFRAM 241 A XL AFRAM241A 20251
-*CS&SS 221 A XL CS&SS221A 20251
-*EXAM: AMATH 502 A XL AMATH502A 20251
-*AMATH 502 A XL AMATH502A 20251
-EXAM:* STAT 391 A XL STAT391A 20251
-
-# These are for rooms on hold in advance of the actual TS import
-INFO 201 A /AUT25 Large Lecture
-MUSEN 350/550/AUT25 Large Lecture               # No section!
-STAT/SOC/CS&SS 221 /AUT25 Large Lecture         # No section!
-STAT/SOC /CS&SS 221 / WIN26 Large Lect          # extra space in currics
-+RADGY 693 A 2026 [#45525]
-
-# breakout/review?
-STAT-394-A / MATH-394-A
-
-# other extras
-WIN26- ME 520 A Setup
-"""
-event_pat = re.compile(
-    r"""
-    ^                               # start at beginning
-    (?:\*|\+?)                      # optional asterisk or plus
-    (?:(WIN|SPR|SUM|AUT)\d\d-\ )?   # quarter prefix
-    (?P<exam>EXAM:\*?\ )?           # it's an exam, and another asterisk?
-    (?P<curric>[A-Z &]+?)           # curric abbrev, can contain space, &
-    (?:\ ?\/                        # slash separator, maybe an extra space
-     (?P<curric2>[A-Z &]+?))?       # second curric
-    (?:\ ?\/                        # slash separator, maybe an extra space
-     (?P<curric3>[A-Z &]+?))?       # third curric
-    [ -]                            # space or dash separator
-    (?P<number>\d{3})               # course number, 3 digits
-    (?:\/                           # slash separator
-     (?P<number2>\d{3}))?           # second number
-    [ -]*                           # optional space or dash separator
-    (?P<section>\w{0,2})            # section, 1 or 2 letters, or absent
-                                    # rest is ignored
-    """, re.VERBOSE)
-
-"""
-# some room names to match
-BAG  260
-HST T568
-SWS  026-030
-CSE2 G20
-GNOMS060
-HSB BB1404
-"""
-room_pat = re.compile(
-    r"""
-    ^                               # start at beginning
-    (?P<building>[A-Z0-9]{,4}?)     # building code, 4 chars or less
-    [ ]*                            # optional space separator
-    (?P<room>[A-Z]{0,2}\d{2,4}[A-Z]?) # room number, 2 to 4 digits
-    (?:-.*)?                        # combined room number, ignore it
-    $                               # end at end
-    """, re.VERBOSE)
-
 
 class Command(BaseCommand):
     help = "Get course data from R25 and upload it to Mazevo"
@@ -118,30 +57,77 @@ class Command(BaseCommand):
     def __init__(self, logger=None, *args, **kwargs):
         super(Command, self).__init__(*args, **kwargs)
         self.logger = logger or logging.getLogger(__name__)
+        self.parse_pool = None
 
     def add_arguments(self, parser):
         parser.add_argument(
             "-t",
             "--term",
             default="0",
-            help="Single digit <n> for <n>th next term. Default is 0 (current term)",
+            help="Single digit <n> for <n>th next term. Default is 0 (current term). "
+                 "Several terms can be given as 0,1,2 or 0-2",
+        )
+        parser.add_argument(
+            "-f",
+            "--force",
+            action="store_true",
+            help="Upload even if nothing changed since the last upload",
+        )
+        parser.add_argument(
+            "--shards",
+            type=int,
+            default=0,
+            help="Split the favorite spaces into this many shards and scan them "
+                 "concurrently. Default is 0, one scan of all favorite spaces",
+        )
+        parser.add_argument(
+            "--parse-workers",
+            type=int,
+            default=0,
+            help="Parse reservation pages in this many worker processes. "
+                 "Default is 0, parse them in the thread that fetched them",
+        )
+        parser.add_argument(
+            "--export",
+            metavar="PATH",
+            help="Write the assembled payloads to this file instead of uploading "
+                 "them. Gzipped if PATH ends with .gz",
+        )
+        parser.add_argument(
+            "--import-file",
+            metavar="PATH",
+            help="Upload the payloads in this file, written by --export, instead "
+                 "of scanning R25",
+        )
+        parser.add_argument(
+            "--profile",
+            metavar="PATH",
+            help="Profile the run with cProfile, writing the stats to PATH and "
+                 "listing the functions taking the most time in each phase",
+        )
+        parser.add_argument(
+            "--profile-top",
+            type=int,
+            help="Number of functions to list for each phase. Default is {}."
+                 .format(PROFILE_TOP),
         )
 
-    def handle(self, *args, **options):
-
-        self.set_logger(options.get("verbosity"))
-
-        if options["term"] == "afternext":
+    def get_term(self, spec):
+        """
+        :param spec: the --term option, for a single term
+        :return: uw_sws.models.Term
+        """
+        if spec == "afternext":
             term = get_term_after(get_next_term())
-        elif options["term"] == "next":
+        elif spec == "next":
             term = get_next_term()
-        elif len(options["term"]) < 2 and options["term"].isnumeric():
+        elif len(spec) < 2 and spec.isnumeric():
             # get <n> terms ahead (current term is 0)
             term = get_current_term()
-            for i in range(int(options["term"])):
+            for i in range(int(spec)):
                 term = get_term_after(term)
-        elif options["term"]:
-            first, second = re.split(r'\W', options["term"])
+        elif spec:
+            first, second = re.split(r'\W', spec)
             if first.isdigit():
                 year = first
                 quarter = second
@@ -152,12 +138,34 @@ class Command(BaseCommand):
         else:
             term = get_current_term()
 
+        return term
+
+    def get_term_specs(self, spec):
+        """
+        Split the --term option into single term specs
+
+        :return: list of specs for get_term
+        """
+        if re.match(r"^\d-\d$", spec):
+            first, last = spec.split("-")
+            return [str(n) for n in range(int(first), int(last) + 1)]
+        specs = spec.split(",")
+        if len(specs) > 1 and all(
+                s in ("next", "afternext") or (len(s) < 2 and s.isnumeric())
+                for s in specs):
+            return specs
+        return [spec]
+
+    def get_import_term(self, term):
+        """
+        :return: the Mazevo import_term payload for the term, without courses
+        """
         prev_term = get_term_before(term)
 
         # import_term is the data structure we upload to Mazevo.
         # By coincidence, this format of startDate and endDate also works for the R25
         # API, so we re-use it in those queries.
-        import_term = {
+        return {
             "termDescription": "{} {}".format(term.quarter, term.year).title(),
             # can't use term.first_day_quarter because of early start classes
             "startDate": (
@@ -166,11 +174,220 @@ class Command(BaseCommand):
             "endDate": term.last_final_exam_date.isoformat(),
         }
 
-        logger.info("Retrieving R25 reservations for {}: {} - {}".format(
-            import_term["termDescription"],
-            import_term["startDate"], import_term["endDate"]))
+    def get_reservations_page(self, start_date, end_date, paginate, page,
+                              space_ids=None):
+        """
+        :param space_ids: spaces to scan, instead of all favorite spaces
+        :return: one page of the course reservations, and its attributes
+        """
+        if space_ids:
+            spaces = {"space_id": "+".join(str(s) for s in space_ids)}
+        else:
+            spaces = {"space_favorite": "T"}
+        query = dict(
+            event_type_id="+".join(settings.MAZEVO_R25_EVENTTYPES_ACADEMIC_IMPORT),
+            **spaces,
+            space_match="occurrence",
+            state="+".join([Reservation.STANDARD_STATE,
+                            Reservation.EXCEPTION_STATE,
+                            Reservation.WARNING_STATE,
+                            Reservation.OVERRIDE_STATE]),
+            start_dt=start_date,
+            end_dt=end_date,
+            paginate=paginate, page=page, page_size=1000)
+
+        if not self.parse_pool:
+            return get_reservations_attrs(**query)
+
+        # parse in another process, while this thread waits
+        url, data = get_reservations_data(**query)
+        try:
+            result = self.parse_pool.submit(
+                reservation_records_from_data, url, data).result()
+        except DataFailureException as ex:
+            circuit_breaker.record_failure(ex)
+            raise
+        circuit_breaker.record_success()
+        return result
+
+    def handle(self, *args, **options):
+        for name in ("shards", "parse_workers"):
+            if options[name] < 0:
+                raise CommandError("--{} can't be negative".format(
+                    name.replace("_", "-")))
+
+        # stale term data from SWS is worth reporting, though logged elsewhere
+        with RunRecorder(MazevoSyncRun.COMMAND_R25_MAZEVO, options, logger,
+                         [logging.getLogger("mazevo_r25.terms")]) as run:
+            self.sync(run, options)
+
+    def sync(self, run, options):
+
+        self.set_logger(options.get("verbosity"))
+        retry_policy.reset()
+        circuit_breaker.reset()
+        request_stats.reset()
+
+        if options["import_file"]:
+            run.phase("import")
+            payloads = read_payloads(options["import_file"])
+            logger.info("Read {} from {}".format(
+                ", ".join(payload["termDescription"] for payload in payloads),
+                options["import_file"]))
+        else:
+            if options["parse_workers"]:
+                self.parse_pool = ProcessPoolExecutor(options["parse_workers"])
+                # start the workers now, before any threads exist to fork
+                self.parse_pool.submit(int).result()
+            try:
+                payloads = self.build_payloads(
+                    run, options["term"], options["shards"])
+            finally:
+                if self.parse_pool:
+                    self.parse_pool.shutdown()
+                    self.parse_pool = None
+
+        if payloads:
+            run.window(min(payload["startDate"] for payload in payloads),
+                       max(payload["endDate"] for payload in payloads))
+
+        if options["export"]:
+            run.phase("export")
+            write_payloads(options["export"], payloads)
+            logger.info("Wrote {} to {}".format(
+                ", ".join(payload["termDescription"] for payload in payloads),
+                options["export"]))
+        else:
+            run.phase("upload")
+            self.upload_payloads(run, payloads, options["force"])
+
+        run.phase("report")
+        self.send_report(run.report, payloads)
+
+    def scan_pages(self, executor, start_date, end_date):
+        """
+        Scan the course reservations in all favorite spaces, fetching each page
+        while the previous one is processed
+
+        :return: generator of ("", reservations, attrs) for each page
+        """
+        page = 1
+        page_future = executor.submit(
+            self.get_reservations_page, start_date, end_date, "T", page)
+
+        while True:
+            (reservations, attrs) = page_future.result()
+
+            # Last page? If not, fetch the next while we process this one
+            last_page = not int(attrs["page_num"]) < int(attrs["page_count"])
+            if not last_page:
+                page += 1
+                page_future = executor.submit(
+                    self.get_reservations_page, start_date, end_date,
+                    attrs["paginate_key"], page)
+
+            yield "", reservations, attrs
+
+            if last_page:
+                return
+
+    def scan_shards(self, executor, start_date, end_date, shards):
+        """
+        Split the favorite spaces into shards and scan each concurrently
+
+        :return: generator of (shard label, reservations, attrs) for each page,
+                 in the order they arrive
+        """
+        space_ids = get_favorites(Object.SPACE_TYPE).keys()
+        shard_ids = space_shards(space_ids, shards)
+        logger.info("Scanning {} favorite spaces in {} shards".format(
+            len(space_ids), len(shard_ids)))
 
-        courses = {}
+        pages = queue.Queue()
+
+        def scan(label, space_ids):
+            try:
+                paginate = "T"
+                page = 1
+                while True:
+                    (reservations, attrs) = self.get_reservations_page(
+                        start_date, end_date, paginate, page, space_ids)
+                    pages.put((label, reservations, attrs))
+                    if not int(attrs["page_num"]) < int(attrs["page_count"]):
+                        break
+                    paginate = attrs["paginate_key"]
+                    page += 1
+            finally:
+                # always tell the consumer this shard is finished
+                pages.put((label, None, None))
+
+        futures = [
+            executor.submit(scan, "shard {}/{} ".format(n, len(shard_ids)), ids)
+            for n, ids in enumerate(shard_ids, 1)
+        ]
+
+        remaining = len(futures)
+        while remaining:
+            label, reservations, attrs = pages.get()
+            if attrs is None:
+                remaining -= 1
+                continue
+            yield label, reservations, attrs
+
+        # raise the first failure, if any shard failed
+        for future in futures:
+            future.result()
+
+    def build_payloads(self, run, term_option, shards=0):
+        """
+        Scan R25 for the course reservations of the terms and assemble them
+        into Mazevo import_term payloads
+
+        :param run: RunRecorder for the phases and the reservations seen
+        :param term_option: the --term option
+        :param shards: number of space shards to scan concurrently, or 0 to scan
+                       all favorite spaces in one query
+        :return: list of import_term payloads, skipping terms without meetings
+        """
+        run.phase("terms")
+
+        # Resolve the terms concurrently, they don't depend on each other
+        import_terms = []
+        with ThreadPoolExecutor() as executor:
+            for import_term in executor.map(
+                    lambda spec: self.get_import_term(self.get_term(spec)),
+                    self.get_term_specs(term_option)):
+                if import_term not in import_terms:
+                    import_terms.append(import_term)
+        import_terms.sort(key=lambda import_term: import_term["startDate"])
+
+        # Adjacent terms share a boundary, so one scan covers each run of them.
+        # Terms with a gap between them are scanned separately, so that the
+        # gap's reservations aren't scanned at all
+        windows = []
+        for import_term in import_terms:
+            day_before = (datetime.date.fromisoformat(import_term["startDate"])
+                          - datetime.timedelta(days=1)).isoformat()
+            if windows and windows[-1][1] >= day_before:
+                windows[-1][1] = max(windows[-1][1], import_term["endDate"])
+            else:
+                windows.append([import_term["startDate"], import_term["endDate"]])
+        start_date = windows[0][0]
+        end_date = max(window[1] for window in windows)
+
+        # Each term gets the reservations starting on the dates in its window
+        calendars = []
+        courses = []
+        term_by_date = {}
+        for index, import_term in enumerate(import_terms):
+            logger.info("Retrieving R25 reservations for {}: {} - {}".format(
+                import_term["termDescription"],
+                import_term["startDate"], import_term["endDate"]))
+            calendars.append(
+                TermCalendar(import_term["startDate"], import_term["endDate"]))
+            courses.append({})
+            for date in calendars[index].days:
+                term_by_date.setdefault(date, index)
 
         """
         Querying R25 reservations:
@@ -182,208 +399,152 @@ class Command(BaseCommand):
         favorites is maintained automatically by the separate tool mazevo2r25.
         """
 
-        # search for events in categories we want to be unlisted
-        unlisted_events = get_event_list(
-            event_type_id="+".join(settings.MAZEVO_R25_EVENTTYPES_ACADEMIC_IMPORT),
-            space_favorite="T",
-            state="+".join([Event.TENTATIVE_STATE,
-                            Event.CONFIRMED_STATE,
-                            Event.SEALED_STATE]),
-            reservation_start_dt=import_term["startDate"],
-            reservation_end_dt=import_term["endDate"],
-            category_id="+".join(settings.MAZEVO_R25_CATEGORIES_UNLISTED))
+        days_of_week = PublicCourses().DAYS_OF_WEEK
+        names = NameParser()
+        run.phase("scan")
 
-        unlisted_event_ids = unlisted_events.keys()
+        with ThreadPoolExecutor(max_workers=2 + shards) as executor:
+            # search for events in categories we want to be unlisted, while
+            # the first page of reservations is fetched
+            unlisted_future = executor.submit(
+                get_event_list,
+                event_type_id="+".join(settings.MAZEVO_R25_EVENTTYPES_ACADEMIC_IMPORT),
+                space_favorite="T",
+                state="+".join([Event.TENTATIVE_STATE,
+                                Event.CONFIRMED_STATE,
+                                Event.SEALED_STATE]),
+                reservation_start_dt=start_date,
+                reservation_end_dt=end_date,
+                category_id="+".join(settings.MAZEVO_R25_CATEGORIES_UNLISTED))
+            unlisted_event_ids = None
+
+            if shards:
+                pages = itertools.chain.from_iterable(
+                    self.scan_shards(executor, window_start, window_end, shards)
+                    for window_start, window_end in windows)
+            else:
+                pages = itertools.chain.from_iterable(
+                    self.scan_pages(executor, window_start, window_end)
+                    for window_start, window_end in windows)
 
-        paginate = "T"
-        page = 1
+            for shard, reservations, attrs in pages:
 
-        while True:
+                if attrs["page_num"] == "1":
+                    logger.info("{}Total reservations: {}".format(
+                        shard, attrs["total_results"]))
 
-            (reservations, attrs) = get_reservations_attrs(
-                event_type_id="+".join(settings.MAZEVO_R25_EVENTTYPES_ACADEMIC_IMPORT),
-                space_favorite="T",
-                space_match="occurrence",
-                state="+".join([Reservation.STANDARD_STATE,
-                                Reservation.EXCEPTION_STATE,
-                                Reservation.WARNING_STATE,
-                                Reservation.OVERRIDE_STATE]),
-                start_dt=import_term["startDate"],
-                end_dt=import_term["endDate"],
-                paginate=paginate, page=page, page_size=1000)
-
-            if page == 1:
-                logger.info("Total reservations: {}".format(attrs["total_results"]))
-
-            logger.info("page {}/{}: {} reservations".format(
-                page, attrs["page_count"], len(reservations)))
-
-            paginate = attrs["paginate_key"]
-            page += 1
-
-            for reservation in reservations:
-                if not reservation.space_reservation:
-                    continue
-                event_id = int(reservation.event_id)
-                if event_id not in courses:
-                    matches = event_pat.match(reservation.event_name.strip())
-                    if matches is None:
-                        logger.warning("Unable to determine course from event name {}. Not importing".format(reservation.event_name))
+                logger.info("{}page {}/{}: {} reservations".format(
+                    shard, attrs["page_num"], attrs["page_count"],
+                    len(reservations)))
+
+                if unlisted_event_ids is None:
+                    unlisted_event_ids = unlisted_future.result().keys()
+
+                run.count("seen", len(reservations))
+                for reservation in reservations:
+                    index = term_by_date.get(reservation.start_datetime[:10])
+                    if index is None:
+                        # in none of the terms, e.g. starting before the window
                         continue
-                    courses[event_id] = {
-                        "courseTitle": reservation.event_title,
-                        "subjectCode": matches.group("curric"),
-                        "courseNumber": matches.group("number"),
-                        "section": matches.group("section"),
-                        # "enrollment": reservation.registered_count,
-                        "enrollment": "0",
-                        "meetingTimesDict": {},
-                    }
-                    if not courses[event_id]["section"]:
-                        logger.warning("Unable to determine section for {}. using '-'".format(reservation.event_name))
-                        courses[event_id]["section"] = "-"
-                    # if not courses[event_id]["enrollment"]:
-                    #     courses[event_id]["enrollment"] = "0"
-
-                    if event_id in unlisted_event_ids or (
-                            reservation.event_notes and
-                            "safecampus" in reservation.event_notes.lower()):
-                        """
-                        For unlisted meetings, make it show:
-                            ----- In use -----
-                        Once everything is concatenated together.
-                        """
-                        courses[event_id]["subjectCode"] = "-"
-                        courses[event_id]["courseNumber"] = "-"
-                        courses[event_id]["section"] = "-"
-                        courses[event_id]["courseTitle"] = "In use -----"
-
-                course = courses[event_id]
-
-                start_dt = datetime.datetime.fromisoformat(reservation.start_datetime)
-                end_dt = datetime.datetime.fromisoformat(reservation.end_datetime)
-                date = start_dt.date()
-                dayname = PublicCourses().DAYS_OF_WEEK[date.isoweekday() % 7]
-
-                # Weeks are Sunday To Saturday
-                week_start = (date - datetime.timedelta(
-                    days=date.isoweekday() % 7)).isoformat()
-                week_end = (date + datetime.timedelta(
-                    days=6 - date.isoweekday() % 7)).isoformat()
-
-                s_time = start_dt.strftime("%H%M")
-                e_time = end_dt.strftime("%H%M")
-
-                # Some R25 spaces do not have whitespace between building and
-                # room. First 4 characters are building, rest is room.
-                if " " not in reservation.space_reservation.name:
-                    reservation.space_reservation.name = \
-                        reservation.space_reservation.name[:4] + " " + \
-                        reservation.space_reservation.name[4:]
-                matches = room_pat.match(reservation.space_reservation.name)
-                building = matches.group("building")
-                room = matches.group("room")
-
-                # meetings on different days in the same week will be
-                # consolidated as long as this data all matches
-                key = "{}_{}_{}_{}".format(s_time, e_time, building, room)
-
-                # meeting time and place doesn't exist yet
-                if key not in course["meetingTimesDict"]:
-                    # create new meeting/week dict
-                    course["meetingTimesDict"][key] = {}
-
-                # this week doesn't exist for this meeting time and place yet
-                if week_start not in course["meetingTimesDict"][key]:
-                    # add this week to meeting/week dict
-                    course["meetingTimesDict"][key][week_start] = {
-                        "startDate": week_start,
-                        "endDate": week_end,
-                        "startTime": s_time,
-                        "endTime": e_time,
-                        "sunday": False,
-                        "monday": False,
-                        "tuesday": False,
-                        "wednesday": False,
-                        "thursday": False,
-                        "friday": False,
-                        "saturday": False,
-                        "buildingCode": building,
-                        "roomCode": room,
-                        "instructorName": "UNK",
-                    }
-
-                # Finally, make this day active for this time, place, and week
-                course["meetingTimesDict"][key][week_start][dayname] = True
-
-            # Last page?
-            if not int(attrs["page_num"]) < int(attrs["page_count"]):
-                break
-
-        logger.info("Courses to upload: {}".format(len(courses)))
-
-        # Merge adjacent weeks with matching schedules
-        meeting_count = 0
-        for course in courses.values():
-
-            course["meetingTimes"] = []
-
-            for weekDict in course["meetingTimesDict"].values():
-
-                # make sure we have the weeks in order
-                weeks = OrderedDict(sorted(weekDict.items()))
-
-                n, week_a = weeks.popitem(False)
-                while len(weeks):
-                    n, week_b = weeks.popitem(False)
-                    if (week_b["sunday"] == week_a["sunday"] and
-                        week_b["monday"] == week_a["monday"] and
-                        week_b["tuesday"] == week_a["tuesday"] and
-                        week_b["wednesday"] == week_a["wednesday"] and
-                        week_b["thursday"] == week_a["thursday"] and
-                        week_b["friday"] == week_a["friday"] and
-                        week_b["saturday"] == week_a["saturday"] and
-                        week_b["startDate"] == (
-                            datetime.datetime.fromisoformat(week_a["endDate"]) +
-                            datetime.timedelta(days=1)).date().isoformat()):
-
-                        # if they're compatible, and contiguous, merge them
-                        week_a["endDate"] = week_b["endDate"]
-
-                    else:
-                        # done with week_a, move it over to meetingTimes
-                        course["meetingTimes"].append(week_a)
-                        meeting_count += 1
-
-                        # week_b becomes the new week_a
-                        week_a = week_b
-
-                # move the final week_a over to meetingTimes
-                course["meetingTimes"].append(week_a)
-                meeting_count += 1
-
-            del course["meetingTimesDict"]
-
-        logger.info("Meetings to upload: {}".format(meeting_count))
-
-        if meeting_count < 1:
-            logger.warning("No meetings found. Exiting now")
-            return
-
-        import_term["courses"] = list(courses.values())
-
-        PublicCourses().import_term(import_term)
-
-        # send email
-        messages = []
-        for message, count in Counter(msg_stream.getvalue().split("\n")).items():
-            if len(message) > 0:
-                messages.append("{} (repeated {} time(s))".format(message, count))
+                    add_reservation(courses[index], reservation, unlisted_event_ids,
+                                    calendars[index], names)
+
+        logger.info("R25 retries: {}".format(retry_policy))
+        logger.info("Name parse cache hits: {}".format(names))
+        run.phase("merge")
+
+        payloads = []
+        for import_term, term_courses in zip(import_terms, courses):
+            logger.info("{} courses to upload: {}".format(
+                import_term["termDescription"], len(term_courses)))
+
+            # Merge adjacent weeks with matching schedules
+            meeting_count = merge_meeting_weeks(term_courses, days_of_week)
+
+            logger.info("{} meetings to upload: {}".format(
+                import_term["termDescription"], meeting_count))
+
+            if meeting_count < 1:
+                logger.warning("No meetings found for {}. Not uploading".format(
+                    import_term["termDescription"]))
+                continue
+
+            import_term["courses"] = list(term_courses.values())
+            payloads.append(import_term)
+
+        return payloads
+
+    def upload_payloads(self, run, payloads, force=False):
+        """
+        Upload import_term payloads to Mazevo concurrently, each independently
+        of the others, skipping those unchanged since their last upload
+
+        :param run: RunRecorder for the terms updated, skipped and failed
+        """
+        uploads = []
+        for import_term in payloads:
+            upload = self.prepare_upload(import_term, force)
+            if upload:
+                uploads.append((import_term, upload))
+            else:
+                run.count("skipped")
+
+        with ThreadPoolExecutor(max_workers=len(uploads) or 1) as executor:
+            futures = [
+                executor.submit(PublicCourses().import_term, import_term)
+                for import_term, upload in uploads
+            ]
+        for (import_term, upload), future in zip(uploads, futures):
+            try:
+                future.result()
+            except Exception as ex:
+                logger.error("Upload of {} failed: {}".format(
+                    import_term["termDescription"], ex))
+                run.count("errors")
+            else:
+                logger.info("Uploaded {}".format(import_term["termDescription"]))
+                upload.save()
+                run.count("updated")
+
+    def prepare_upload(self, import_term, force=False):
+        """
+        Check a payload against the last upload of its term
+
+        :return: the MazevoTermUpload to save once the payload is uploaded,
+                 or None if it is unchanged
+        """
+        term_hash, course_hashes = payload_hashes(import_term)
+        last_upload = MazevoTermUpload.objects.filter(
+            term=import_term["termDescription"]).first()
+        if last_upload and last_upload.payload_hash == term_hash and not force:
+            logger.info("No changes to {} since upload on {}. Not uploading".format(
+                import_term["termDescription"], last_upload.date_uploaded))
+            return None
+
+        if last_upload:
+            added, removed = changed_courses(
+                last_upload.get_course_hashes(), course_hashes)
+            logger.info("Courses changed since last upload: {} new or changed, "
+                        "{} changed or removed".format(added, removed))
+
+        upload = last_upload or MazevoTermUpload(term=import_term["termDescription"])
+        upload.payload_hash = term_hash
+        upload.set_course_hashes(course_hashes)
+        return upload
+
+    def send_report(self, report, payloads):
+        """
+        Email the warnings logged during the run
+
+        :param report: ReportCollector of the run
+        """
+        messages = str(report)
         if len(messages) > 0:
             try:
                 send_mail(
-                    "R25 to Mazeveo Term Import: {}".format(import_term["termDescription"]),
-                    "\n".join(messages),
+                    "R25 to Mazeveo Term Import: {}".format(", ".join(
+                        import_term["termDescription"] for import_term in payloads)),
+                    messages,
                     settings.MAZEVO_R25_EMAIL_HOST_USER,
                     settings.MAZEVO_R25_EMAIL_RECIPIENTS,
                     fail_silently=False,
@@ -392,5 +553,4 @@ class Command(BaseCommand):
                 )
             except Exception:
                 print("Email not configured. R25_Mazevo report:")
-                print("\n".join(messages))
-
+                print(messages)
@@ -0,0 +1,77 @@
+import logging
+import sys
+
+from django.core.management.base import BaseCommand
+
+from mazevo_r25.standin import StandInServer
+
+
+logger = logging.getLogger("mazevo_r25.standin")
+
+
+class Command(BaseCommand):
+    help = "runs a local stand-in for the R25 and Mazevo web services"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            nargs="*",
+            help="Mock data directories, e.g. written by generate_mock_data",
+        )
+        parser.add_argument(
+            "--host",
+            default="127.0.0.1",
+            help="Address to listen on. Default is 127.0.0.1.",
+        )
+        parser.add_argument(
+            "-p",
+            "--port",
+            type=int,
+            default=8025,
+            help="Port to listen on. Default is 8025.",
+        )
+        parser.add_argument(
+            "-l",
+            "--latency",
+            type=float,
+            default=0,
+            help="Seconds of latency added to every response",
+        )
+        parser.add_argument(
+            "-j",
+            "--jitter",
+            type=float,
+            default=0,
+            help="Up to this many more seconds of latency, at random",
+        )
+        parser.add_argument(
+            "-e",
+            "--error-rate",
+            type=float,
+            default=0,
+            help="Fraction of requests to answer with a 500, e.g. 0.01",
+        )
+        parser.add_argument(
+            "-q",
+            "--quota",
+            type=int,
+            help="Requests per second to allow before answering 429",
+        )
+
+    def handle(self, *args, **options):
+        logger.addHandler(logging.StreamHandler(sys.stdout))
+        logger.setLevel(logging.DEBUG if options["verbosity"] > 1 else logging.INFO)
+
+        server = StandInServer(
+            (options["host"], options["port"]), options["path"],
+            latency=options["latency"], jitter=options["jitter"],
+            error_rate=options["error_rate"], quota=options["quota"])
+
+        logger.info("Serving R25 and Mazevo on http://{}:{}/".format(
+            *server.server_address))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
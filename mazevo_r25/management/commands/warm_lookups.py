@@ -0,0 +1,28 @@
+import logging
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from mazevo_r25.lookups import warm_lookups
+
+
+logger = logging.getLogger("mazevo_r25.lookups")
+
+
+class Command(BaseCommand):
+    help = ("fetches the Mazevo room and status lists and the R25 space and "
+            "event type lists into the cache, so the admin never waits for them")
+
+    def handle(self, *args, **options):
+        logger.addHandler(logging.StreamHandler(sys.stdout))
+        logger.setLevel(logging.DEBUG if options["verbosity"] > 1 else logging.INFO)
+
+        failed = 0
+        for endpoint, result in warm_lookups().items():
+            if isinstance(result, Exception):
+                failed += 1
+            else:
+                logger.info("Cached {} items from {}".format(result, endpoint))
+
+        if failed:
+            raise CommandError("Unable to fetch {} lists".format(failed))
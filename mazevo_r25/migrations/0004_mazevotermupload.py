@@ -0,0 +1,22 @@
+# Generated by Django 3.1.14 on 2026-10-19 01:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mazevo_r25', '0003_auto_20240716_1651'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MazevoTermUpload',
+            fields=[
+                ('term', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('payload_hash', models.CharField(max_length=64)),
+                ('course_hashes', models.TextField(default='[]')),
+                ('date_uploaded', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 3.1.14 on 2026-10-19 02:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mazevo_r25', '0004_mazevotermupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MazevoSyncRun',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('command', models.SlugField(choices=[('mazevo2r25', 'Mazevo bookings to R25 events'), ('r25_mazevo', 'R25 course reservations to Mazevo')], max_length=16)),
+                ('started', models.DateTimeField(db_index=True)),
+                ('finished', models.DateTimeField(null=True)),
+                ('window_start', models.DateField(null=True)),
+                ('window_end', models.DateField(null=True)),
+                ('options', models.TextField(default='{}')),
+                ('seen', models.PositiveIntegerField(default=0)),
+                ('created', models.PositiveIntegerField(default=0)),
+                ('updated', models.PositiveIntegerField(default=0)),
+                ('cancelled', models.PositiveIntegerField(default=0)),
+                ('skipped', models.PositiveIntegerField(default=0)),
+                ('errors', models.PositiveIntegerField(default=0)),
+                ('warnings', models.PositiveIntegerField(default=0)),
+                ('requests', models.PositiveIntegerField(default=0)),
+                ('retries', models.PositiveIntegerField(default=0)),
+                ('phases', models.TextField(default='{}')),
+                ('duration', models.FloatField(null=True)),
+                ('outcome', models.SlugField(choices=[('running', 'Running, or stopped without finishing'), ('success', 'Finished'), ('warnings', 'Finished with warnings or errors'), ('failed', 'Failed')], default='running', max_length=16)),
+            ],
+            options={
+                'ordering': ['-started'],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.1.14 on 2026-10-19 02:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mazevo_r25', '0005_mazevosyncrun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MazevoSyncLease',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job', models.CharField(max_length=64)),
+                ('shard', models.PositiveIntegerField()),
+                ('shards', models.PositiveIntegerField()),
+                ('worker', models.CharField(blank=True, default='', max_length=128)),
+                ('heartbeat', models.DateTimeField(null=True)),
+                ('finished', models.DateTimeField(null=True)),
+                ('takeovers', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['job', 'shard'],
+                'unique_together': {('job', 'shard')},
+            },
+        ),
+    ]
@@ -0,0 +1,438 @@
+"""
+Generate large, realistic mock data for the restclients file DAO, so the
+management commands can be run at production scale without a network.
+
+Files are written in the layout restclients_core's MockDAO expects:
+
+    <path>/r25/file/r25ws/servlet/wrd/run/<url>
+    <path>/mazevo/file/api/<url>
+
+Set the environment variable MAZEVO_R25_MOCK_DATA to <path> to have the mock
+DAO use them.
+"""
+
+import datetime
+import json
+import math
+import os
+import random
+import re
+from urllib.parse import quote, urlencode
+from xml.sax.saxutils import escape
+
+from restclients_core.util.mock import convert_to_platform_safe
+from uw_r25.models import Event, Reservation
+
+from mazevo_r25.more_r25 import space_shards
+
+
+R25_ROOT = "r25/file/r25ws/servlet/wrd/run"
+
+SPACE_ID = re.compile(r"<r25:space_id>(\d+)</r25:space_id>")
+MAZEVO_ROOT = "mazevo/file/api"
+
+XML_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<r25:{tag} xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"\n'
+    '    xmlns:xl="http://www.w3.org/1999/xlink"\n'
+    '    xmlns:r25="http://www.collegenet.com/r25"\n'
+    '    engine="accl"{attrs}>\n'
+)
+
+CURRICS = [
+    "A A", "ACADEM", "AFRAM", "AMATH", "ASL", "BIO A", "BIOL", "CHEM", "CS&SS",
+    "CSE", "ECON", "ENGL", "HIST", "INFO", "MATH", "ME", "MUSEN", "PHYS", "PSYCH",
+    "SOC", "STAT",
+]
+
+BUILDINGS = [
+    "BAG", "CSE2", "GLD", "GNOM", "GWN", "HSB", "HST", "JHN", "KNE", "MGH", "SAV",
+    "SMI", "SWS", "THO",
+]
+
+# (days of week as isoweekday() % 7, meeting length in minutes)
+MEETING_PATTERNS = [
+    ((1, 3, 5), 50),  # MWF
+    ((2, 4), 80),  # TTh
+    ((1, 2, 3, 4), 50),  # MTWTh
+    ((3,), 170),  # W
+]
+
+
+def r25_reservations_url(start_dt, end_dt, event_type_ids, paginate, page,
+                         page_size=1000, space_ids=None):
+    """
+    The reservations.xml url requested by r25_mazevo for a page of a term.
+
+    Must match the query made in r25_mazevo.
+    """
+    kwargs = {
+        "event_type_id": "+".join(event_type_ids),
+    }
+    if space_ids:
+        kwargs["space_id"] = "+".join(str(space_id) for space_id in space_ids)
+    else:
+        kwargs["space_favorite"] = "T"
+    kwargs.update({
+        "space_match": "occurrence",
+        "state": "+".join([Reservation.STANDARD_STATE,
+                           Reservation.EXCEPTION_STATE,
+                           Reservation.WARNING_STATE,
+                           Reservation.OVERRIDE_STATE]),
+        "start_dt": start_dt,
+        "end_dt": end_dt,
+        "paginate": paginate,
+        "page": page,
+        "page_size": page_size,
+        "scope": "extended",
+    })
+    return "reservations.xml?{}".format(urlencode(kwargs))
+
+
+def r25_unlisted_url(start_dt, end_dt, event_type_ids, category_ids):
+    """
+    The events.xml url requested by r25_mazevo for unlisted events.
+
+    Must match the query made in r25_mazevo.
+    """
+    kwargs = {
+        "event_type_id": "+".join(event_type_ids),
+        "space_favorite": "T",
+        "state": "+".join([Event.TENTATIVE_STATE,
+                           Event.CONFIRMED_STATE,
+                           Event.SEALED_STATE]),
+        "reservation_start_dt": start_dt,
+        "reservation_end_dt": end_dt,
+        "category_id": "+".join(category_ids),
+        "scope": "list",
+    }
+    return "events.xml?{}".format(urlencode(kwargs))
+
+
+def reservations_document(reservations, **attrs):
+    """
+    A reservations.xml response containing the given reservation xml strings
+    """
+    return (
+        XML_HEADER.format(tag="reservations", attrs="".join(
+            ' {}="{}"'.format(name, value) for name, value in attrs.items())) +
+        "".join(reservations) +
+        "</r25:reservations>\n"
+    )
+
+
+class MockDataGenerator(object):
+    """
+    Generates a consistent set of Mazevo bookings, R25 spaces, events and
+    course reservations
+    """
+
+    def __init__(self, path, seed=0, rooms=300, start_date=None, end_date=None,
+                 event_type_ids=("459", "472"), category_ids=("1",)):
+        self.path = path
+        self.random = random.Random(seed)
+        self.start_date = start_date or datetime.date(2025, 9, 20)
+        self.end_date = end_date or datetime.date(2025, 12, 13)
+        self.event_type_ids = list(event_type_ids)
+        self.category_ids = list(category_ids)
+        self.spaces = self.generate_spaces(rooms)
+
+    def write(self, root, url, data):
+        filename = os.path.join(self.path, root, convert_to_platform_safe(url))
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(filename, "w") as f:
+            f.write(data)
+        return filename
+
+    def generate_spaces(self, count):
+        """
+        Space names in the formats handled by r25_mazevo's room_pat, including
+        some without whitespace between building and room
+        """
+        spaces = {}
+        space_id = 10000
+        while len(spaces) < count:
+            building = self.random.choice(BUILDINGS)
+            room = "{}{:03d}".format(
+                self.random.choice(["", "", "", "G", "T", "BB"]),
+                self.random.randint(1, 999),
+            )
+            if len(building) == 4 and self.random.random() < 0.5:
+                name = building + room
+            else:
+                name = "{:<4} {}".format(building, room)
+            if name not in spaces.values():
+                space_id += 1
+                spaces[space_id] = name
+        return spaces
+
+    def course_name(self):
+        """
+        An event name in one of the formats handled by r25_mazevo's event_pat
+        """
+        curric = self.random.choice(CURRICS)
+        number = self.random.randint(100, 599)
+        section = self.random.choice(["A", "B", "AA", "AB", "C"])
+        fmt = self.random.choice([
+            "{c} {n} {s} {cc}{n}{s} 20254",
+            "*{c} {n} {s} {cc}{n}{s} 20254",
+            "{c} {n} {s} XL {cc}{n}{s} 20254",
+            "EXAM:* {c} {n} {s} XL {cc}{n}{s} 20254",
+            "{c} {n} {s} /AUT25 Large Lecture",
+        ])
+        return fmt.format(c=curric, cc=curric.replace(" ", ""), n=number, s=section)
+
+    def write_spaces(self):
+        items = "".join(
+            "<r25:item><r25:id>{}</r25:id><r25:name>{}</r25:name></r25:item>\n"
+            .format(space_id, escape(name))
+            for space_id, name in self.spaces.items()
+        )
+        self.write(R25_ROOT, "spaces.xml?scope=list",
+                   XML_HEADER.format(tag="list", attrs="") + items + "</r25:list>\n")
+
+        favorites = "".join(
+            "<r25:object><r25:object_id>{}</r25:object_id>"
+            "<r25:object_name>{}</r25:object_name></r25:object>\n"
+            .format(space_id, escape(name))
+            for space_id, name in self.spaces.items()
+        )
+        self.write(R25_ROOT, "favorites.xml?object_type=4",
+                   XML_HEADER.format(tag="favorites", attrs="") + favorites +
+                   "</r25:favorites>\n")
+
+        for space_id, name in self.spaces.items():
+            self.write(
+                R25_ROOT, "spaces.xml?short_name={}".format(quote(name)),
+                XML_HEADER.format(tag="spaces", attrs="") +
+                "<r25:space status=\"est\"><r25:space_id>{}</r25:space_id>"
+                "<r25:space_name>{}</r25:space_name>"
+                "<r25:formal_name>{}</r25:formal_name></r25:space>\n"
+                "</r25:spaces>\n".format(space_id, escape(name), escape(name)))
+
+    def reservation_xml(self, reservation_id, start, end, space_id, event=None):
+        return (
+            '<r25:reservation status="est">'
+            "<r25:reservation_id>{id}</r25:reservation_id>"
+            "<r25:reservation_state>1</r25:reservation_state>"
+            "<r25:reservation_start_dt>{start}</r25:reservation_start_dt>"
+            "<r25:event_start_dt>{start}</r25:event_start_dt>"
+            "<r25:event_end_dt>{end}</r25:event_end_dt>"
+            "<r25:reservation_end_dt>{end}</r25:reservation_end_dt>"
+            "<r25:profile_name>Rsrv_{id}</r25:profile_name>"
+            "<r25:registered_count/>"
+            "{event}"
+            '<r25:space_reservation status="est">'
+            "<r25:space_id>{space_id}</r25:space_id>"
+            "<r25:space><r25:space_name>{space_name}</r25:space_name>"
+            "<r25:formal_name>{space_name}</r25:formal_name></r25:space>"
+            "</r25:space_reservation>"
+            "</r25:reservation>\n"
+        ).format(
+            id=reservation_id,
+            start=start.isoformat(),
+            end=end.isoformat(),
+            space_id=space_id,
+            space_name=escape(self.spaces[space_id]),
+            event=event or "",
+        )
+
+    def generate_reservations(self, sections=2000, unlisted=0.02):
+        """
+        Course meeting reservations over the term
+
+        :param unlisted: fraction of sections which are unlisted
+        :return: list of reservation xml strings, and the unlisted event_ids
+        """
+        tz = datetime.timezone(datetime.timedelta(hours=-8))
+        reservations = []
+        unlisted_ids = []
+        reservation_id = 50000000
+        for event_id in range(20000000, 20000000 + sections):
+            name = self.course_name()
+            if self.random.random() < unlisted:
+                unlisted_ids.append(event_id)
+            event = (
+                "<r25:event><r25:event_id>{}</r25:event_id>"
+                "<r25:event_name>{}</r25:event_name>"
+                "<r25:event_title>{}</r25:event_title>"
+                "<r25:role><r25:contact><r25:contact_name>UNK</r25:contact_name>"
+                "</r25:contact></r25:role></r25:event>"
+            ).format(event_id, escape(name), escape(name.title()))
+            days, length = self.random.choice(MEETING_PATTERNS)
+            space_id = self.random.choice(list(self.spaces))
+            start_time = datetime.time(self.random.randint(8, 18),
+                                       self.random.choice([0, 30]))
+            date = self.start_date
+            while date <= self.end_date:
+                if date.isoweekday() % 7 in days:
+                    start = datetime.datetime.combine(date, start_time, tz)
+                    end = start + datetime.timedelta(minutes=length)
+                    reservation_id += 1
+                    reservations.append(self.reservation_xml(
+                        reservation_id, start, end, space_id, event))
+                date += datetime.timedelta(days=1)
+
+        return reservations, unlisted_ids
+
+    def write_reservations(self, sections=2000, page_size=1000, unlisted=0.02,
+                           shards=()):
+        """
+        Write a paginated reservations.xml scan of course meetings over the
+        term, plus the unlisted events list
+
+        :param shards: also write the scans of the favorite spaces split into
+                       each of these numbers of shards, as r25_mazevo --shards.
+                       The space ids end up in the file names, so keep shards
+                       to a few dozen spaces each
+        :return: the number of reservations written
+        """
+        reservations, unlisted_ids = self.generate_reservations(sections, unlisted)
+        self.write_scan(reservations, page_size)
+
+        for count in shards:
+            for space_ids in space_shards(self.spaces, count):
+                shard_reservations = [
+                    xml for xml in reservations
+                    if int(SPACE_ID.search(xml).group(1)) in space_ids
+                ]
+                self.write_scan(shard_reservations, page_size, space_ids)
+
+        items = "".join(
+            "<r25:item><r25:id>{}</r25:id><r25:name>UNLISTED</r25:name></r25:item>\n"
+            .format(event_id) for event_id in unlisted_ids
+        )
+        self.write(
+            R25_ROOT,
+            r25_unlisted_url(self.start_date.isoformat(), self.end_date.isoformat(),
+                             self.event_type_ids, self.category_ids),
+            XML_HEADER.format(tag="list", attrs="") + items + "</r25:list>\n")
+
+        return len(reservations)
+
+    def write_scan(self, reservations, page_size, space_ids=None):
+        page_count = max(1, math.ceil(len(reservations) / page_size))
+        paginate_key = str(self.random.randint(1000, 9999))
+        for page in range(1, page_count + 1):
+            url = r25_reservations_url(
+                self.start_date.isoformat(), self.end_date.isoformat(),
+                self.event_type_ids, "T" if page == 1 else paginate_key, page,
+                page_size, space_ids)
+            self.write(R25_ROOT, url, reservations_document(
+                reservations[(page - 1) * page_size:page * page_size],
+                total_results=len(reservations), page_count=page_count,
+                page_num=page, paginate_key=paginate_key))
+
+    def event_xml(self, event_id, name, reservation_id, start, end, space_id):
+        """
+        An R25 event, usable as a search result, an edit document and the
+        document returned after a PUT
+        """
+        return (
+            XML_HEADER.format(tag="events", attrs="") +
+            '<r25:event status="est">'
+            "<r25:event_id>{event_id}</r25:event_id>"
+            "<r25:event_name>{name}</r25:event_name>"
+            "<r25:alien_uid/>"
+            "<r25:event_title>{title}</r25:event_title>"
+            "<r25:node_type>E</r25:node_type>"
+            "<r25:start_date>{start_date}</r25:start_date>"
+            "<r25:end_date>{end_date}</r25:end_date>"
+            "<r25:event_type_id>433</r25:event_type_id>"
+            "<r25:state>2</r25:state>"
+            "<r25:parent_id>15231761</r25:parent_id>"
+            "<r25:cabinet_id>15231758</r25:cabinet_id>"
+            "<r25:cabinet_name>UNIVERSITY OF WASHINGTON EVENTS</r25:cabinet_name>"
+            '<r25:organization status="est">'
+            "<r25:organization_id>4211</r25:organization_id>"
+            "<r25:primary>T</r25:primary>"
+            "</r25:organization>"
+            '<r25:profile status="est">'
+            "<r25:profile_name>Rsrv_{reservation_id}</r25:profile_name>"
+            "<r25:init_start_dt>{start}</r25:init_start_dt>"
+            "<r25:init_end_dt>{end}</r25:init_end_dt>"
+            "{reservation}"
+            "</r25:profile>"
+            "</r25:event>\n"
+            "</r25:events>\n"
+        ).format(
+            event_id=event_id,
+            name=escape(name),
+            title=escape(name.title()),
+            start_date=start.date().isoformat(),
+            end_date=end.date().isoformat(),
+            reservation_id=reservation_id,
+            start=start.isoformat(),
+            end=end.isoformat(),
+            reservation=self.reservation_xml(reservation_id, start, end, space_id),
+        )
+
+    def write_bookings(self, count=10000, existing=0.8, statuses=(1, 2, 3)):
+        """
+        Write Mazevo rooms, statuses and bookings, and the matching R25 event
+        searches, edit documents and PUT responses
+
+        :param existing: fraction of bookings which already have an R25 event
+        :return: the number of bookings written
+        """
+        tz = datetime.timezone(datetime.timedelta(hours=-8))
+        room_ids = {}
+        rooms = []
+        for room_id, (space_id, name) in enumerate(self.spaces.items(), 1):
+            room_ids[room_id] = space_id
+            rooms.append({"roomId": room_id, "description": name})
+        self.write(MAZEVO_ROOT, "PublicConfiguration/Rooms", json.dumps(rooms))
+        self.write(MAZEVO_ROOT, "PublicConfiguration/Statuses", json.dumps([
+            {"statusId": status_id, "description": "Status {}".format(status_id)}
+            for status_id in statuses
+        ]))
+
+        bookings = []
+        days = (self.end_date - self.start_date).days
+        for booking_id in range(1000000, 1000000 + count):
+            room_id = self.random.choice(list(room_ids))
+            name = "{} {}".format(
+                self.random.choice(["Lecture", "Meeting", "Seminar", "Reception"]),
+                booking_id)
+            start = datetime.datetime.combine(
+                self.start_date + datetime.timedelta(days=self.random.randint(0, days)),
+                datetime.time(self.random.randint(7, 20), self.random.choice([0, 30])),
+                tz)
+            end = start + datetime.timedelta(minutes=self.random.choice([50, 80, 120]))
+            bookings.append({
+                "bookingId": booking_id,
+                "eventNumber": booking_id // 3,
+                "eventName": name,
+                "roomId": room_id,
+                "roomDescription": self.spaces[room_ids[room_id]],
+                "statusId": self.random.choice(statuses),
+                "dateTimeStart": start.isoformat(),
+                "dateTimeEnd": end.isoformat(),
+                "dateChanged": start.isoformat(),
+                "setupMinutes": self.random.choice([0, 0, 15, 30]),
+                "teardownMinutes": self.random.choice([0, 0, 15]),
+            })
+
+            search_url = "events.xml?{}".format(urlencode({
+                "starts_with": "{}_".format(booking_id),
+                "scope": "extended",
+                "include": "reservations",
+            }))
+            if self.random.random() < existing:
+                event_id = 30000000 + booking_id
+                event = self.event_xml(
+                    event_id, "{}_{}".format(booking_id, name[:30].upper()),
+                    40000000 + booking_id, start, end, room_ids[room_id])
+                self.write(R25_ROOT, search_url, event)
+                self.write(R25_ROOT, "event.xml?event_id={}&mode=edit".format(
+                    event_id), event)
+                self.write(R25_ROOT, "event.xml?event_id={}&return_doc=T".format(
+                    event_id), event)
+            else:
+                self.write(R25_ROOT, search_url,
+                           XML_HEADER.format(tag="events", attrs="") +
+                           "</r25:events>\n")
+
+        self.write(MAZEVO_ROOT, "PublicEvent/GetEvents", json.dumps(bookings))
+
+        return len(bookings)
@@ -1,8 +1,9 @@
-from descriptors import cachedclassproperty
+import json
+
+from descriptors import classproperty
 from django.db import models
-from uw_mazevo.api import PublicConfiguration
 
-from .more_r25 import get_event_type_list, get_space_list
+from .lookups import event_type_lookup, room_lookup, space_lookup, status_lookup
 
 
 class MazevoRoomSpace(models.Model):
@@ -10,16 +11,14 @@ class MazevoRoomSpace(models.Model):
     Assigns R25 spaces to Mazevo rooms
     """
 
-    @cachedclassproperty
+    # These never wait for Mazevo or R25, and are empty until first fetched
+    @classproperty
     def room_names(cls):
-        room_names = {}
-        for room in PublicConfiguration().get_rooms():
-            room_names[room.id] = room.description
-        return room_names
+        return room_lookup.names(wait=False)
 
-    @cachedclassproperty
+    @classproperty
     def space_names(cls):
-        return get_space_list()
+        return space_lookup.names(wait=False)
 
     room_id = models.PositiveIntegerField(primary_key=True)
     space_id = models.PositiveIntegerField(unique=True, null=True, default=None)
@@ -33,8 +32,11 @@ class MazevoRoomSpace(models.Model):
 
     @property
     def space_name(self):
+        space_names = self.space_names
+        if not space_names:
+            return ''
         try:
-            return self.space_names[self.space_id]
+            return space_names[self.space_id]
         except Exception:
             return "Invalid"
 
@@ -44,16 +46,13 @@ class MazevoStatusMap(models.Model):
     Maps Mazevo status to action and R25 event type
     """
 
-    @cachedclassproperty
+    @classproperty
     def status_names(cls):
-        status_names = {}
-        for status in PublicConfiguration().get_statuses():
-            status_names[status.id] = status.description
-        return status_names
+        return status_lookup.names(wait=False)
 
-    @cachedclassproperty
+    @classproperty
     def event_type_names(cls):
-        return get_event_type_list(all_types="T")
+        return event_type_lookup.names(wait=False)
 
     ACTION_IGNORE = "ignore"
     ACTION_REMOVE = "remove"
@@ -78,7 +77,113 @@ class MazevoStatusMap(models.Model):
 
     @property
     def event_type_name(self):
+        event_type_names = self.event_type_names
+        if not event_type_names:
+            return ''
         try:
-            return self.event_type_names[self.event_type_id]
+            return event_type_names[self.event_type_id]
         except Exception:
             return "Invalid"
+
+
+class MazevoTermUpload(models.Model):
+    """
+    Content hashes of the course data last uploaded to Mazevo for a term
+    """
+
+    term = models.CharField(max_length=32, primary_key=True)
+    payload_hash = models.CharField(max_length=64)
+    course_hashes = models.TextField(default="[]")
+    date_uploaded = models.DateTimeField(auto_now=True)
+
+    def get_course_hashes(self):
+        return json.loads(self.course_hashes)
+
+    def set_course_hashes(self, course_hashes):
+        self.course_hashes = json.dumps(course_hashes)
+
+
+class MazevoSyncRun(models.Model):
+    """
+    A run of mazevo2r25 or r25_mazevo, kept to follow throughput over time
+    """
+
+    COMMAND_MAZEVO2R25 = "mazevo2r25"
+    COMMAND_R25_MAZEVO = "r25_mazevo"
+    COMMAND_CHOICES = (
+        (COMMAND_MAZEVO2R25, "Mazevo bookings to R25 events"),
+        (COMMAND_R25_MAZEVO, "R25 course reservations to Mazevo"),
+    )
+
+    OUTCOME_RUNNING = "running"
+    OUTCOME_SUCCESS = "success"
+    OUTCOME_WARNINGS = "warnings"
+    OUTCOME_FAILED = "failed"
+    OUTCOME_CHOICES = (
+        (OUTCOME_RUNNING, "Running, or stopped without finishing"),
+        (OUTCOME_SUCCESS, "Finished"),
+        (OUTCOME_WARNINGS, "Finished with warnings or errors"),
+        (OUTCOME_FAILED, "Failed"),
+    )
+
+    command = models.SlugField(max_length=16, choices=COMMAND_CHOICES)
+    started = models.DateTimeField(db_index=True)
+    finished = models.DateTimeField(null=True)
+    window_start = models.DateField(null=True)
+    window_end = models.DateField(null=True)
+    options = models.TextField(default="{}")
+    seen = models.PositiveIntegerField(default=0)
+    created = models.PositiveIntegerField(default=0)
+    updated = models.PositiveIntegerField(default=0)
+    cancelled = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)
+    errors = models.PositiveIntegerField(default=0)
+    warnings = models.PositiveIntegerField(default=0)
+    requests = models.PositiveIntegerField(default=0)
+    retries = models.PositiveIntegerField(default=0)
+    phases = models.TextField(default="{}")
+    duration = models.FloatField(null=True)
+    outcome = models.SlugField(
+        max_length=16, choices=OUTCOME_CHOICES, default=OUTCOME_RUNNING)
+
+    class Meta:
+        ordering = ["-started"]
+
+    def get_options(self):
+        return json.loads(self.options)
+
+    def set_options(self, options):
+        self.options = json.dumps(options, default=str, sort_keys=True)
+
+    def get_phases(self):
+        return json.loads(self.phases)
+
+    def set_phases(self, phases):
+        self.phases = json.dumps(phases)
+
+    @property
+    def throughput(self):
+        """
+        Bookings or reservations seen per second
+        """
+        if not self.duration:
+            return None
+        return self.seen / self.duration
+
+
+class MazevoSyncLease(models.Model):
+    """
+    A worker's claim on one shard of the bookings of a sharded mazevo2r25 job
+    """
+
+    job = models.CharField(max_length=64)
+    shard = models.PositiveIntegerField()
+    shards = models.PositiveIntegerField()
+    worker = models.CharField(max_length=128, blank=True, default="")
+    heartbeat = models.DateTimeField(null=True)
+    finished = models.DateTimeField(null=True)
+    takeovers = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("job", "shard")
+        ordering = ["job", "shard"]
@@ -1,24 +1,46 @@
-from collections import OrderedDict
+from bisect import bisect_left
+from collections import Counter, OrderedDict, namedtuple
+from email.utils import parsedate_to_datetime
+import datetime
 import json
 import logging
 from lxml import etree
+import random
+import threading
+import time
 from urllib.parse import quote, urlencode
 
+from django.conf import settings
 from restclients_core import models
 from restclients_core.exceptions import DataFailureException
-from restclients_core.util.retry import retry
-from uw_r25 import nsmap, get_resource
+from uw_r25 import nsmap
 from uw_r25.dao import R25_DAO
 from uw_r25.events import events_from_xml
 from uw_r25.models import Event, Reservation
 from uw_r25.spaces import space_reservation_from_xml, spaces_from_xml
 
+from .cache import cache_key, cache_ttl, get_cache, invalidate_cache
+
 
 logger = logging.getLogger(__name__)
 
 
 RETRY_STATUS_CODES = [0, 429]
 
+# Default number of retries allowed across a whole run.
+# Override with settings.MAZEVO_R25_RETRY_BUDGET
+RETRY_BUDGET = 200
+
+# Default number of consecutive failed requests after which we stop calling R25,
+# and seconds to wait before trying again.
+# Override with settings.MAZEVO_R25_CIRCUIT_THRESHOLD and
+# settings.MAZEVO_R25_CIRCUIT_RESET_TIMEOUT
+CIRCUIT_THRESHOLD = 5
+CIRCUIT_RESET_TIMEOUT = 30
+
+# Upper bounds, in seconds, of the buckets of the R25 request latency histograms
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
 
 def live_url(self):
     return "https://25live.collegenet.com/pro/%s#!/home/event/%s/details" % (
@@ -113,12 +135,391 @@ class TooManyRequestsException(Exception):
     pass
 
 
-def post_resource(url):
+class CircuitOpenException(DataFailureException):
+    """
+    This exception means a request was not sent because R25 appears to be down.
+    It has status 0, like a connection failure, so callers handling
+    DataFailureException count it as an error and move on.
     """
-    Issue a POST request to R25
 
-    :param url: endpoint to POST to
-    :return: the response as an lxml.etree
+    def __init__(self, url, failures, last_error):
+        super(CircuitOpenException, self).__init__(url, 0, str(last_error))
+        self.failures = failures
+        self.last_error = last_error
+
+    def __str__(self):
+        return "Not requesting %s after %d consecutive R25 failures: %s" % (
+            self.url,
+            self.failures,
+            self.last_error,
+        )
+
+
+def parse_retry_after(value):
+    """
+    Convert a Retry-After header value to a number of seconds
+
+    :param value: either a number of seconds or an HTTP date
+    :return: seconds to wait, or None if the value can't be understood
+    """
+    if not value:
+        return None
+    try:
+        return max(0, int(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return max(0, (when - now).total_seconds())
+
+
+class RetryPolicy(object):
+    """
+    Retries R25 requests which fail with a retryable status.
+
+    Waits use exponential backoff with full jitter, but never less than the
+    server's Retry-After. All retries in a run draw from one budget, so a storm
+    of 429s can't stretch a run out indefinitely. The budget and counts are
+    shared by the threads of a run.
+    """
+
+    def __init__(self, tries=4, delay=1, backoff=2, max_delay=60,
+                 status_codes=RETRY_STATUS_CODES, budget=None):
+        self.tries = tries
+        self.delay = delay
+        self.backoff = backoff
+        self.max_delay = max_delay
+        self.status_codes = status_codes
+        self.lock = threading.Lock()
+        self.reset(budget)
+
+    def reset(self, budget=None):
+        """
+        Start a new run: restore the budget and clear the request and retry
+        counts
+        """
+        if budget is None:
+            budget = getattr(settings, "MAZEVO_R25_RETRY_BUDGET", RETRY_BUDGET)
+        with self.lock:
+            self.budget = budget
+            self.requests = Counter()
+            self.retries = Counter()
+            self.exhausted = 0
+
+    def wait_time(self, attempt, retry_after=None):
+        wait = self.delay * self.backoff**attempt
+        wait = random.uniform(0, min(self.max_delay, wait))
+        if retry_after is not None:
+            wait = max(wait, min(retry_after, self.max_delay))
+        return wait
+
+    def should_retry(self, status, attempt, status_codes=None):
+        """
+        Whether to retry, taking the retry from the budget if so
+        """
+        if status not in (status_codes or self.status_codes):
+            return False
+        if attempt + 1 >= self.tries:
+            return False
+        with self.lock:
+            if self.budget < 1:
+                if not self.exhausted:
+                    logger.warning(
+                        "R25 retry budget exhausted, no more retries this run")
+                self.exhausted += 1
+                return False
+            self.budget -= 1
+            return True
+
+    def call(self, method, url, load, status_codes=None):
+        """
+        Call load() until it returns a non-retryable response or we give up
+
+        :param method: HTTP method, for the retry counts
+        :param url: for logging
+        :param load: function issuing the request and returning the response
+        :param status_codes: override the retryable status codes
+        :return: the last response
+        """
+        with self.lock:
+            self.requests[method] += 1
+        attempt = 0
+        while True:
+            try:
+                response = load()
+            except DataFailureException as ex:
+                # connection errors and timeouts are raised with status 0
+                if not self.should_retry(ex.status, attempt, status_codes):
+                    raise
+                retry_after = None
+            else:
+                if not self.should_retry(response.status, attempt, status_codes):
+                    return response
+                retry_after = parse_retry_after(response.getheader("Retry-After"))
+
+            wait = self.wait_time(attempt, retry_after)
+            logger.debug("retrying %s %s in %.1f seconds" % (method, url, wait))
+            with self.lock:
+                self.retries[method] += 1
+            time.sleep(wait)
+            attempt += 1
+
+    def __str__(self):
+        return "%d retries (%s), %d remaining in budget%s" % (
+            sum(self.retries.values()),
+            ", ".join(
+                "%s %d" % (method, count)
+                for method, count in sorted(self.retries.items())
+            ) or "none",
+            self.budget,
+            ", %d requests not retried" % self.exhausted if self.exhausted else "",
+        )
+
+
+retry_policy = RetryPolicy()
+
+
+class CircuitBreaker(object):
+    """
+    Stops requests to R25 after too many consecutive failures.
+
+    Once open, requests fail immediately with CircuitOpenException. After
+    reset_timeout seconds the breaker is half-open: one request is let through
+    as a probe, and closes the breaker if it succeeds or re-opens it if not.
+    A probe with neither outcome, e.g. one that raised something unexpected,
+    is given up on after another reset_timeout seconds and a new one let
+    through. The breaker is shared by the threads of a run.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, threshold=None, reset_timeout=None):
+        self.lock = threading.Lock()
+        self.reset(threshold, reset_timeout)
+
+    def reset(self, threshold=None, reset_timeout=None):
+        """
+        Start a new run: close the breaker and clear the counts
+        """
+        if threshold is None:
+            threshold = getattr(
+                settings, "MAZEVO_R25_CIRCUIT_THRESHOLD", CIRCUIT_THRESHOLD)
+        if reset_timeout is None:
+            reset_timeout = getattr(
+                settings, "MAZEVO_R25_CIRCUIT_RESET_TIMEOUT", CIRCUIT_RESET_TIMEOUT)
+        with self.lock:
+            self.threshold = threshold
+            self.reset_timeout = reset_timeout
+            self.state = self.CLOSED
+            self.failures = 0
+            self.last_error = None
+            self.opened_at = None
+            self.short_circuited = 0
+
+    def is_open(self):
+        """
+        True if requests would currently be refused, rather than sent as probes.
+        That includes while a probe is outstanding.
+        """
+        # opened_at is when the breaker opened, or when the probe was sent
+        return (self.state != self.CLOSED and
+                time.time() - self.opened_at < self.reset_timeout)
+
+    def before_request(self, url):
+        with self.lock:
+            if self.state == self.CLOSED:
+                return
+            if not self.is_open():
+                # only one thread gets to probe
+                if self.state == self.HALF_OPEN:
+                    logger.debug("R25 circuit probe timed out")
+                logger.debug("R25 circuit half-open, probing with %s" % url)
+                self.state = self.HALF_OPEN
+                self.opened_at = time.time()
+                return
+            self.short_circuited += 1
+            failures, last_error = self.failures, self.last_error
+        raise CircuitOpenException(url, failures, last_error)
+
+    def record_success(self):
+        with self.lock:
+            if self.state != self.CLOSED:
+                logger.info("R25 circuit closed")
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self, error):
+        with self.lock:
+            self.failures += 1
+            self.last_error = error
+            if self.state == self.HALF_OPEN or (
+                    self.state == self.CLOSED and self.failures >= self.threshold):
+                logger.debug("R25 circuit open after %d failures" % self.failures)
+                self.state = self.OPEN
+                self.opened_at = time.time()
+
+    def __str__(self):
+        return "%s, %d consecutive failures, %d requests short-circuited" % (
+            self.state,
+            self.failures,
+            self.short_circuited,
+        )
+
+
+circuit_breaker = CircuitBreaker()
+
+
+def endpoint_name(url):
+    """
+    :return: the R25 endpoint of a url, e.g. "event.xml edit" for
+             /r25ws/servlet/wrd/run/event.xml?event_id=1&mode=edit
+    """
+    path, _, query = url.partition("?")
+    endpoint = path.rsplit("/", 1)[-1]
+    if "mode=edit" in query.split("&"):
+        endpoint += " edit"
+    return endpoint
+
+
+class RequestStats(object):
+    """
+    Counts R25 requests, errors and latency by method and endpoint. Each
+    attempt is counted, so retries are included.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Start a new run: clear the counts
+        """
+        with self.lock:
+            self.stats = {}
+
+    def record(self, method, url, seconds, status):
+        """
+        :param method: HTTP method
+        :param url: url requested
+        :param seconds: time taken
+        :param status: HTTP status, or 0 if there was no response
+        """
+        key = (method, endpoint_name(url))
+        with self.lock:
+            stat = self.stats.get(key)
+            if stat is None:
+                stat = self.stats[key] = {
+                    "count": 0,
+                    "errors": 0,
+                    "sum": 0.0,
+                    # the last bucket is for anything slower than all the bounds
+                    "buckets": [0] * (len(self.buckets) + 1),
+                }
+            stat["count"] += 1
+            stat["errors"] += status == 0 or status >= 400
+            stat["sum"] += seconds
+            stat["buckets"][bisect_left(self.buckets, seconds)] += 1
+
+    def quantile(self, stat, q):
+        """
+        :return: the upper bound of the bucket holding the q quantile, or None
+                 if it's past the last bound
+        """
+        rank = q * stat["count"]
+        seen = 0
+        for bound, count in zip(self.buckets, stat["buckets"]):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def openmetrics(self, labels=None):
+        """
+        :param labels: dict of labels to add to every sample, e.g. the command
+        :return: the counts in OpenMetrics text format
+        """
+        def format_labels(**more):
+            pairs = OrderedDict(labels or {})
+            pairs.update(more)
+            return "{" + ",".join('{}="{}"'.format(
+                name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+                for name, value in pairs.items()) + "}"
+
+        with self.lock:
+            stats = sorted((key, dict(stat, buckets=list(stat["buckets"])))
+                           for key, stat in self.stats.items())
+
+        lines = [
+            "# TYPE mazevo_r25_requests counter",
+            "# HELP mazevo_r25_requests R25 requests, including retries.",
+        ]
+        for (method, endpoint), stat in stats:
+            lines.append("mazevo_r25_requests_total{} {}".format(
+                format_labels(method=method, endpoint=endpoint), stat["count"]))
+        lines += [
+            "# TYPE mazevo_r25_request_errors counter",
+            "# HELP mazevo_r25_request_errors R25 requests failed or answered "
+            "with an error status.",
+        ]
+        for (method, endpoint), stat in stats:
+            lines.append("mazevo_r25_request_errors_total{} {}".format(
+                format_labels(method=method, endpoint=endpoint), stat["errors"]))
+        lines += [
+            "# TYPE mazevo_r25_request_seconds histogram",
+            "# HELP mazevo_r25_request_seconds R25 request latency.",
+        ]
+        for (method, endpoint), stat in stats:
+            cumulative = 0
+            for bound, count in zip(
+                    list(self.buckets) + ["+Inf"], stat["buckets"]):
+                cumulative += count
+                lines.append("mazevo_r25_request_seconds_bucket{} {}".format(
+                    format_labels(method=method, endpoint=endpoint, le=bound),
+                    cumulative))
+            lines.append("mazevo_r25_request_seconds_count{} {}".format(
+                format_labels(method=method, endpoint=endpoint), stat["count"]))
+            lines.append("mazevo_r25_request_seconds_sum{} {}".format(
+                format_labels(method=method, endpoint=endpoint), stat["sum"]))
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def __str__(self):
+        with self.lock:
+            stats = sorted(self.stats.items())
+        if not stats:
+            return "none"
+        lines = []
+        for (method, endpoint), stat in stats:
+            p95 = self.quantile(stat, 0.95)
+            lines.append(
+                "%s %s: %d requests, %d errors, mean %.3fs, p95 %s" % (
+                    method, endpoint, stat["count"], stat["errors"],
+                    stat["sum"] / stat["count"],
+                    "<= %ss" % p95 if p95 is not None else
+                    "> %ss" % self.buckets[-1]))
+        return "\n".join(lines)
+
+
+request_stats = RequestStats()
+
+
+def _request(method, url, headers, body=None, status_codes=None):
+    """
+    Issue a request to R25, retrying according to retry_policy
+
+    :param method: HTTP method
+    :param url: endpoint, relative to the R25 web services root
+    :param headers: request headers
+    :param body: request body, for PUT
+    :param status_codes: override the retryable status codes
+    :return: the full url and the response
     """
 
     instance = R25_DAO().get_service_setting("INSTANCE")
@@ -127,18 +528,106 @@ def post_resource(url):
     else:
         url = "/r25ws/servlet/wrd/run/%s" % url
 
-    response = R25_DAO().postURL(url, {"Accept": "text/xml"})
-    if response.status == 429:
-        raise TooManyRequestsException(url)
-    if response.status != 201:
-        raise DataFailureException(url, response.status, response.data)
+    circuit_breaker.before_request(url)
+
+    def send():
+        dao = R25_DAO()
+        if method == "GET":
+            return dao.getURL(url, headers)
+        if method == "POST":
+            return dao.postURL(url, headers)
+        if method == "PUT":
+            return dao.putURL(url, headers, body)
+        if method == "DELETE":
+            return dao.deleteURL(url, headers)
+        raise ValueError("Unsupported method %s" % method)
+
+    def load():
+        start = time.time()
+        status = 0
+        try:
+            response = send()
+            status = response.status
+            return response
+        finally:
+            request_stats.record(method, url, time.time() - start, status)
+
+    try:
+        response = retry_policy.call(method, url, load, status_codes)
+    except DataFailureException as ex:
+        circuit_breaker.record_failure(ex)
+        raise
+
+    if response.status >= 500:
+        circuit_breaker.record_failure(
+            DataFailureException(url, response.status, response.data))
+    elif response.status >= 400:
+        # R25 is up, even if it didn't like this request
+        circuit_breaker.record_success()
+
+    return url, response
+
+
+def response_tree(url, response):
+    """
+    Parse an R25 response, recording the outcome with circuit_breaker
 
-    tree = etree.fromstring(response.data.strip())
+    :return: the response as an lxml.etree
+    """
+    try:
+        tree = etree.fromstring(response.data.strip())
+    except etree.XMLSyntaxError as ex:
+        # Bad response from R25 server - usually means outage
+        circuit_breaker.record_failure(ex)
+        raise
 
     # XHTML response is an error response
     xhtml = tree.xpath("//xhtml:html", namespaces=nsmap)
     if len(xhtml):
-        raise DataFailureException(url, 500, response.data)
+        ex = DataFailureException(url, 500, response.data)
+        circuit_breaker.record_failure(ex)
+        raise ex
+
+    circuit_breaker.record_success()
+    return tree
+
+
+def get_resource(url, status_codes=None):
+    """
+    Issue a GET request to R25
+
+    Same as uw_r25.get_resource, but retried according to retry_policy.
+
+    :param url: endpoint to GET
+    :param status_codes: override the retryable status codes
+    :return: the response as an lxml.etree
+    """
+
+    url, response = _request("GET", url, {"Accept": "text/xml"},
+                             status_codes=status_codes)
+    if response.status != 200:
+        raise DataFailureException(url, response.status, response.data)
+
+    tree = response_tree(url, response)
+
+    return tree
+
+
+def post_resource(url):
+    """
+    Issue a POST request to R25
+
+    :param url: endpoint to POST to
+    :return: the response as an lxml.etree
+    """
+
+    url, response = _request("POST", url, {"Accept": "text/xml"})
+    if response.status == 429:
+        raise TooManyRequestsException(url)
+    if response.status != 201:
+        raise DataFailureException(url, response.status, response.data)
+
+    tree = response_tree(url, response)
 
     return tree
 
@@ -161,27 +650,16 @@ def put_resource(url, body):
     :return: the response as an lxml.etree
     """
 
-    instance = R25_DAO().get_service_setting("INSTANCE")
-    if instance is not None:
-        url = "/r25ws/wrd/%s/run/%s" % (instance, url)
-    else:
-        url = "/r25ws/servlet/wrd/run/%s" % url
-
     headers = {
         "Accept": "text/xml",
         "Content-Type": "text/xml",
     }
 
-    response = R25_DAO().putURL(url, headers, body)
+    url, response = _request("PUT", url, headers, body)
     if response.status not in (200, 201, 400, 403, 425):
         raise DataFailureException(url, response.status, response.data)
 
-    tree = etree.fromstring(response.data.strip())
-
-    # XHTML response is an error response
-    xhtml = tree.xpath("//xhtml:html", namespaces=nsmap)
-    if len(xhtml):
-        raise DataFailureException(url, 500, response.data)
+    tree = response_tree(url, response)
 
     enodes = tree.xpath("r25:error", namespaces=nsmap)
     if len(enodes):
@@ -220,31 +698,43 @@ def delete_resource(url):
     :return: the response as an lxml.etree
     """
 
-    instance = R25_DAO().get_service_setting("INSTANCE")
-    if instance is not None:
-        url = "/r25ws/wrd/%s/run/%s" % (instance, url)
-    else:
-        url = "/r25ws/servlet/wrd/run/%s" % url
-
     headers = {
         "Accept": "text/xml",
         "Content-Type": "text/xml",
     }
 
-    response = R25_DAO().deleteURL(url, headers)
+    url, response = _request("DELETE", url, headers)
     if response.status != 200:
         raise DataFailureException(url, response.status, response.data)
 
-    tree = etree.fromstring(response.data.strip())
-
-    # XHTML response is an error response
-    xhtml = tree.xpath("//xhtml:html", namespaces=nsmap)
-    if len(xhtml):
-        raise DataFailureException(url, 500, response.data)
+    tree = response_tree(url, response)
 
     return tree
 
 
+def get_cached_resource(url):
+    """
+    Issue a GET request to R25 for a read-only resource, caching the response
+
+    :param url: endpoint to GET
+    :return: the response as an lxml.etree, possibly from the cache
+    """
+    endpoint = url.split("?")[0]
+    ttl = cache_ttl(endpoint)
+    if not ttl:
+        return get_resource(url)
+
+    key = cache_key(endpoint, url)
+    data = get_cache().get(key)
+    if data is None:
+        tree = get_resource(url)
+        get_cache().set(key, etree.tostring(tree), ttl)
+        return tree
+
+    logger.debug("cache hit for %s" % url)
+    return etree.fromstring(data)
+
+
 def update_value(node, name, value):
     """
     Adds or updates the value of a basic text element in an R25 etree.
@@ -339,7 +829,6 @@ def delete_node(node):
     return node
 
 
-@retry(DataFailureException, status_codes=RETRY_STATUS_CODES)
 def get_editable_event(event):
     """
     Retrieves from R25 the editable version of the event, or a new blank event
@@ -515,11 +1004,31 @@ def update_event(event):
     return _update_event(url, event_tree)
 
 
-@retry(DataFailureException, status_codes=RETRY_STATUS_CODES)
 def _update_event(url, event_tree):
     return events_from_xml(put_resource(url, etree.tostring(event_tree)))[0]
 
 
+def get_event_by_id(event_id):
+    """
+    Same as uw_r25.events.get_event_by_id, but retried according to retry_policy
+    """
+    url = "event.xml?event_id={}".format(event_id)
+    return events_from_xml(get_resource(url))[0]
+
+
+def get_events(**kwargs):
+    """
+    Same as uw_r25.events.get_events, but retried according to retry_policy.
+
+    Also retries status 500, which R25 returns for some search timeouts.
+    """
+    url = "events.xml"
+    if len(kwargs):
+        url += "?{}".format(urlencode(kwargs))
+
+    return events_from_xml(get_resource(url, RETRY_STATUS_CODES + [500]))
+
+
 def delete_event(event_id):
     """
     Delete event from R25
@@ -543,7 +1052,7 @@ def get_space_by_short_name(short_name):
     """
     url = "spaces.xml"
     url += "?short_name={}".format(quote(short_name))
-    return spaces_from_xml(get_resource(url))[0]
+    return spaces_from_xml(get_cached_resource(url))[0]
 
 
 def get_event_type_list(**kwargs):
@@ -554,7 +1063,7 @@ def get_event_type_list(**kwargs):
     url = "evtype.xml"
     kwargs["scope"] = "list"
     url += "?{}".format(urlencode(kwargs))
-    return list_items_from_xml(get_resource(url))
+    return list_items_from_xml(get_cached_resource(url))
 
 
 def get_space_list(**kwargs):
@@ -564,7 +1073,7 @@ def get_space_list(**kwargs):
     url = "spaces.xml"
     kwargs["scope"] = "list"
     url += "?{}".format(urlencode(kwargs))
-    return list_items_from_xml(get_resource(url))
+    return list_items_from_xml(get_cached_resource(url))
 
 
 def get_event_list(**kwargs):
@@ -622,7 +1131,19 @@ def get_favorites(object_type):
     """
     url = "favorites.xml"
     url += "?object_type={}".format(object_type)
-    return dict(objects_from_xml(get_resource(url)))
+    return dict(objects_from_xml(get_cached_resource(url)))
+
+
+def space_shards(space_ids, count):
+    """
+    Split space ids into shards of similar size, to scan in parallel
+
+    :param space_ids: R25 space ids
+    :param count: number of shards
+    :return: list of lists of space ids, without empty shards
+    """
+    space_ids = sorted(int(space_id) for space_id in space_ids)
+    return [shard for shard in (space_ids[i::count] for i in range(count)) if shard]
 
 
 def add_favorite(object_type, object_id):
@@ -632,6 +1153,7 @@ def add_favorite(object_type, object_id):
     url = "favorites.xml"
     url += "?object_type={}&object_id={}".format(object_type, object_id)
     result = put_resource(url, "")
+    invalidate_cache("favorites.xml")
 
     return result
 
@@ -643,6 +1165,7 @@ def delete_favorite(object_type, object_id):
     url = "favorites.xml"
     url += "?object_type={}&object_id={}".format(object_type, object_id)
     result = delete_resource(url)
+    invalidate_cache("favorites.xml")
 
     return result
 
@@ -716,7 +1239,6 @@ def reservations_from_xml(tree):
     return reservations
 
 
-@retry(DataFailureException, status_codes=RETRY_STATUS_CODES)
 def get_reservations_attrs(**kwargs):
     kwargs["scope"] = "extended"
     url = "reservations.xml"
@@ -726,3 +1248,62 @@ def get_reservations_attrs(**kwargs):
     result = get_resource(url)
 
     return (reservations_from_xml(result), dict(result.attrib))
+
+
+# Compact, picklable stand-ins for the Reservation fields r25_mazevo uses
+ReservationRecord = namedtuple("ReservationRecord", [
+    "event_id", "event_name", "event_title", "event_notes",
+    "start_datetime", "end_datetime", "space_reservation"])
+SpaceRecord = namedtuple("SpaceRecord", ["name"])
+
+
+def get_reservations_data(**kwargs):
+    """
+    Same query as get_reservations_attrs, but leaves parsing the response to
+    reservation_records_from_data, e.g. in another process
+
+    :return: the url and the raw response data
+    """
+    kwargs["scope"] = "extended"
+    url = "reservations.xml"
+    if len(kwargs):
+        url += "?{}".format(urlencode(kwargs))
+
+    url, response = _request("GET", url, {"Accept": "text/xml"})
+    if response.status != 200:
+        raise DataFailureException(url, response.status, response.data)
+
+    return url, response.data
+
+
+def reservation_records_from_data(url, data):
+    """
+    Parse a reservations.xml response into compact records. Runs in a worker
+    process, so the caller records the outcome with circuit_breaker.
+
+    :return: list of ReservationRecord, and the response attributes
+    """
+    try:
+        tree = etree.fromstring(data.strip())
+    except etree.XMLSyntaxError as ex:
+        # XMLSyntaxError can't be pickled back to the caller
+        raise DataFailureException(url, 500, str(ex))
+
+    # XHTML response is an error response
+    if len(tree.xpath("//xhtml:html", namespaces=nsmap)):
+        raise DataFailureException(url, 500, data)
+
+    records = []
+    for reservation in reservations_from_xml(tree):
+        space = reservation.space_reservation
+        records.append(ReservationRecord(
+            reservation.event_id,
+            reservation.event_name,
+            reservation.event_title,
+            reservation.event_notes,
+            reservation.start_datetime,
+            reservation.end_datetime,
+            SpaceRecord(space.name) if space else None,
+        ))
+
+    return records, dict(tree.attrib)
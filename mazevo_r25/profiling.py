@@ -0,0 +1,66 @@
+"""
+Profiles a sync run with cProfile, phase by phase, for the --profile option
+"""
+
+from collections import OrderedDict
+import cProfile
+from io import StringIO
+import pstats
+
+
+# Default number of functions listed for each phase
+PROFILE_TOP = 20
+
+
+class PhaseProfiler(object):
+    """
+    Keeps a separate cProfile profile for each phase of a run. Only the
+    thread the run is in is profiled; time spent waiting for worker threads
+    shows up as waiting.
+
+    :param path: file to write the stats of the whole run to, for pstats,
+                 snakeviz and the like
+    :param top: number of functions listed for each phase
+    """
+
+    def __init__(self, path, top=PROFILE_TOP):
+        self.path = path
+        self.top = top
+        self.profiles = OrderedDict()
+        self.current = None
+
+    def phase(self, name):
+        """
+        Stop profiling the current phase, if any, and start on the next one
+
+        :param name: name of the next phase, or None to stop
+        """
+        if self.current:
+            self.current.disable()
+            self.current = None
+        if name:
+            self.current = self.profiles.setdefault(name, cProfile.Profile())
+            self.current.enable()
+
+    def finish(self):
+        """
+        Stop profiling and write the stats file
+
+        :return: the functions taking the most time in each phase, as text
+        """
+        self.phase(None)
+        report = StringIO()
+        combined = None
+        for name, profile in self.profiles.items():
+            stats = pstats.Stats(profile, stream=report)
+            report.write("Phase {}: {:.3f}s\n".format(name, stats.total_tt))
+            stats.sort_stats("tottime").print_stats(self.top)
+            if combined is None:
+                combined = pstats.Stats(profile)
+            else:
+                combined.add(profile)
+
+        if combined:
+            combined.dump_stats(self.path)
+            report.write("Wrote profile to {}\n".format(self.path))
+        return report.getvalue()
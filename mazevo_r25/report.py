@@ -0,0 +1,87 @@
+"""
+Collects the warnings logged during a run into a short report to email.
+
+Messages are grouped by template: the format string if the message was logged
+with arguments, or else the message with its numbers masked. Only a few
+examples of each are kept, so an outage that logs the same warning for every
+booking costs a few lines of memory and of email.
+"""
+
+from collections import OrderedDict
+import logging
+import re
+
+from django.conf import settings
+
+
+# Default number of different examples kept of each kind of message, and of
+# kinds of message kept. Override with settings.MAZEVO_R25_REPORT_EXAMPLES and
+# settings.MAZEVO_R25_REPORT_TEMPLATES
+REPORT_EXAMPLES = 5
+REPORT_TEMPLATES = 100
+
+NUMBER = re.compile(r"\d+")
+
+
+def message_template(record):
+    """
+    :return: what messages like this one have in common
+    """
+    if record.args:
+        return str(record.msg)
+    return NUMBER.sub("#", record.getMessage())
+
+
+class ReportCollector(logging.Handler):
+    """
+    A logging handler keeping counts and a few examples of each kind of message
+
+    :param level: least severe level collected
+    """
+
+    def __init__(self, level=logging.WARNING):
+        super(ReportCollector, self).__init__(level)
+        self.max_examples = getattr(
+            settings, "MAZEVO_R25_REPORT_EXAMPLES", REPORT_EXAMPLES)
+        self.max_templates = getattr(
+            settings, "MAZEVO_R25_REPORT_TEMPLATES", REPORT_TEMPLATES)
+        self.templates = OrderedDict()
+        self.total = 0
+        self.dropped = 0
+
+    def emit(self, record):
+        self.total += 1
+        template = message_template(record)
+        # count and examples of the message
+        entry = self.templates.get(template)
+        if entry is None:
+            if len(self.templates) >= self.max_templates:
+                self.dropped += 1
+                return
+            entry = self.templates[template] = [0, OrderedDict()]
+        entry[0] += 1
+
+        examples = entry[1]
+        message = self.format(record)
+        if message in examples:
+            examples[message] += 1
+        elif len(examples) < self.max_examples:
+            examples[message] = 1
+
+    def __len__(self):
+        return self.total
+
+    def __str__(self):
+        lines = []
+        for template, (count, examples) in self.templates.items():
+            for message, repeated in examples.items():
+                if repeated > 1:
+                    lines.append("{} (repeated {} times)".format(message, repeated))
+                else:
+                    lines.append(message)
+            more = count - sum(examples.values())
+            if more:
+                lines.append("... and {} more like: {}".format(more, template))
+        if self.dropped:
+            lines.append("... and {} more of other kinds".format(self.dropped))
+        return "\n".join(lines)
@@ -0,0 +1,237 @@
+"""
+Records each run of the sync commands as a MazevoSyncRun
+"""
+
+from collections import Counter, OrderedDict
+import datetime
+import json
+import logging
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+
+from .models import MazevoSyncRun
+from .report import ReportCollector
+
+
+logger = logging.getLogger(__name__)
+
+# Number of weeks shown in the admin's trends
+TREND_WEEKS = 26
+
+# Options every management command has, which say nothing about the run
+COMMON_OPTIONS = (
+    "force_color",
+    "no_color",
+    "pythonpath",
+    "settings",
+    "skip_checks",
+    "traceback",
+    "verbosity",
+)
+
+
+class RunRecorder(object):
+    """
+    Records a command's run: its options, counts, and how long each phase
+    took. The run is saved when it starts, so a run that never finishes is
+    left as running. Warnings logged during the run are collected in report.
+
+        with RunRecorder(MazevoSyncRun.COMMAND_MAZEVO2R25, options, logger) as run:
+            run.phase("bookings")
+            run.count("created")
+
+    :param command: one of MazevoSyncRun.COMMAND_CHOICES
+    :param options: the command's options, of which the mode flags are kept.
+                    With a "profile" option, each phase is profiled.
+    :param logger: the command's logger, whose warnings are collected
+    :param report_loggers: other loggers whose warnings are collected, if they
+                           don't propagate to logger
+    """
+
+    def __init__(self, command, options, logger, report_loggers=()):
+        self.logger = logger
+        self.report_loggers = [logger] + list(report_loggers)
+        self.profiler = None
+        if options.get("profile"):
+            from .profiling import PROFILE_TOP, PhaseProfiler
+
+            self.profiler = PhaseProfiler(
+                options["profile"], options.get("profile_top") or PROFILE_TOP)
+        self.run = MazevoSyncRun(command=command, started=timezone.now())
+        self.run.set_options(OrderedDict(
+            (name, value) for name, value in sorted(options.items())
+            if name not in COMMON_OPTIONS and value not in (None, False)))
+        self.report = ReportCollector()
+        self.phases = OrderedDict()
+        self.phase_name = None
+        self.phase_start = None
+        self.start = None
+
+    def __enter__(self):
+        self.run.save()
+        for report_logger in self.report_loggers:
+            report_logger.addHandler(self.report)
+        self.start = time.time()
+        return self
+
+    def phase(self, name):
+        """
+        End the current phase, if any, and start the next one
+
+        :param name: name of the next phase, or None
+        """
+        now = time.time()
+        if self.phase_name:
+            self.phases[self.phase_name] = (
+                self.phases.get(self.phase_name, 0) + now - self.phase_start)
+        self.phase_name = name
+        self.phase_start = now
+        if self.profiler:
+            self.profiler.phase(name)
+
+    def count(self, name, n=1):
+        """
+        Add to one of the run's counts, e.g. "created"
+        """
+        setattr(self.run, name, getattr(self.run, name) + n)
+
+    def window(self, start_date, end_date):
+        """
+        Record the dates the run covered
+        """
+        self.run.window_start = start_date
+        self.run.window_end = end_date
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # the R25 client is only imported here, as the admin uses this module
+        from .more_r25 import request_stats, retry_policy
+
+        self.phase(None)
+        for report_logger in self.report_loggers:
+            report_logger.removeHandler(self.report)
+
+        run = self.run
+        run.warnings = self.report.total
+        run.finished = timezone.now()
+        run.duration = time.time() - self.start
+        run.requests = sum(retry_policy.requests.values())
+        run.retries = sum(retry_policy.retries.values())
+        run.set_phases(OrderedDict(
+            (name, round(seconds, 3)) for name, seconds in self.phases.items()))
+        if exc_type:
+            run.outcome = MazevoSyncRun.OUTCOME_FAILED
+        elif run.warnings or run.errors:
+            run.outcome = MazevoSyncRun.OUTCOME_WARNINGS
+        else:
+            run.outcome = MazevoSyncRun.OUTCOME_SUCCESS
+
+        self.logger.info("R25 requests by endpoint:\n{}".format(request_stats))
+        if self.profiler:
+            self.logger.info(self.profiler.finish())
+
+        # don't hide the run's own exception, if any
+        try:
+            run.save()
+        except Exception as ex:
+            logger.error("Unable to record run: {}".format(ex))
+
+        metrics_dir = getattr(settings, "MAZEVO_R25_METRICS_DIR", None)
+        if metrics_dir:
+            try:
+                write_metrics(metrics_dir, run)
+            except Exception as ex:
+                logger.error("Unable to write metrics: {}".format(ex))
+        return False
+
+
+def write_metrics(metrics_dir, run):
+    """
+    Write a run's R25 request counts and latency, and when it finished, as an
+    OpenMetrics textfile, e.g. for the node exporter's textfile collector. The
+    file is replaced atomically, one per command.
+
+    :param metrics_dir: directory to write mazevo_r25_<command>.prom to
+    :param run: the finished MazevoSyncRun
+    """
+    from .more_r25 import request_stats
+
+    labels = {"command": run.command}
+    text = "\n".join([
+        "# TYPE mazevo_r25_run_finished_seconds gauge",
+        "# HELP mazevo_r25_run_finished_seconds When the last run finished.",
+        'mazevo_r25_run_finished_seconds{{command="{}"}} {}'.format(
+            run.command, run.finished.timestamp()),
+        "# TYPE mazevo_r25_run_duration_seconds gauge",
+        "# HELP mazevo_r25_run_duration_seconds How long the last run took.",
+        'mazevo_r25_run_duration_seconds{{command="{}"}} {}'.format(
+            run.command, run.duration),
+        "# TYPE mazevo_r25_run_failed gauge",
+        "# HELP mazevo_r25_run_failed Whether the last run failed.",
+        'mazevo_r25_run_failed{{command="{}"}} {}'.format(
+            run.command, int(run.outcome == MazevoSyncRun.OUTCOME_FAILED)),
+        request_stats.openmetrics(labels),
+    ])
+
+    fd, temp_path = tempfile.mkstemp(dir=metrics_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, os.path.join(
+            metrics_dir, "mazevo_r25_{}.prom".format(run.command)))
+    except Exception:
+        os.unlink(temp_path)
+        raise
+
+
+def weekly_trends(weeks=TREND_WEEKS):
+    """
+    Summarize the finished runs of each command by week
+
+    :param weeks: number of weeks to go back
+    :return: dict by command of lists of weekly summaries, newest first
+    """
+    since = timezone.now() - datetime.timedelta(weeks=weeks)
+    runs = MazevoSyncRun.objects.filter(started__gte=since).exclude(
+        outcome=MazevoSyncRun.OUTCOME_RUNNING)
+
+    summaries = runs.annotate(week=TruncWeek("started")).values(
+        "command", "week").annotate(
+            runs=Count("id"),
+            failed=Count("id", filter=Q(outcome=MazevoSyncRun.OUTCOME_FAILED)),
+            seen=Sum("seen"),
+            changed=Sum(F("created") + F("updated") + F("cancelled")),
+            errors=Sum("errors"),
+            requests=Sum("requests"),
+            retries=Sum("retries"),
+            duration=Sum("duration"),
+        ).order_by("command", "-week")
+
+    # phases are JSON, so they're added up here rather than in the database
+    phases = {}
+    for command, started, run_phases in runs.values_list(
+            "command", "started", "phases").iterator():
+        started = timezone.localtime(started).date()
+        week = started - datetime.timedelta(days=started.weekday())
+        phases.setdefault((command, week), Counter()).update(json.loads(run_phases))
+
+    trends = OrderedDict()
+    for summary in summaries:
+        week = timezone.localtime(summary["week"]).date()
+        duration = summary["duration"] or 0
+        summary["week"] = week
+        summary["average_duration"] = duration / summary["runs"]
+        summary["throughput"] = summary["seen"] / duration if duration else None
+        summary["retry_rate"] = (
+            summary["retries"] / summary["requests"] if summary["requests"] else 0)
+        summary["phases"] = OrderedDict(
+            (name, seconds / summary["runs"])
+            for name, seconds in phases.get((summary["command"], week), {}).items())
+        trends.setdefault(summary["command"], []).append(summary)
+    return trends
@@ -0,0 +1,310 @@
+"""
+A local HTTP stand-in for the R25 and Mazevo web services, for load testing
+concurrency, rate limiting and retries without touching production.
+
+Responses come from mock data files, e.g. those written by the
+generate_mock_data command, in the same layout the mock DAO uses. Writes are
+kept in memory, so an event PUT is returned by later GETs. Latency, errors and
+429 quotas can be injected.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import logging
+import random
+import re
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from lxml import etree
+from restclients_core.dao import MockDAO
+from restclients_core.util.mock import load_resource_from_path
+from uw_r25 import nsmap
+
+
+logger = logging.getLogger(__name__)
+
+R25_PATH = re.compile(r"^/r25ws/(?:servlet/wrd|wrd/[^/]+)/run/(?P<url>.*)$")
+
+EMPTY_RESULTS = (
+    b'<?xml version="1.0" encoding="UTF-8"?>\n'
+    b'<r25:results xmlns:r25="http://www.collegenet.com/r25"/>\n'
+)
+
+
+class StandInState(object):
+    """
+    Mock data files plus the changes made through the stand-in
+    """
+
+    def __init__(self, paths):
+        self.paths = list(paths) + [p for p in MockDAO.paths if p not in paths]
+        self.lock = threading.Lock()
+        self.events = {}
+        self.deleted = set()
+        self.favorites = {}
+        self.next_event_id = 90000000
+
+    def load(self, service, url):
+        """
+        :return: status and data of the mock data file for the url
+        """
+        for path in self.paths:
+            response = load_resource_from_path(path, service, "file", url, {})
+            if response and response.status != 404:
+                return response.status, response.data
+        return 404, b""
+
+    def r25_get(self, url, query):
+        endpoint = url.split("?")[0]
+        event_id = query.get("event_id")
+        if endpoint == "event.xml" and event_id:
+            with self.lock:
+                if event_id in self.deleted:
+                    return 404, b""
+                if event_id in self.events:
+                    return 200, self.events[event_id]
+
+        if endpoint == "favorites.xml":
+            with self.lock:
+                changes = self.favorites.get(query.get("object_type"))
+            if changes:
+                return self.r25_favorites(url, changes)
+
+        status, data = self.load("r25", "/r25ws/servlet/wrd/run/" + url)
+
+        if endpoint == "events.xml" and "starts_with" in query:
+            return 200, self.r25_search(data if status == 200 else None,
+                                        query["starts_with"])
+
+        return status, data
+
+    def r25_search(self, data, starts_with):
+        """
+        Apply our changes to an events.xml search result
+        """
+        if data:
+            tree = etree.fromstring(data.strip())
+        else:
+            tree = etree.Element("{%s}events" % nsmap["r25"], nsmap=nsmap)
+
+        with self.lock:
+            seen = set()
+            for enode in tree.xpath("r25:event", namespaces=nsmap):
+                event_id = enode.xpath("r25:event_id", namespaces=nsmap)[0].text
+                seen.add(event_id)
+                if event_id in self.deleted:
+                    tree.remove(enode)
+                elif event_id in self.events:
+                    tree.replace(enode, self.event_node(event_id))
+
+            for event_id in self.events:
+                if event_id in seen or event_id in self.deleted:
+                    continue
+                enode = self.event_node(event_id)
+                name = enode.xpath("r25:event_name", namespaces=nsmap)[0].text
+                if name and name.startswith(starts_with):
+                    tree.append(enode)
+
+        return etree.tostring(tree, xml_declaration=True, encoding="UTF-8")
+
+    def event_node(self, event_id):
+        tree = etree.fromstring(self.events[event_id].strip())
+        return tree.xpath("r25:event", namespaces=nsmap)[0]
+
+    def r25_favorites(self, url, changes):
+        status, data = self.load("r25", "/r25ws/servlet/wrd/run/" + url)
+        if status == 200:
+            tree = etree.fromstring(data.strip())
+        else:
+            tree = etree.Element("{%s}favorites" % nsmap["r25"], nsmap=nsmap)
+
+        changes = dict(changes)
+        for node in tree.xpath("r25:object", namespaces=nsmap):
+            object_id = node.xpath("r25:object_id", namespaces=nsmap)[0].text
+            if changes.get(object_id) is False:
+                tree.remove(node)
+            changes[object_id] = None
+
+        for object_id, added in changes.items():
+            if added:
+                node = etree.SubElement(tree, "{%s}object" % nsmap["r25"])
+                for name in ("object_id", "object_name"):
+                    etree.SubElement(node, "{%s}%s" % (nsmap["r25"], name)).text = (
+                        object_id)
+
+        return 200, etree.tostring(tree, xml_declaration=True, encoding="UTF-8")
+
+    def r25_post(self, url, query):
+        if url.split("?")[0] != "events.xml":
+            return 404, b""
+
+        status, data = self.load("r25", "/r25ws/servlet/wrd/run/events.xml")
+        if status not in (200, 201):
+            return 404, b""
+
+        tree = etree.fromstring(data.strip())
+        with self.lock:
+            self.next_event_id += 1
+            event_id = str(self.next_event_id)
+        for node in tree.xpath("r25:event/r25:event_id", namespaces=nsmap):
+            node.text = event_id
+
+        return 201, etree.tostring(tree, xml_declaration=True, encoding="UTF-8")
+
+    def r25_put(self, url, query, body):
+        endpoint = url.split("?")[0]
+        if endpoint == "favorites.xml":
+            with self.lock:
+                self.favorites.setdefault(query.get("object_type"), {})[
+                    query.get("object_id")] = True
+            return 200, EMPTY_RESULTS
+
+        if endpoint != "event.xml" or "event_id" not in query:
+            return 404, b""
+
+        tree = etree.fromstring(body.strip())
+        # R25 applies the changes, so everything is established again
+        for node in tree.xpath("//*[@status='del']"):
+            node.getparent().remove(node)
+        for node in tree.xpath("//*[@status]"):
+            node.attrib["status"] = "est"
+
+        data = etree.tostring(tree, xml_declaration=True, encoding="UTF-8")
+        with self.lock:
+            self.events[query["event_id"]] = data
+            self.deleted.discard(query["event_id"])
+
+        return 200, data
+
+    def r25_delete(self, url, query):
+        endpoint = url.split("?")[0]
+        if endpoint == "favorites.xml":
+            with self.lock:
+                self.favorites.setdefault(query.get("object_type"), {})[
+                    query.get("object_id")] = False
+            return 200, EMPTY_RESULTS
+
+        if endpoint != "event.xml" or "event_id" not in query:
+            return 404, b""
+
+        with self.lock:
+            self.deleted.add(query["event_id"])
+            self.events.pop(query["event_id"], None)
+
+        return 200, EMPTY_RESULTS
+
+    def mazevo(self, method, path):
+        status, data = self.load("mazevo", path)
+        if status == 404 and method == "POST":
+            # accept uploads, like PublicCourses import_term
+            return 200, b"{}"
+        return status, data
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Serves requests from server.state, misbehaving as configured on the server
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def handle_one(self, method):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+
+        if server.latency or server.jitter:
+            time.sleep(server.latency + random.uniform(0, server.jitter))
+
+        retry_after = server.throttle()
+        if retry_after is not None:
+            return self.reply(429, b"", {"Retry-After": str(retry_after)})
+
+        if server.error_rate and random.random() < server.error_rate:
+            return self.reply(500, b"Injected error")
+
+        parts = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        match = R25_PATH.match(parts.path)
+        if match:
+            url = match.group("url") + ("?" + parts.query if parts.query else "")
+            if method == "GET":
+                status, data = server.state.r25_get(url, query)
+            elif method == "POST":
+                status, data = server.state.r25_post(url, query)
+            elif method == "PUT":
+                status, data = server.state.r25_put(url, query, body)
+            else:
+                status, data = server.state.r25_delete(url, query)
+            content_type = "text/xml"
+        else:
+            status, data = server.state.mazevo(method, self.path)
+            content_type = "application/json"
+
+        self.reply(status, data, {"Content-Type": content_type})
+
+    def reply(self, status, data, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self.handle_one("GET")
+
+    def do_POST(self):
+        self.handle_one("POST")
+
+    def do_PUT(self):
+        self.handle_one("PUT")
+
+    def do_DELETE(self):
+        self.handle_one("DELETE")
+
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    :param paths: mock data directories, searched before the mock DAO's own
+    :param latency: seconds added to every response
+    :param jitter: up to this many more seconds added at random
+    :param error_rate: fraction of requests answered with a 500
+    :param quota: requests allowed per second before answering 429
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, paths, latency=0, jitter=0, error_rate=0,
+                 quota=None):
+        super(StandInServer, self).__init__(address, StandInHandler)
+        self.state = StandInState(paths)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.quota = quota
+        self.window = None
+        self.window_count = 0
+        self.throttle_lock = threading.Lock()
+
+    def throttle(self):
+        """
+        Count a request against the quota
+
+        :return: seconds until the next window if over quota, else None
+        """
+        if not self.quota:
+            return None
+        with self.throttle_lock:
+            window = int(time.time())
+            if window != self.window:
+                self.window = window
+                self.window_count = 0
+            self.window_count += 1
+            if self.window_count > self.quota:
+                return 1
+        return None
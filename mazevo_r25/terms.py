@@ -0,0 +1,141 @@
+"""
+Cached SWS term lookups. Term calendars are fixed months in advance, so terms
+are kept in a Django cache and SWS is only asked again after a long TTL, or
+not at all when it's down and a stale copy is available.
+"""
+
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from restclients_core.exceptions import DataFailureException
+from uw_sws import QUARTER_SEQ, get_resource
+from uw_sws import term as sws_term
+from uw_sws.models import Term
+
+
+logger = logging.getLogger(__name__)
+
+# Default lifetime, in seconds, of cached terms.
+# Override with settings.MAZEVO_R25_TERM_CACHE_TTL
+TERM_CACHE_TTL = 30 * 24 * 60 * 60
+
+# Default number of terms after the current one to cache ahead of time.
+# Override with settings.MAZEVO_R25_TERMS_AHEAD
+TERMS_AHEAD = 4
+
+
+def get_cache():
+    """
+    The Django cache used for SWS terms, chosen by settings.MAZEVO_R25_TERM_CACHE,
+    or else settings.MAZEVO_R25_CACHE (default "default")
+    """
+    return caches[getattr(settings, "MAZEVO_R25_TERM_CACHE",
+                          getattr(settings, "MAZEVO_R25_CACHE", "default"))]
+
+
+def term_cache_ttl():
+    return getattr(settings, "MAZEVO_R25_TERM_CACHE_TTL", TERM_CACHE_TTL)
+
+
+def _cached(key, fetch):
+    """
+    Get a value from the cache, fetching it again once it is older than the
+    TTL. If fetching fails, a stale value is used instead.
+
+    :param key: cache key
+    :param fetch: function to get the value from SWS
+    """
+    cached = get_cache().get(key)
+    if cached and time.time() - cached["fetched"] < term_cache_ttl():
+        return cached["value"]
+
+    try:
+        value = fetch()
+    except DataFailureException as ex:
+        if not cached:
+            raise
+        logger.warning("SWS unavailable, using term data from {}: {}".format(
+            time.ctime(cached["fetched"]), ex))
+        return cached["value"]
+
+    # kept until replaced, so there is always a stale copy to fall back on
+    get_cache().set(key, {"value": value, "fetched": time.time()}, None)
+    return value
+
+
+def get_term_by_year_and_quarter(year, quarter):
+    """
+    :return: uw_sws.models.Term for the year and quarter
+    """
+    quarter = quarter.lower()
+    data = _cached(
+        "mazevo_r25:sws_term:{}:{}".format(year, quarter),
+        lambda: get_resource("{}/{},{}.json".format(
+            sws_term.term_res_url_prefix, year, quarter)))
+    return Term(data=data)
+
+
+def get_term_before(term):
+    """
+    :return: uw_sws.models.Term for the term before the one given
+    """
+    year = term.year
+    quarter = QUARTER_SEQ[QUARTER_SEQ.index(term.quarter) - 1]
+    if quarter == "autumn":
+        year -= 1
+    return get_term_by_year_and_quarter(year, quarter)
+
+
+def get_term_after(term):
+    """
+    :return: uw_sws.models.Term for the term after the one given
+    """
+    year = term.year
+    quarter = QUARTER_SEQ[(QUARTER_SEQ.index(term.quarter) + 1) % len(QUARTER_SEQ)]
+    if quarter == "winter":
+        year += 1
+    return get_term_by_year_and_quarter(year, quarter)
+
+
+def get_terms_ahead():
+    """
+    :return: list of (year, quarter) from the current term, as SWS decided it
+             when the list was cached, through settings.MAZEVO_R25_TERMS_AHEAD
+             terms after it
+    """
+    def fetch():
+        term = sws_term.get_current_term()
+        terms = [(term.year, term.quarter)]
+        for i in range(getattr(settings, "MAZEVO_R25_TERMS_AHEAD", TERMS_AHEAD)):
+            term = get_term_after(term)
+            terms.append((term.year, term.quarter))
+        return terms
+
+    return _cached("mazevo_r25:sws_terms_ahead", fetch)
+
+
+def get_current_term():
+    """
+    The current term, the same way uw_sws decides it, from the cached list of
+    terms ahead. A term stops being current once its grading period is past.
+
+    :return: uw_sws.models.Term
+    """
+    for year, quarter in get_terms_ahead():
+        term = get_term_by_year_and_quarter(year, quarter)
+        if not term.is_grading_period_past():
+            return term
+
+    # we're past every cached term, so start the list again
+    get_cache().delete("mazevo_r25:sws_terms_ahead")
+    year, quarter = get_terms_ahead()[0]
+    return get_term_by_year_and_quarter(year, quarter)
+
+
+def get_next_term():
+    """
+    :return: uw_sws.models.Term for the term after the current term
+    """
+    return get_term_after(get_current_term())
@@ -0,0 +1,101 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from restclients_core.dao import DAO, MockDAO
+from restclients_core.models import CacheHTTP, MockHTTP
+from uw_r25.dao import R25_DAO
+
+from mazevo_r25.cache import DjangoCache, get_cache, invalidate_cache
+from mazevo_r25.more_r25 import get_space_list
+
+
+def mock_response(data):
+    response = MockHTTP()
+    response.status = 200
+    response.data = data
+    response.headers = {"Content-Type": "text/xml"}
+    return response
+
+
+@override_settings(RESTCLIENTS_DAO_CACHE_CLASS="mazevo_r25.cache.DjangoCache",
+                   MAZEVO_R25_CACHE_TTLS={"spaces.xml": 0})
+class TestDjangoCache(TestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        DAO._cache_instance = None
+
+    def tearDown(self):
+        DAO._cache_instance = None
+
+    def test_ttls(self):
+        cache = DjangoCache()
+        self.assertEqual(cache.get_cache_ttl(
+            "r25", "/r25ws/servlet/wrd/run/spaces.xml?scope=list"), 21600)
+        self.assertEqual(cache.get_cache_ttl(
+            "r25", "/r25ws/servlet/wrd/run/events.xml?scope=extended"), 0)
+        self.assertEqual(cache.get_cache_ttl(
+            "sws", "/student/v5/term/2024,autumn.json"), 604800)
+        self.assertEqual(cache.get_cache_ttl(
+            "sws", "/student/v5/term/current.json"), 86400)
+        self.assertEqual(cache.get_cache_ttl(
+            "mazevo", "/api/PublicConfiguration/Rooms"), 3600)
+
+        with self.settings(MAZEVO_R25_RESTCLIENTS_CACHE_TTLS={
+                "r25": [(r"/event\.xml", 60)]}):
+            self.assertEqual(cache.get_cache_ttl(
+                "r25", "/r25ws/servlet/wrd/run/event.xml?event_id=1"), 60)
+            # never cached
+            self.assertEqual(cache.get_cache_ttl(
+                "r25", "/r25ws/servlet/wrd/run/event.xml?event_id=1&mode=edit"), 0)
+            self.assertEqual(cache.get_cache_ttl(
+                "r25", "/r25ws/servlet/wrd/run/spaces.xml?scope=list"), 0)
+
+    def test_cache(self):
+        cache = DjangoCache()
+        url = "/api/PublicConfiguration/Rooms"
+        self.assertIsNone(cache.getCache("mazevo", url, {}))
+
+        cache.processResponse("mazevo", url, mock_response("[]"))
+        response = cache.getCache("mazevo", url, {})["response"]
+        self.assertIsInstance(response, CacheHTTP)
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.data, "[]")
+        self.assertEqual(response.getheader("content-type"), "text/xml")
+
+        cache.deleteCache("mazevo", url)
+        self.assertIsNone(cache.getCache("mazevo", url, {}))
+
+        # errors aren't cached
+        response = mock_response("")
+        response.status = 500
+        cache.processResponse("mazevo", url, response)
+        self.assertIsNone(cache.getCache("mazevo", url, {}))
+
+    def test_dao(self):
+        with mock.patch.object(MockDAO, "load", autospec=True,
+                               side_effect=MockDAO.load) as mock_load:
+            get_space_list()
+            spaces = get_space_list()
+            self.assertEqual(mock_load.call_count, 1)
+            self.assertEqual(spaces[1002], "JHN 303")
+
+            # discarded along with the reference data cache
+            invalidate_cache("spaces.xml")
+            get_space_list()
+            self.assertEqual(mock_load.call_count, 2)
+
+    @override_settings(MAZEVO_R25_RESTCLIENTS_CACHE_TTLS={
+        "r25": [(r"/event\.xml", 60)]})
+    def test_edit(self):
+        url = "/r25ws/servlet/wrd/run/event.xml?event_id=1"
+        response = mock_response("<r25:events/>")
+        with mock.patch.object(MockDAO, "load", return_value=response) as mock_load:
+            R25_DAO().getURL(url, {})
+            R25_DAO().getURL(url, {})
+            self.assertEqual(mock_load.call_count, 1)
+
+            # events fetched for editing always come from R25
+            R25_DAO().getURL(url + "&mode=edit", {})
+            R25_DAO().getURL(url + "&mode=edit", {})
+            self.assertEqual(mock_load.call_count, 3)
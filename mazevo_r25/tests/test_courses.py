@@ -0,0 +1,168 @@
+import datetime
+import gzip
+import json
+import os
+import tempfile
+
+from django.test import TestCase
+from uw_r25.models import Reservation, Space
+
+from mazevo_r25.courses import (
+    NameParser, TermCalendar, add_reservation, changed_courses, format_time,
+    meeting_time, merge_meeting_weeks, payload_hashes, read_payloads,
+    write_payloads)
+
+
+DAYS_OF_WEEK = [
+    "sunday", "monday", "tuesday", "wednesday", "thursday", "friday", "saturday",
+]
+
+
+def make_reservation(event_id, event_name, start, end, space_name):
+    reservation = Reservation()
+    reservation.event_id = str(event_id)
+    reservation.event_name = event_name
+    reservation.event_title = event_name.title()
+    reservation.event_notes = None
+    reservation.start_datetime = start
+    reservation.end_datetime = end
+    reservation.space_reservation = Space()
+    reservation.space_reservation.name = space_name
+    return reservation
+
+
+class TestCourses(TestCase):
+
+    def setUp(self):
+        self.calendar = TermCalendar("2025-09-20", "2025-12-13")
+        self.names = NameParser()
+
+    def add(self, courses, dates, event_id=1, name="*CSE 142 A CSE142A 20254",
+            space="GNOMS060", unlisted=()):
+        for date in dates:
+            add_reservation(courses, make_reservation(
+                event_id, name, date + "T09:30:00-07:00", date + "T10:20:00-07:00",
+                space), unlisted, self.calendar, self.names)
+
+    def test_add_reservation(self):
+        courses = {}
+        self.add(courses, ["2025-09-29", "2025-10-01"])
+        course = courses[1]
+        self.assertEqual(course["subjectCode"], "CSE")
+        self.assertEqual(course["courseNumber"], "142")
+        self.assertEqual(course["section"], "A")
+
+        weeks = course["meetingTimesDict"][("0930", "1020", "GNOM", "S060")]
+        # the week of Sunday 2025-09-28, with Monday and Wednesday set
+        week = datetime.date(2025, 9, 28).toordinal() // 7
+        self.assertEqual(weeks, {week: 0b0001010})
+
+        meeting = meeting_time(
+            ("0930", "1020", "GNOM", "S060"), week, week, weeks[week], DAYS_OF_WEEK)
+        self.assertEqual(meeting["startDate"], "2025-09-28")
+        self.assertEqual(meeting["endDate"], "2025-10-04")
+        self.assertTrue(meeting["monday"])
+        self.assertFalse(meeting["tuesday"])
+        self.assertTrue(meeting["wednesday"])
+        self.assertFalse(meeting["sunday"])
+
+    def test_unlisted(self):
+        courses = {}
+        self.add(courses, ["2025-09-29"], unlisted=[1])
+        self.assertEqual(courses[1]["subjectCode"], "-")
+        self.assertEqual(courses[1]["courseTitle"], "In use -----")
+
+    def test_unknown_course(self):
+        courses = {}
+        self.add(courses, ["2025-09-29"], name="staff meeting")
+        self.assertEqual(courses, {})
+
+    def test_merge_meeting_weeks(self):
+        courses = {}
+        # MW for two weeks, then only M, then a gap week, then M again
+        self.add(courses, ["2025-09-29", "2025-10-01", "2025-10-06", "2025-10-08",
+                           "2025-10-13", "2025-10-27"])
+        self.assertEqual(merge_meeting_weeks(courses, DAYS_OF_WEEK), 3)
+
+        meetings = courses[1]["meetingTimes"]
+        self.assertNotIn("meetingTimesDict", courses[1])
+        self.assertEqual(
+            [(m["startDate"], m["endDate"], m["wednesday"]) for m in meetings],
+            [("2025-09-28", "2025-10-11", True),
+             ("2025-10-12", "2025-10-18", False),
+             ("2025-10-26", "2025-11-01", False)])
+        self.assertEqual(meetings[0]["buildingCode"], "GNOM")
+        self.assertEqual(meetings[0]["roomCode"], "S060")
+        self.assertEqual(meetings[0]["startTime"], "0930")
+
+    def test_merge_courses(self):
+        courses = {}
+        self.add(courses, ["2025-09-29", "2025-10-06"], event_id=1)
+        self.add(courses, ["2025-09-30", "2025-10-02"], event_id=2,
+                 name="STAT 391 AB STAT391AB 20254", space="BAG  260")
+        self.assertEqual(merge_meeting_weeks(courses, DAYS_OF_WEEK), 2)
+        self.assertEqual(courses[2]["meetingTimes"][0]["buildingCode"], "BAG")
+
+    def test_calendar(self):
+        week = datetime.date(2025, 9, 28).toordinal() // 7
+        self.assertEqual(self.calendar.day("2025-09-28T09:30:00-07:00"), (week, 1))
+        self.assertEqual(self.calendar.day("2025-10-04T09:30:00-07:00"),
+                         (week, 1 << 6))
+        # outside the term
+        self.assertEqual(self.calendar.day("2025-09-01T09:30:00-07:00"),
+                         (week - 4, 1 << 1))
+        self.assertEqual(format_time("13:05:00-08:00"), "1305")
+
+    def test_name_parser(self):
+        courses = {}
+        self.add(courses, ["2025-09-29", "2025-10-01"])
+        self.add(courses, ["2025-09-29"], event_id=2)
+        self.assertEqual(self.names.course("*CSE 142 A CSE142A 20254"),
+                         ("CSE", "142", "A"))
+        self.assertEqual(self.names.space("GNOMS060"), ("GNOM", "S060"))
+        self.assertEqual(self.names.space("BAG  260"), ("BAG", "260"))
+        self.assertIsNone(self.names.course("staff meeting"))
+        self.assertTrue(self.names.unlisted("SafeCampus request"))
+        self.assertFalse(self.names.unlisted(None))
+        self.assertEqual(self.names.hits["space"], 3)
+        self.assertEqual(self.names.misses["space"], 2)
+        self.assertEqual(str(self.names),
+                         "course 50% of 4, space 60% of 5, notes 0% of 1")
+
+    def test_payload_hashes(self):
+        import_term = {"termDescription": "Autumn 2025",
+                       "startDate": "2025-09-20", "endDate": "2025-12-13"}
+        courses = {}
+        self.add(courses, ["2025-09-29", "2025-10-06"], event_id=1)
+        self.add(courses, ["2025-09-30"], event_id=2, space="BAG  260")
+        merge_meeting_weeks(courses, DAYS_OF_WEEK)
+        import_term["courses"] = [courses[1], courses[2]]
+        term_hash, course_hashes = payload_hashes(import_term)
+        self.assertEqual(len(course_hashes), 2)
+
+        # same content, different order
+        reordered = dict(import_term, courses=[courses[2], courses[1]])
+        self.assertEqual(payload_hashes(reordered), (term_hash, course_hashes))
+
+        courses[2]["meetingTimes"][0]["endTime"] = "1120"
+        new_hash, new_course_hashes = payload_hashes(import_term)
+        self.assertNotEqual(new_hash, term_hash)
+        self.assertEqual(changed_courses(course_hashes, new_course_hashes), (1, 1))
+
+        import_term["courses"] = [courses[2]]
+        self.assertEqual(
+            changed_courses(course_hashes, payload_hashes(import_term)[1]), (1, 2))
+
+    def test_export_import(self):
+        courses = {}
+        self.add(courses, ["2025-09-29", "2025-10-06"])
+        merge_meeting_weeks(courses, DAYS_OF_WEEK)
+        payloads = [{"termDescription": "Autumn 2025", "startDate": "2025-09-20",
+                     "endDate": "2025-12-13", "courses": list(courses.values())}]
+        with tempfile.TemporaryDirectory() as tempdir:
+            for name in ("payload.json.gz", "payload.json"):
+                path = os.path.join(tempdir, name)
+                write_payloads(path, payloads)
+                self.assertEqual(read_payloads(path), payloads)
+            with gzip.open(os.path.join(tempdir, "payload.json.gz")) as f:
+                self.assertEqual(json.load(f), payloads)
@@ -0,0 +1,53 @@
+import subprocess
+import sys
+
+from django.test import SimpleTestCase
+
+
+# Most seconds loading this app may add to every manage.py invocation
+IMPORT_BUDGET = 0.1
+
+# Clients only the sync commands need, which loading the app must not import
+DEFERRED_MODULES = ("cProfile", "lxml", "mazevo_r25.more_r25", "uw_mazevo",
+                    "uw_r25", "uw_sws")
+
+
+def import_times(code):
+    """
+    Run code in a new interpreter with -X importtime
+
+    :return: list of (name, depth, cumulative seconds), children before parents
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        times.append((name.strip(), depth, int(cumulative_us) / 1e6))
+    return times
+
+
+class TestImports(SimpleTestCase):
+
+    def test_setup(self):
+        code = "import django; django.setup()"
+        import_times(code)  # compile anything not yet compiled
+        times = import_times(code)
+
+        names = set(name for name, depth, cumulative in times)
+        self.assertEqual(names.intersection(DEFERRED_MODULES), set())
+
+        # time spent in this app's outermost imports, including what they import
+        total = 0
+        parents = []
+        for name, depth, cumulative in reversed(times):
+            parents = [parent for parent in parents if parent[1] < depth]
+            if name.startswith("mazevo_r25") and not any(
+                    parent[0].startswith("mazevo_r25") for parent in parents):
+                total += cumulative
+            parents.append((name, depth))
+        self.assertLess(total, IMPORT_BUDGET)
@@ -0,0 +1,117 @@
+from collections import Counter
+import datetime
+import threading
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from mazevo_r25.leases import Lease, ShardLeases, booking_shard
+from mazevo_r25.models import MazevoSyncLease
+
+
+class TestLeases(TestCase):
+
+    def test_booking_shard(self):
+        shards = Counter(booking_shard(booking_id, 4) for booking_id in range(1000))
+        self.assertEqual(sorted(shards), [0, 1, 2, 3])
+        self.assertTrue(all(count > 200 for count in shards.values()))
+        self.assertEqual(booking_shard(12345, 4), booking_shard("12345", 4))
+
+    def test_claim(self):
+        first = ShardLeases("resync", 2, worker="host1:1")
+        second = ShardLeases("resync", 2, worker="host2:1")
+        first.create()
+        second.create()
+        self.assertEqual(MazevoSyncLease.objects.filter(job="resync").count(), 2)
+
+        # each shard goes to one worker
+        lease1 = first.claim()
+        lease2 = second.claim()
+        self.assertEqual({lease1.shard, lease2.shard}, {0, 1})
+        self.assertIsNone(first.claim())
+
+        self.assertTrue(lease1.finish())
+        self.assertEqual(first.remaining(), 1)
+
+        # given up, so claimed again at once
+        lease2.release()
+        lease3 = first.claim()
+        self.assertEqual(lease3.shard, lease2.shard)
+        self.assertTrue(lease3.finish())
+        self.assertEqual(second.remaining(), 0)
+        self.assertIsNone(second.claim())
+
+        with self.assertRaises(ValueError):
+            ShardLeases("resync", 3).create()
+
+    def test_takeover(self):
+        first = ShardLeases("resync", 1, worker="host1:1")
+        second = ShardLeases("resync", 1, worker="host2:1")
+        first.create()
+        lease1 = first.claim()
+        self.assertIsNone(second.claim())
+
+        # renewed only once the interval has passed
+        self.assertTrue(lease1.heartbeat())
+        with mock.patch("mazevo_r25.leases.time.time",
+                        return_value=lease1.renewed + first.interval):
+            self.assertTrue(lease1.heartbeat())
+
+        # stale
+        MazevoSyncLease.objects.update(
+            heartbeat=timezone.now() - datetime.timedelta(seconds=first.timeout + 1))
+        with self.assertLogs("mazevo_r25.leases", "WARNING"):
+            lease2 = second.claim()
+        self.assertEqual(lease2.shard, 0)
+        self.assertEqual(MazevoSyncLease.objects.get().takeovers, 1)
+
+        # the old worker finds out on its next heartbeat, and can't finish
+        with mock.patch("mazevo_r25.leases.time.time",
+                        return_value=lease1.renewed + first.interval):
+            self.assertFalse(lease1.heartbeat())
+        self.assertFalse(lease1.finish())
+        lease1.release()
+        self.assertEqual(MazevoSyncLease.objects.get().worker, "host2:1")
+        self.assertTrue(lease2.finish())
+
+    def test_renew(self):
+        first = ShardLeases("resync", 1, worker="host1:1")
+        first.create()
+        lease = first.claim()
+        self.assertTrue(lease.renew())
+        self.assertTrue(lease.held())
+
+        MazevoSyncLease.objects.update(worker="host2:1")
+        self.assertFalse(lease.held())
+        self.assertFalse(lease.renew())
+        self.assertTrue(lease.lost.is_set())
+        self.assertFalse(lease.heartbeat())
+
+    @override_settings(MAZEVO_R25_LEASE_HEARTBEAT=0.01)
+    def test_keep_alive(self):
+        leases = ShardLeases("resync", 1, worker="host1:1")
+        leases.create()
+        lease = leases.claim()
+
+        # renewed in the background until the block exits
+        renewed = threading.Event()
+        with mock.patch.object(Lease, "renew", autospec=True,
+                               side_effect=lambda lease: renewed.set() or True
+                               ) as renew:
+            keeper = lease.keep_alive()
+            with keeper:
+                self.assertTrue(renewed.wait(5))
+            self.assertIsNone(keeper.thread)
+            calls = renew.call_count
+            threading.Event().wait(0.05)
+            self.assertEqual(renew.call_count, calls)
+
+        # and no longer once the lease is lost
+        with mock.patch.object(Lease, "renew", autospec=True,
+                               return_value=False) as renew:
+            keeper = lease.keep_alive()
+            with keeper:
+                keeper.thread.join(5)
+                self.assertFalse(keeper.thread.is_alive())
+            self.assertEqual(renew.call_count, 1)
@@ -0,0 +1,195 @@
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from mazevo_r25.lookups import LOOKUPS, Lookup, event_type_lookup, space_lookup
+from mazevo_r25.models import MazevoRoomSpace, MazevoStatusMap
+from mazevo_r25.more_r25 import get_cache, get_space_list
+
+
+def wait_for(lookup):
+    thread = lookup.warming
+    if thread:
+        thread.join()
+
+
+class TestLookups(TestCase):
+
+    def setUp(self):
+        get_cache().clear()
+        for lookup in LOOKUPS:
+            lookup.data = None
+
+    def test_search(self):
+        self.assertEqual(space_lookup.search("jhn"), ([(1002, "JHN 303")], False))
+        self.assertEqual(space_lookup.search("303 JHN"), ([(1002, "JHN 303")], False))
+        self.assertEqual(space_lookup.search("1002"), ([(1002, "JHN 303")], False))
+        self.assertEqual(space_lookup.search("nowhere"), ([], False))
+
+        spaces, more = space_lookup.search("", limit=2)
+        self.assertEqual(len(spaces), 2)
+        self.assertTrue(more)
+        # ordered by name
+        self.assertEqual([name for id, name in spaces],
+                         sorted(get_space_list().values())[:2])
+        self.assertEqual(space_lookup.search("", offset=2, limit=2)[1], False)
+
+        self.assertEqual(space_lookup.label(1002), "1002 (JHN 303)")
+
+    def test_refresh(self):
+        load = mock.Mock(return_value={1: "One"})
+        lookup = Lookup("spaces.xml", load)
+        self.assertEqual(lookup.names(), {1: "One"})
+        self.assertEqual(lookup.names(), {1: "One"})
+        self.assertEqual(load.call_count, 1)
+
+        # another process's refresh is seen through the shared cache
+        load.return_value = {1: "One", 2: "Two"}
+        other = Lookup("spaces.xml", load)
+        other.refresh()
+        wait_for(other)
+        self.assertEqual(load.call_count, 2)
+        self.assertEqual(lookup.search("two"), ([], False))
+        with mock.patch("mazevo_r25.lookups.LOOKUP_CHECK_INTERVAL", 0):
+            self.assertEqual(lookup.search("two"), ([(2, "Two")], False))
+        self.assertEqual(load.call_count, 2)
+
+    def test_never_wait(self):
+        load = mock.Mock(return_value={1: "One"})
+        lookup = Lookup("PublicConfiguration/Rooms", load)
+        self.assertEqual(lookup.names(wait=False), {})
+        wait_for(lookup)
+        self.assertEqual(lookup.names(wait=False), {1: "One"})
+
+        # a stale list is used while it is fetched again
+        get_cache().set(lookup._key(), {"value": {1: "Uno"}, "fetched": 0}, None)
+        fetching = threading.Event()
+
+        def slow_load():
+            fetching.wait()
+            return {1: "Ichi"}
+
+        load.side_effect = slow_load
+        with mock.patch("mazevo_r25.lookups.LOOKUP_CHECK_INTERVAL", 0):
+            self.assertEqual(lookup.names(wait=False), {1: "Uno"})
+            self.assertEqual(lookup.names(wait=False), {1: "Uno"})
+            fetching.set()
+            wait_for(lookup)
+            self.assertEqual(lookup.names(wait=False), {1: "Ichi"})
+
+    @mock.patch("uw_mazevo.api.PublicConfiguration")
+    def test_warm_lookups(self, configuration):
+        configuration.return_value.get_rooms.return_value = [
+            mock.Mock(id=5, description="Room five")]
+        configuration.return_value.get_statuses.return_value = [
+            mock.Mock(id=3, description="Confirmed")]
+        self.assertEqual(MazevoRoomSpace.room_names, {})
+        self.assertEqual(MazevoRoomSpace(room_id=5, space_id=1002).space_name, "")
+        for lookup in LOOKUPS:
+            wait_for(lookup)
+            lookup.data = None
+        get_cache().clear()
+
+        call_command("warm_lookups")
+        configuration.reset_mock()
+        start = time.time()
+        room_space = MazevoRoomSpace(room_id=5, space_id=1002)
+        self.assertEqual(room_space.room_name, "Room five")
+        self.assertEqual(room_space.space_name, "JHN 303")
+        self.assertEqual(MazevoStatusMap(status_id=3).status_name, "Confirmed")
+        self.assertEqual(MazevoStatusMap(event_type_id=9999).event_type_name,
+                         "Invalid")
+        self.assertLess(time.time() - start, 1)
+        configuration.assert_not_called()
+
+        configuration.return_value.get_rooms.side_effect = Exception("down")
+        with self.assertRaises(CommandError):
+            call_command("warm_lookups")
+
+    def test_lookup_view(self):
+        self.client.force_login(User.objects.create_superuser(
+            "admin", "admin@example.com", "password"))
+        url = reverse("admin:mazevo_r25_mazevostatusmap_lookup",
+                      args=["event_type_id"])
+        event_type_lookup.warm()
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["results"][0],
+                         {"id": str(MazevoStatusMap.EVENT_TYPE_UNDEFINED),
+                          "text": "Not Defined"})
+        self.assertEqual(len(data["results"]), 8)
+        self.assertFalse(data["pagination"]["more"])
+
+        name = list(event_type_lookup.names().values())[0]
+        data = self.client.get(url, {"term": name}).json()
+        self.assertIn(name, data["results"][0]["text"])
+
+        response = self.client.get(reverse(
+            "admin:mazevo_r25_mazevostatusmap_lookup", args=["action"]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_lookup_view_permission(self):
+        self.client.force_login(User.objects.create_user(
+            "staff", "staff@example.com", "password", is_staff=True))
+        response = self.client.get(reverse(
+            "admin:mazevo_r25_mazevoroomspace_lookup", args=["space_id"]))
+        self.assertEqual(response.status_code, 403)
+
+    def test_refresh_view(self):
+        url = reverse("admin:mazevo_r25_mazevoroomspace_refresh")
+        changelist = reverse("admin:mazevo_r25_mazevoroomspace_changelist")
+        self.client.force_login(User.objects.create_superuser(
+            "admin", "admin@example.com", "password"))
+
+        # offered even with no rows to select
+        self.assertFalse(MazevoRoomSpace.objects.exists())
+        self.assertContains(self.client.get(changelist), url)
+
+        with mock.patch.object(Lookup, "refresh") as refresh:
+            self.assertEqual(self.client.get(url).status_code, 405)
+            refresh.assert_not_called()
+
+            response = self.client.post(url)
+            self.assertRedirects(response, changelist)
+            self.assertEqual(refresh.call_count, len(LOOKUPS))
+
+        self.client.force_login(User.objects.create_user(
+            "staff", "staff@example.com", "password", is_staff=True))
+        self.assertEqual(self.client.post(url).status_code, 403)
+
+    def test_form_cold_cache(self):
+        self.client.force_login(User.objects.create_superuser(
+            "admin", "admin@example.com", "password"))
+        MazevoRoomSpace.objects.create(room_id=5)
+        url = reverse("admin:mazevo_r25_mazevoroomspace_change", args=[5])
+
+        # saving never fetches the list on the request thread
+        threads = []
+
+        def load():
+            threads.append(threading.current_thread())
+            raise Exception("R25 is down")
+
+        with mock.patch.object(space_lookup, "load", load), \
+                self.assertLogs("mazevo_r25.lookups", "WARNING"):
+            response = self.client.post(url, {"space_id": "1002"})
+            wait_for(space_lookup)
+        self.assertContains(response, "still loading")
+        self.assertTrue(threads)
+        self.assertNotIn(threading.current_thread(), threads)
+        self.assertIsNone(MazevoRoomSpace.objects.get(room_id=5).space_id)
+
+        # once fetched, the id is checked
+        space_lookup.warm()
+        response = self.client.post(url, {"space_id": "9999999"})
+        self.assertContains(response, "Unknown R25 space")
+        response = self.client.post(url, {"space_id": "1002"})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(MazevoRoomSpace.objects.get(room_id=5).space_id, 1002)
@@ -0,0 +1,134 @@
+import datetime
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from mazevo_r25.management.commands import mazevo2r25
+from mazevo_r25.models import MazevoStatusMap, MazevoSyncLease, MazevoSyncRun
+
+
+def mock_bookings(count):
+    start = timezone.now() + datetime.timedelta(days=1)
+    return [
+        mock.Mock(
+            id=booking_id, status_id=1, room_id=5, event_number=booking_id,
+            event_name="Event {}".format(booking_id), room_description="Room",
+            date_time_start=start, date_time_end=start + datetime.timedelta(hours=1),
+            date_changed=start, setup_minutes=0, teardown_minutes=0)
+        for booking_id in range(1, count + 1)
+    ]
+
+
+@override_settings(MAZEVO_R25_ORGANIZATION="1",
+                   MAZEVO_R25_EMAIL_HOST_USER="",
+                   MAZEVO_R25_EMAIL_HOST_PASSWORD="",
+                   MAZEVO_R25_EMAIL_RECIPIENTS=[])
+class TestMazevo2R25(TestCase):
+
+    def setUp(self):
+        self.bookings = mock_bookings(20)
+        status = mock.Mock(id=1, description="Confirmed")
+        configuration = mock.Mock()
+        configuration.return_value.get_rooms.return_value = []
+        configuration.return_value.get_statuses.return_value = [status]
+        event = mock.Mock()
+        event.return_value.get_events.return_value = self.bookings
+        status_map = {
+            1: mock.Mock(action=MazevoStatusMap.ACTION_ADD, event_type_id=0)}
+
+        # each run would add another stdout handler to the logger
+        patcher = mock.patch.object(mazevo2r25.Command, "set_logger")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        for name, value in (
+                ("PublicConfiguration", configuration),
+                ("PublicEvent", event),
+                ("update_get_space_ids", mock.Mock(
+                    return_value={5: mock.Mock(space_id=9)})),
+                ("update_get_status_map", mock.Mock(return_value=status_map)),
+                ("get_events", mock.Mock(return_value=[]))):
+            patcher = mock.patch.object(mazevo2r25, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_dry_run(self):
+        with mock.patch.object(mazevo2r25, "update_event") as update_event:
+            call_command("mazevo2r25", verbosity=0)
+            update_event.assert_not_called()
+
+        # nothing changed, so nothing counts as changed
+        run = MazevoSyncRun.objects.get()
+        self.assertEqual((run.seen, run.created, run.skipped), (20, 0, 20))
+
+        with mock.patch.object(mazevo2r25, "update_event") as update_event:
+            call_command("mazevo2r25", update=True, verbosity=0)
+            self.assertEqual(update_event.call_count, 20)
+
+        run = MazevoSyncRun.objects.latest("pk")
+        self.assertEqual((run.seen, run.created, run.skipped), (20, 20, 0))
+
+    def test_shards(self):
+        with mock.patch.object(mazevo2r25, "update_event") as update_event:
+            call_command("mazevo2r25", update=True, shards=4, job="resync-1",
+                         verbosity=0)
+            self.assertEqual(update_event.call_count, 20)
+        self.assertFalse(MazevoSyncLease.objects.filter(
+            job="resync-1", finished__isnull=True).exists())
+        run = MazevoSyncRun.objects.get()
+        self.assertEqual((run.seen, run.created), (20, 20))
+
+        # nothing left to claim
+        with mock.patch.object(mazevo2r25, "update_event") as update_event:
+            call_command("mazevo2r25", update=True, shards=4, job="resync-1",
+                         verbosity=0)
+            update_event.assert_not_called()
+
+    def test_shard_options(self):
+        for options in ({"shards": 4}, {"job": "resync-1"},
+                        {"shards": 0, "job": "resync-1"},
+                        {"shards": -1, "job": "resync-1"}):
+            with self.assertRaises(CommandError):
+                call_command("mazevo2r25", verbosity=0, **options)
+        # rejected before the run is recorded
+        self.assertFalse(MazevoSyncRun.objects.exists())
+
+        call_command("mazevo2r25", shards=4, job="resync-1", verbosity=0)
+        with self.assertRaises(CommandError):
+            call_command("mazevo2r25", shards=3, job="resync-1", verbosity=0)
+
+    @override_settings(MAZEVO_R25_CIRCUIT_THRESHOLD=1)
+    def test_shards_circuit_open(self):
+        def fail(event):
+            mazevo2r25.circuit_breaker.record_failure("R25 is down")
+            return event
+
+        with mock.patch.object(mazevo2r25, "update_event", side_effect=fail):
+            call_command("mazevo2r25", update=True, shards=4, job="resync-1",
+                         verbosity=0)
+
+        # the shard is given back, and the others left for the next run
+        self.assertEqual(MazevoSyncLease.objects.filter(
+            job="resync-1", finished__isnull=True).count(), 4)
+        self.assertFalse(MazevoSyncLease.objects.exclude(worker="").exists())
+
+    def test_shards_lease_lost(self):
+        def take_over(event):
+            MazevoSyncLease.objects.update(worker="host2:1")
+            return event
+
+        with mock.patch.object(mazevo2r25, "update_event",
+                               side_effect=take_over) as update_event:
+            with self.assertLogs("mazevo_r25", "ERROR"):
+                call_command("mazevo2r25", update=True, shards=1, job="resync-1",
+                             verbosity=0)
+            # nothing written after the lease was lost
+            self.assertEqual(update_event.call_count, 1)
+
+        lease = MazevoSyncLease.objects.get(job="resync-1")
+        self.assertEqual(lease.worker, "host2:1")
+        self.assertIsNone(lease.finished)
+        run = MazevoSyncRun.objects.get()
+        self.assertEqual((run.created, run.skipped), (1, 19))
@@ -0,0 +1,50 @@
+import os
+import tempfile
+
+from django.test import TestCase
+from lxml import etree
+from restclients_core.util.mock import convert_to_platform_safe
+from uw_r25.events import events_from_xml
+
+from mazevo_r25.mock_data import R25_ROOT, MockDataGenerator, r25_reservations_url
+from mazevo_r25.more_r25 import reservations_from_xml
+
+
+class TestMockData(TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.generator = MockDataGenerator(self.tempdir.name, rooms=20)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def read(self, url):
+        return etree.parse(os.path.join(
+            self.tempdir.name, R25_ROOT, convert_to_platform_safe(url))).getroot()
+
+    def test_reservations(self):
+        count = self.generator.write_reservations(sections=50, page_size=100)
+        self.assertGreater(count, 100)
+
+        start = self.generator.start_date.isoformat()
+        end = self.generator.end_date.isoformat()
+        tree = self.read(r25_reservations_url(start, end, ["459", "472"], "T", 1, 100))
+        self.assertEqual(tree.get("total_results"), str(count))
+        self.assertEqual(len(reservations_from_xml(tree)), 100)
+
+        last = int(tree.get("page_count"))
+        tree = self.read(r25_reservations_url(
+            start, end, ["459", "472"], tree.get("paginate_key"), last, 100))
+        reservations = reservations_from_xml(tree)
+        self.assertEqual(len(reservations), count - (last - 1) * 100)
+        self.assertIn(reservations[0].space_reservation.name,
+                      self.generator.spaces.values())
+
+    def test_bookings(self):
+        self.assertEqual(self.generator.write_bookings(count=20, existing=1), 20)
+        tree = self.read("event.xml?event_id=31000000&mode=edit")
+        event = events_from_xml(tree)[0]
+        self.assertEqual(event.event_id, "31000000")
+        self.assertTrue(event.name.startswith("1000000_"))
+        self.assertEqual(len(event.reservations), 1)
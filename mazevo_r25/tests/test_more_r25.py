@@ -1,16 +1,39 @@
-from django.test import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from restclients_core.exceptions import DataFailureException
+from restclients_core.models import MockHTTP
+from uw_r25 import get_resource
 from uw_r25.models import Event
 
+from mazevo_r25 import more_r25
 from mazevo_r25.more_r25 import (
+    CircuitBreaker,
+    CircuitOpenException,
+    endpoint_name,
+    get_cache,
     get_event_type_list,
     get_space_by_short_name,
+    get_reservations_attrs,
+    get_reservations_data,
     get_space_list,
+    invalidate_cache,
+    parse_retry_after,
+    request_stats,
+    RequestStats,
+    reservation_records_from_data,
+    RetryPolicy,
+    space_shards,
     update_event,
 )
 
 
 class TestMoreR25(TestCase):
 
+    def setUp(self):
+        get_cache().clear()
+
     def test_get_space_by_short_name(self):
         space = get_space_by_short_name("GLD 100A")
         self.assertEqual(space.space_id, "1001")
@@ -38,3 +61,204 @@ class TestMoreR25(TestCase):
         event.node_type = "E"
         event.organization_id = 4211
         update_event(event)
+
+    def test_reservation_records(self):
+        query = {"space_query_id": 999, "start_dt": "2018-12-18",
+                 "end_dt": "2018-12-18"}
+        reservations, attrs = get_reservations_attrs(**query)
+        records, record_attrs = reservation_records_from_data(
+            *get_reservations_data(**query))
+        self.assertEqual(record_attrs, attrs)
+        self.assertEqual(len(records), len(reservations))
+        for record, reservation in zip(records, reservations):
+            self.assertEqual(record.event_id, reservation.event_id)
+            self.assertEqual(record.start_datetime, reservation.start_datetime)
+            self.assertEqual(record.space_reservation.name,
+                             reservation.space_reservation.name)
+
+        with self.assertRaises(DataFailureException):
+            reservation_records_from_data("reservations.xml", b"<r25:reservations")
+
+    def test_space_shards(self):
+        self.assertEqual(space_shards(["5", 3, 1, 4, 2], 2), [[1, 3, 5], [2, 4]])
+        self.assertEqual(space_shards([1, 2], 4), [[1], [2]])
+
+    def test_request_stats(self):
+        self.assertEqual(endpoint_name(
+            "/r25ws/wrd/uw/run/event.xml?event_id=1&mode=edit"), "event.xml edit")
+        self.assertEqual(endpoint_name("/r25ws/servlet/wrd/run/events.xml"),
+                         "events.xml")
+
+        stats = RequestStats(buckets=(0.1, 1))
+        stats.record("GET", "/run/spaces.xml?scope=list", 0.05, 200)
+        stats.record("GET", "/run/spaces.xml?scope=list", 0.5, 200)
+        stats.record("GET", "/run/spaces.xml?scope=list", 2, 0)
+        stats.record("PUT", "/run/event.xml?event_id=1", 0.5, 400)
+        self.assertEqual(stats.stats[("GET", "spaces.xml")]["buckets"], [1, 1, 1])
+        self.assertEqual(stats.quantile(stats.stats[("GET", "spaces.xml")], 0.5), 1)
+        self.assertEqual(str(stats).split("\n"), [
+            "GET spaces.xml: 3 requests, 1 errors, mean 0.850s, p95 > 1s",
+            "PUT event.xml: 1 requests, 1 errors, mean 0.500s, p95 <= 1s",
+        ])
+
+        metrics = stats.openmetrics({"command": "r25_mazevo"}).split("\n")
+        self.assertIn('mazevo_r25_requests_total{command="r25_mazevo",method="GET",'
+                      'endpoint="spaces.xml"} 3', metrics)
+        self.assertIn('mazevo_r25_request_seconds_bucket{command="r25_mazevo",'
+                      'method="GET",endpoint="spaces.xml",le="+Inf"} 3', metrics)
+        self.assertIn('mazevo_r25_request_errors_total{command="r25_mazevo",'
+                      'method="PUT",endpoint="event.xml"} 1', metrics)
+        self.assertEqual(metrics[-2:], ["# EOF", ""])
+
+        # requests to R25 are counted
+        request_stats.reset()
+        get_space_list()
+        self.assertEqual(request_stats.stats[("GET", "spaces.xml")]["count"], 1)
+
+    def test_cached_resource(self):
+        with mock.patch.object(more_r25, "get_resource",
+                               side_effect=get_resource) as mock_get:
+            get_space_list()
+            spaces = get_space_list()
+            self.assertEqual(mock_get.call_count, 1)
+            self.assertEqual(spaces[1002], "JHN 303")
+
+            invalidate_cache("spaces.xml")
+            get_space_list()
+            self.assertEqual(mock_get.call_count, 2)
+
+    @override_settings(MAZEVO_R25_CACHE_TTLS={"spaces.xml": 0})
+    def test_cache_disabled(self):
+        with mock.patch.object(more_r25, "get_resource",
+                               side_effect=get_resource) as mock_get:
+            get_space_list()
+            get_space_list()
+            self.assertEqual(mock_get.call_count, 2)
+
+
+def mock_response(status, headers=None):
+    response = MockHTTP()
+    response.status = status
+    response.headers = headers or {}
+    return response
+
+
+@mock.patch("mazevo_r25.more_r25.time.sleep")
+class TestRetryPolicy(TestCase):
+
+    def test_parse_retry_after(self, mock_sleep):
+        self.assertEqual(parse_retry_after("5"), 5)
+        self.assertEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0)
+        self.assertIsNone(parse_retry_after(""))
+        self.assertIsNone(parse_retry_after("soon"))
+
+    def test_retry_after(self, mock_sleep):
+        policy = RetryPolicy(tries=3, budget=10)
+        responses = [mock_response(429, {"Retry-After": "7"}), mock_response(200)]
+        response = policy.call("PUT", "event.xml", lambda: responses.pop(0))
+        self.assertEqual(response.status, 200)
+        mock_sleep.assert_called_once_with(7)
+        self.assertEqual(policy.retries["PUT"], 1)
+        self.assertEqual(policy.budget, 9)
+
+    def test_gives_up(self, mock_sleep):
+        policy = RetryPolicy(tries=3, budget=10)
+        response = policy.call("GET", "events.xml", lambda: mock_response(429))
+        self.assertEqual(response.status, 429)
+        self.assertEqual(mock_sleep.call_count, 2)
+
+        def fail():
+            raise DataFailureException("events.xml", 0, "timeout")
+
+        self.assertRaises(DataFailureException,
+                          policy.call, "GET", "events.xml", fail)
+        self.assertEqual(policy.retries["GET"], 4)
+
+    def test_not_retryable(self, mock_sleep):
+        policy = RetryPolicy(budget=10)
+        response = policy.call("DELETE", "event.xml", lambda: mock_response(404))
+        self.assertEqual(response.status, 404)
+        mock_sleep.assert_not_called()
+
+    def test_budget(self, mock_sleep):
+        policy = RetryPolicy(tries=4, budget=2)
+        policy.call("POST", "events.xml", lambda: mock_response(429))
+        policy.call("POST", "events.xml", lambda: mock_response(429))
+        self.assertEqual(policy.retries["POST"], 2)
+        self.assertEqual(policy.exhausted, 2)
+
+    def test_budget_shared_by_threads(self, mock_sleep):
+        policy = RetryPolicy(tries=4, budget=50)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            for _ in range(40):
+                executor.submit(
+                    policy.call, "GET", "reservations.xml",
+                    lambda: mock_response(429))
+        self.assertEqual(policy.requests["GET"], 40)
+        self.assertEqual(policy.retries["GET"], 50)
+        self.assertEqual(policy.budget, 0)
+
+
+@mock.patch("mazevo_r25.more_r25.time.time")
+class TestCircuitBreaker(TestCase):
+
+    def test_opens(self, mock_time):
+        mock_time.return_value = 1000
+        breaker = CircuitBreaker(threshold=2, reset_timeout=30)
+        breaker.before_request("events.xml")
+        breaker.record_failure("timeout")
+        breaker.before_request("events.xml")
+        breaker.record_failure("timeout")
+        self.assertTrue(breaker.is_open())
+        self.assertRaises(CircuitOpenException,
+                          breaker.before_request, "events.xml")
+        self.assertEqual(breaker.short_circuited, 1)
+
+    def test_half_open(self, mock_time):
+        mock_time.return_value = 1000
+        breaker = CircuitBreaker(threshold=1, reset_timeout=30)
+        breaker.record_failure("timeout")
+        self.assertTrue(breaker.is_open())
+
+        # probe fails, so re-open
+        mock_time.return_value = 1030
+        self.assertFalse(breaker.is_open())
+        breaker.before_request("events.xml")
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        breaker.record_failure("timeout")
+        self.assertTrue(breaker.is_open())
+
+        # probe succeeds, so close
+        mock_time.return_value = 1060
+        breaker.before_request("events.xml")
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(breaker.failures, 0)
+
+    def test_probe_without_outcome(self, mock_time):
+        mock_time.return_value = 1000
+        breaker = CircuitBreaker(threshold=1, reset_timeout=30)
+        breaker.record_failure("timeout")
+
+        # the probe raises something that records neither outcome
+        mock_time.return_value = 1030
+        with mock.patch.object(more_r25, "circuit_breaker", breaker), \
+                mock.patch("mazevo_r25.more_r25.R25_DAO") as mock_dao:
+            mock_dao.return_value.getURL.side_effect = RuntimeError("surprise")
+            self.assertRaises(RuntimeError, more_r25.get_resource, "events.xml")
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+
+        # still open while the probe is outstanding, and handled like any
+        # other R25 failure
+        self.assertTrue(breaker.is_open())
+        with self.assertRaises(DataFailureException) as context:
+            breaker.before_request("events.xml")
+        self.assertIsInstance(context.exception, CircuitOpenException)
+        self.assertEqual(context.exception.status, 0)
+
+        # given up on, so another probe is let through
+        mock_time.return_value = 1060
+        self.assertFalse(breaker.is_open())
+        breaker.before_request("events.xml")
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
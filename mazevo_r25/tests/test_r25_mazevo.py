@@ -0,0 +1,200 @@
+import datetime
+import os
+import pstats
+import tempfile
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from restclients_core.dao import MockDAO
+
+from mazevo_r25.courses import payload_hashes, read_payloads
+from mazevo_r25.management.commands.r25_mazevo import Command
+from mazevo_r25.mock_data import MockDataGenerator
+from mazevo_r25.models import MazevoSyncRun, MazevoTermUpload
+
+
+DAYS_OF_WEEK = [
+    "sunday", "monday", "tuesday", "wednesday", "thursday", "friday", "saturday",
+]
+
+# two adjacent terms covering the generator's window
+IMPORT_TERMS = {
+    "0": {"termDescription": "Autumn 2025",
+          "startDate": "2025-09-20", "endDate": "2025-10-31"},
+    "1": {"termDescription": "Winter 2026",
+          "startDate": "2025-11-01", "endDate": "2025-12-13"},
+}
+
+# three adjacent terms over the same window, for selections with a gap
+GAP_TERMS = {
+    "5": {"termDescription": "Term A",
+          "startDate": "2025-09-20", "endDate": "2025-10-11"},
+    "6": {"termDescription": "Term B",
+          "startDate": "2025-10-12", "endDate": "2025-11-10"},
+    "7": {"termDescription": "Term C",
+          "startDate": "2025-11-11", "endDate": "2025-12-13"},
+}
+
+
+@override_settings(MAZEVO_R25_EVENTTYPES_ACADEMIC_IMPORT=["459", "472"],
+                   MAZEVO_R25_CATEGORIES_UNLISTED=["1"],
+                   MAZEVO_R25_EMAIL_HOST_USER="",
+                   MAZEVO_R25_EMAIL_HOST_PASSWORD="",
+                   MAZEVO_R25_EMAIL_RECIPIENTS=[])
+@mock.patch.object(Command, "get_import_term",
+                   lambda self, term: dict(IMPORT_TERMS.get(term) or GAP_TERMS[term]))
+@mock.patch.object(Command, "get_term", lambda self, spec: spec)
+@mock.patch("mazevo_r25.management.commands.r25_mazevo.PublicCourses")
+class TestR25Mazevo(TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        generator = MockDataGenerator(self.tempdir.name, rooms=10)
+        generator.write_spaces()
+        generator.write_reservations(sections=40, unlisted=0.1, shards=(3,))
+        MockDAO.register_mock_path(self.tempdir.name)
+
+    def tearDown(self):
+        MockDAO.paths.remove(self.tempdir.name)
+        self.tempdir.cleanup()
+
+    def uploaded(self, mock_courses):
+        return {
+            call.args[0]["termDescription"]: call.args[0]
+            for call in mock_courses.return_value.import_term.call_args_list
+        }
+
+    def test_term_specs(self, mock_courses):
+        command = Command()
+        self.assertEqual(command.get_term_specs("0"), ["0"])
+        self.assertEqual(command.get_term_specs("0,1,2"), ["0", "1", "2"])
+        self.assertEqual(command.get_term_specs("1-3"), ["1", "2", "3"])
+        self.assertEqual(command.get_term_specs("next,afternext"),
+                         ["next", "afternext"])
+        self.assertEqual(command.get_term_specs("autumn,2025"), ["autumn,2025"])
+
+    def test_negative_options(self, mock_courses):
+        for option in ("shards", "parse_workers"):
+            with self.assertRaises(CommandError):
+                call_command("r25_mazevo", term="0", verbosity=0, **{option: -1})
+        self.assertEqual(MazevoSyncRun.objects.count(), 0)
+
+    def test_multiple_terms(self, mock_courses):
+        mock_courses.return_value.DAYS_OF_WEEK = DAYS_OF_WEEK
+        call_command("r25_mazevo", term="0,1", verbosity=0)
+
+        uploaded = self.uploaded(mock_courses)
+        self.assertEqual(sorted(uploaded), ["Autumn 2025", "Winter 2026"])
+        for description, import_term in uploaded.items():
+            self.assertEqual(len(import_term["courses"]), 40)
+            for course in import_term["courses"]:
+                for meeting in course["meetingTimes"]:
+                    self.assertGreaterEqual(meeting["endDate"],
+                                            import_term["startDate"])
+                    self.assertLessEqual(meeting["startDate"],
+                                         import_term["endDate"])
+        self.assertEqual(MazevoTermUpload.objects.count(), 2)
+
+        run = MazevoSyncRun.objects.get()
+        self.assertEqual(run.command, MazevoSyncRun.COMMAND_R25_MAZEVO)
+        self.assertEqual(run.outcome, MazevoSyncRun.OUTCOME_SUCCESS)
+        self.assertEqual(str(run.window_start), "2025-09-20")
+        self.assertEqual(str(run.window_end), "2025-12-13")
+        self.assertEqual(run.get_options(), {"term": "0,1"})
+        self.assertGreater(run.seen, 0)
+        self.assertEqual(run.updated, 2)
+        self.assertGreater(run.requests, 0)
+        self.assertEqual(list(run.get_phases()),
+                         ["terms", "scan", "merge", "upload", "report"])
+
+        # nothing changed, so nothing is uploaded again
+        mock_courses.reset_mock()
+        call_command("r25_mazevo", term="0,1", verbosity=0)
+        self.assertEqual(self.uploaded(mock_courses), {})
+        self.assertEqual(MazevoSyncRun.objects.first().skipped, 2)
+
+        call_command("r25_mazevo", term="0-1", force=True, verbosity=0)
+        self.assertEqual(len(self.uploaded(mock_courses)), 2)
+
+    def test_terms_with_gap(self, mock_courses):
+        mock_courses.return_value.DAYS_OF_WEEK = DAYS_OF_WEEK
+        # only the windows of the selected terms have mock scans
+        for term in ("5", "7"):
+            generator = MockDataGenerator(
+                self.tempdir.name, rooms=10,
+                start_date=datetime.date.fromisoformat(GAP_TERMS[term]["startDate"]),
+                end_date=datetime.date.fromisoformat(GAP_TERMS[term]["endDate"]))
+            reservations, unlisted_ids = generator.generate_reservations(sections=10)
+            generator.write_scan(reservations, 1000)
+
+        call_command("r25_mazevo", term="5,7", verbosity=0)
+
+        # nothing from term B, in the gap
+        uploaded = self.uploaded(mock_courses)
+        self.assertEqual(sorted(uploaded), ["Term A", "Term C"])
+        for import_term in uploaded.values():
+            self.assertTrue(import_term["courses"])
+            # meetings start on the Sunday of their first week
+            start = datetime.date.fromisoformat(import_term["startDate"])
+            first_sunday = start - datetime.timedelta(days=start.isoweekday() % 7)
+            for course in import_term["courses"]:
+                for meeting in course["meetingTimes"]:
+                    self.assertGreaterEqual(meeting["startDate"],
+                                            first_sunday.isoformat())
+                    self.assertLessEqual(meeting["startDate"],
+                                         import_term["endDate"])
+
+    def test_profile(self, mock_courses):
+        mock_courses.return_value.DAYS_OF_WEEK = DAYS_OF_WEEK
+        path = os.path.join(self.tempdir.name, "r25_mazevo.prof")
+        with self.assertLogs("r25_mazevo", "INFO") as logs:
+            call_command("r25_mazevo", term="0,1", profile=path, profile_top=3)
+        stats = pstats.Stats(path)
+        self.assertIn("add_reservation", " ".join(
+            function for filename, line, function in stats.stats))
+        report = logs.output[-1]
+        for phase in ("terms", "scan", "merge", "upload", "report"):
+            self.assertIn("Phase {}: ".format(phase), report)
+
+    def test_export_import(self, mock_courses):
+        mock_courses.return_value.DAYS_OF_WEEK = DAYS_OF_WEEK
+        path = os.path.join(self.tempdir.name, "payload.json.gz")
+        call_command("r25_mazevo", term="0,1", export=path, verbosity=0)
+        self.assertEqual(self.uploaded(mock_courses), {})
+        self.assertEqual(MazevoTermUpload.objects.count(), 0)
+
+        call_command("r25_mazevo", import_file=path, verbosity=0)
+        uploaded = self.uploaded(mock_courses)
+        self.assertEqual(uploaded, {
+            payload["termDescription"]: payload for payload in read_payloads(path)})
+        self.assertEqual(MazevoTermUpload.objects.count(), 2)
+
+        # same as the upload from the file, so nothing changed
+        mock_courses.reset_mock()
+        call_command("r25_mazevo", term="0,1", verbosity=0)
+        self.assertEqual(self.uploaded(mock_courses), {})
+
+    def test_shards(self, mock_courses):
+        mock_courses.return_value.DAYS_OF_WEEK = DAYS_OF_WEEK
+        path = os.path.join(self.tempdir.name, "payload.json")
+        call_command("r25_mazevo", term="0,1", export=path, verbosity=0)
+        sharded_path = os.path.join(self.tempdir.name, "sharded.json")
+        call_command("r25_mazevo", term="0,1", shards=3, export=sharded_path,
+                     verbosity=0)
+
+        self.assertEqual(
+            [payload_hashes(payload) for payload in read_payloads(sharded_path)],
+            [payload_hashes(payload) for payload in read_payloads(path)])
+
+    def test_parse_workers(self, mock_courses):
+        mock_courses.return_value.DAYS_OF_WEEK = DAYS_OF_WEEK
+        path = os.path.join(self.tempdir.name, "payload.json")
+        call_command("r25_mazevo", term="0,1", export=path, verbosity=0)
+        parsed_path = os.path.join(self.tempdir.name, "parsed.json")
+        call_command("r25_mazevo", term="0,1", shards=3, parse_workers=2,
+                     export=parsed_path, verbosity=0)
+
+        self.assertEqual(
+            [payload_hashes(payload) for payload in read_payloads(parsed_path)],
+            [payload_hashes(payload) for payload in read_payloads(path)])
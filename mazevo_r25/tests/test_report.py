@@ -0,0 +1,51 @@
+import logging
+
+from django.test import TestCase, override_settings
+
+from mazevo_r25.report import ReportCollector
+
+
+class TestReport(TestCase):
+
+    def setUp(self):
+        self.logger = logging.getLogger("mazevo_r25.tests.report")
+        self.logger.propagate = False
+        self.report = ReportCollector()
+        self.logger.addHandler(self.report)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.report)
+        self.logger.propagate = True
+
+    def test_report(self):
+        self.logger.info("Found 10 bookings")
+        for booking in range(100):
+            self.logger.warning(
+                "Error retrieving R25 Event, skipping Booking %s (%s): timeout"
+                % (booking, 7))
+        for booking in range(3):
+            self.logger.warning("No R25 space for Mazevo Booking %s", 12)
+
+        self.assertEqual(len(self.report), 103)
+        self.assertEqual(str(self.report).split("\n"), [
+            "Error retrieving R25 Event, skipping Booking 0 (7): timeout",
+            "Error retrieving R25 Event, skipping Booking 1 (7): timeout",
+            "Error retrieving R25 Event, skipping Booking 2 (7): timeout",
+            "Error retrieving R25 Event, skipping Booking 3 (7): timeout",
+            "Error retrieving R25 Event, skipping Booking 4 (7): timeout",
+            "... and 95 more like: "
+            "Error retrieving R# Event, skipping Booking # (#): timeout",
+            "No R25 space for Mazevo Booking 12 (repeated 3 times)",
+        ])
+
+    @override_settings(MAZEVO_R25_REPORT_TEMPLATES=2)
+    def test_templates_limit(self):
+        report = ReportCollector()
+        self.logger.addHandler(report)
+        try:
+            for word in ("one", "two", "three", "four"):
+                self.logger.warning(word)
+        finally:
+            self.logger.removeHandler(report)
+        self.assertEqual(str(report), "one\ntwo\n... and 2 more of other kinds")
+        self.assertEqual(len(report.templates), 2)
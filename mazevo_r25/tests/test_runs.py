@@ -0,0 +1,121 @@
+import datetime
+import logging
+import os
+import tempfile
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from mazevo_r25.models import MazevoSyncRun
+from mazevo_r25.more_r25 import request_stats, retry_policy
+from mazevo_r25.runs import RunRecorder, weekly_trends
+
+
+logger = logging.getLogger("mazevo_r25.tests.runs")
+
+
+class TestRuns(TestCase):
+
+    def setUp(self):
+        retry_policy.reset()
+        request_stats.reset()
+
+    def test_run_recorder(self):
+        with RunRecorder(MazevoSyncRun.COMMAND_MAZEVO2R25,
+                         {"update": True, "delete": False, "start": None,
+                          "changed": "2025-10-01", "verbosity": 1},
+                         logger) as run:
+            self.assertEqual(MazevoSyncRun.objects.get().outcome,
+                             MazevoSyncRun.OUTCOME_RUNNING)
+            run.window("2025-10-01", "2025-10-08")
+            run.phase("bookings")
+            run.count("seen", 10)
+            run.phase("sync")
+            run.count("created")
+            run.count("skipped", 2)
+            retry_policy.requests["GET"] += 3
+
+        run = MazevoSyncRun.objects.get()
+        self.assertEqual(run.outcome, MazevoSyncRun.OUTCOME_SUCCESS)
+        self.assertEqual(run.get_options(), {"changed": "2025-10-01", "update": True})
+        self.assertEqual(str(run.window_start), "2025-10-01")
+        self.assertEqual((run.seen, run.created, run.skipped, run.requests),
+                         (10, 1, 2, 3))
+        self.assertEqual(list(run.get_phases()), ["bookings", "sync"])
+        self.assertIsNotNone(run.finished)
+        self.assertGreater(run.throughput, 0)
+
+    def test_outcomes(self):
+        with RunRecorder(MazevoSyncRun.COMMAND_R25_MAZEVO, {}, logger):
+            logger.warning("No meetings found")
+        self.assertEqual(MazevoSyncRun.objects.first().outcome,
+                         MazevoSyncRun.OUTCOME_WARNINGS)
+        self.assertEqual(MazevoSyncRun.objects.first().warnings, 1)
+
+        other_logger = logging.getLogger("mazevo_r25.tests.other")
+        with RunRecorder(MazevoSyncRun.COMMAND_R25_MAZEVO, {}, logger,
+                         [other_logger]) as run:
+            other_logger.warning("SWS unavailable")
+        self.assertIn("SWS unavailable", str(run.report))
+        self.assertEqual(MazevoSyncRun.objects.first().warnings, 1)
+        self.assertNotIn(run.report, other_logger.handlers)
+
+        with self.assertRaises(ValueError):
+            with RunRecorder(MazevoSyncRun.COMMAND_R25_MAZEVO, {}, logger):
+                raise ValueError()
+        self.assertEqual(MazevoSyncRun.objects.first().outcome,
+                         MazevoSyncRun.OUTCOME_FAILED)
+
+    def test_write_metrics(self):
+        request_stats.record("GET", "/run/events.xml", 0.2, 200)
+        with tempfile.TemporaryDirectory() as metrics_dir:
+            with override_settings(MAZEVO_R25_METRICS_DIR=metrics_dir):
+                with RunRecorder(MazevoSyncRun.COMMAND_MAZEVO2R25, {}, logger):
+                    pass
+            self.assertEqual(os.listdir(metrics_dir), ["mazevo_r25_mazevo2r25.prom"])
+            with open(os.path.join(metrics_dir, "mazevo_r25_mazevo2r25.prom")) as f:
+                metrics = f.read().split("\n")
+        self.assertIn('mazevo_r25_run_failed{command="mazevo2r25"} 0', metrics)
+        self.assertIn('mazevo_r25_requests_total{command="mazevo2r25",method="GET",'
+                      'endpoint="events.xml"} 1', metrics)
+
+    def add_run(self, days_ago, seen, duration, **kwargs):
+        MazevoSyncRun.objects.create(
+            command=MazevoSyncRun.COMMAND_MAZEVO2R25,
+            started=timezone.now() - datetime.timedelta(days=days_ago),
+            seen=seen, duration=duration, requests=seen, phases='{"sync": 2.0}',
+            outcome=kwargs.pop("outcome", MazevoSyncRun.OUTCOME_SUCCESS), **kwargs)
+
+    def test_weekly_trends(self):
+        self.add_run(0, 100, 10, retries=10)
+        self.add_run(0, 100, 30, outcome=MazevoSyncRun.OUTCOME_FAILED)
+        self.add_run(14, 100, 5)
+        self.add_run(0, 100, 5, outcome=MazevoSyncRun.OUTCOME_RUNNING)
+        self.add_run(400, 100, 5)
+
+        trends = weekly_trends()
+        summaries = trends[MazevoSyncRun.COMMAND_MAZEVO2R25]
+        self.assertEqual(len(summaries), 2)
+        this_week, earlier = summaries
+        self.assertGreater(this_week["week"], earlier["week"])
+        self.assertEqual((this_week["runs"], this_week["failed"]), (2, 1))
+        self.assertEqual(this_week["throughput"], 5)
+        self.assertEqual(this_week["average_duration"], 20)
+        self.assertEqual(this_week["retry_rate"], 0.05)
+        self.assertEqual(this_week["phases"], {"sync": 2.0})
+        self.assertEqual(earlier["throughput"], 20)
+
+    def test_trends_view(self):
+        self.add_run(0, 100, 10)
+        self.client.force_login(User.objects.create_superuser(
+            "admin", "admin@example.com", "password"))
+        response = self.client.get(reverse("admin:mazevo_r25_mazevosyncrun_trends"))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Mazevo bookings to R25 events")
+        self.assertContains(response, "10.0")
+
+        response = self.client.get(
+            reverse("admin:mazevo_r25_mazevosyncrun_changelist"))
+        self.assertContains(response, "Trends")
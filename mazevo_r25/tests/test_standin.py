@@ -0,0 +1,98 @@
+import json
+import tempfile
+import threading
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from django.test import TestCase
+from lxml import etree
+from uw_r25 import nsmap
+
+from mazevo_r25.mock_data import MockDataGenerator
+from mazevo_r25.standin import StandInServer
+
+
+class TestStandIn(TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        generator = MockDataGenerator(self.tempdir.name, rooms=5)
+        generator.write_spaces()
+        generator.write_bookings(count=10, existing=1)
+        self.server = self.start_server()
+
+    def start_server(self, **kwargs):
+        """
+        Start a stand-in server on the mock data, stopped when the test ends
+        """
+        server = StandInServer(("127.0.0.1", 0), [self.tempdir.name], **kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def request(self, method, url, data=None, server=None):
+        server = server or self.server
+        request = Request("http://127.0.0.1:{}{}".format(
+            server.server_address[1], url), data=data, method=method)
+        try:
+            with urlopen(request) as response:
+                return response.status, response.read()
+        except HTTPError as ex:
+            return ex.code, ex.read()
+
+    def test_event_put_get_delete(self):
+        url = "/r25ws/wrd/test/run/event.xml?event_id=31000000&mode=edit"
+        status, data = self.request("GET", url)
+        self.assertEqual(status, 200)
+
+        tree = etree.fromstring(data)
+        node = tree.xpath("r25:event/r25:event_name", namespaces=nsmap)[0]
+        node.text = "1000000_RENAMED"
+        node.getparent().attrib["status"] = "mod"
+        status, data = self.request(
+            "PUT", "/r25ws/wrd/test/run/event.xml?event_id=31000000",
+            etree.tostring(tree))
+        self.assertEqual(status, 200)
+
+        status, data = self.request("GET", url)
+        self.assertIn(b"1000000_RENAMED", data)
+        self.assertNotIn(b'status="mod"', data)
+
+        status, data = self.request(
+            "GET", "/r25ws/servlet/wrd/run/events.xml?starts_with=1000000_")
+        self.assertIn(b"1000000_RENAMED", data)
+
+        status, data = self.request(
+            "DELETE", "/r25ws/wrd/test/run/event.xml?event_id=31000000")
+        self.assertEqual(status, 200)
+        status, data = self.request("GET", url)
+        self.assertEqual(status, 404)
+
+    def test_create_event(self):
+        status, data = self.request("POST", "/r25ws/wrd/test/run/events.xml", b"")
+        self.assertEqual(status, 201)
+        tree = etree.fromstring(data)
+        self.assertEqual(
+            tree.xpath("r25:event/r25:event_id", namespaces=nsmap)[0].text,
+            "90000001")
+
+    def test_mazevo(self):
+        status, data = self.request("POST", "/api/PublicEvent/GetEvents", b"{}")
+        self.assertEqual(len(json.loads(data)), 10)
+        status, data = self.request("POST", "/api/PublicCourses/ImportTerm", b"{}")
+        self.assertEqual(status, 200)
+
+    def test_quota_and_errors(self):
+        server = self.start_server(quota=1)
+        statuses = [self.request("GET", "/api/PublicConfiguration/Rooms",
+                                 server=server)[0]
+                    for i in range(4)]
+        self.assertIn(429, statuses)
+
+        server.quota = None
+        server.error_rate = 1
+        status, data = self.request(
+            "GET", "/api/PublicConfiguration/Rooms", server=server)
+        self.assertEqual(status, 500)
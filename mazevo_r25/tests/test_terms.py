@@ -0,0 +1,61 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from restclients_core.exceptions import DataFailureException
+from uw_sws import get_resource
+from uw_sws import term as sws_term
+
+from mazevo_r25 import terms
+from mazevo_r25.terms import (get_cache, get_current_term, get_term_after,
+                              get_term_before, get_term_by_year_and_quarter)
+
+
+class TestTerms(TestCase):
+
+    def setUp(self):
+        get_cache().clear()
+
+    @mock.patch("mazevo_r25.terms.get_resource", wraps=get_resource)
+    def test_cached_term(self, mock_get):
+        term = get_term_by_year_and_quarter(2013, "Spring")
+        self.assertEqual((term.year, term.quarter), (2013, "spring"))
+        self.assertEqual(term.last_final_exam_date,
+                         sws_term.get_term_by_year_and_quarter(
+                             2013, "spring").last_final_exam_date)
+
+        get_term_by_year_and_quarter(2013, "spring")
+        self.assertEqual(mock_get.call_count, 1)
+
+    def test_before_after(self):
+        term = get_term_by_year_and_quarter(2013, "autumn")
+        after = get_term_after(term)
+        self.assertEqual((after.year, after.quarter), (2014, "winter"))
+        before = get_term_before(after)
+        self.assertEqual((before.year, before.quarter), (2013, "autumn"))
+
+    def test_current_term(self):
+        term = get_current_term()
+        sws_current = sws_term.get_current_term()
+        self.assertEqual((term.year, term.quarter),
+                         (sws_current.year, sws_current.quarter))
+
+        # no more SWS calls once the terms are cached
+        with mock.patch("mazevo_r25.terms.get_resource") as mock_get, \
+                mock.patch.object(sws_term, "get_resource") as mock_sws_get:
+            term = get_current_term()
+            get_term_after(term)
+            self.assertFalse(mock_get.called)
+            self.assertFalse(mock_sws_get.called)
+
+    def test_stale(self):
+        get_term_by_year_and_quarter(2013, "spring")
+
+        with override_settings(MAZEVO_R25_TERM_CACHE_TTL=0), \
+                mock.patch("mazevo_r25.terms.get_resource",
+                           side_effect=DataFailureException("url", 503, "down")):
+            with self.assertLogs(terms.logger, "WARNING"):
+                term = get_term_by_year_and_quarter(2013, "spring")
+            self.assertEqual(term.quarter, "spring")
+
+            with self.assertRaises(DataFailureException):
+                get_term_by_year_and_quarter(2013, "summer")